@@ -1,82 +1,25 @@
 # scrape_escaperoos.py
 import json
-import time
+import os
 import re
+import sys
+import time
 from urllib.parse import urlparse, parse_qs
 from playwright.sync_api import sync_playwright
 
-# --- Configuración de filtros de enlaces externos no deseados ---
-BAD_HOST_SNIPPETS = (
-    "google.com/maps", "maps.google.", "maps.app.goo.gl", "goo.gl",
-    "facebook.", "instagram.", "twitter.", "tiktok.", "tripadvisor.",
-    "wa.me", "api.whatsapp", "youtube.", "youtu.be", "linkedin.",
-    "escaperoos.es",
-)
+# Utilidades compartidas de scripts/ (canonicalización y filtro de enlaces)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from url_utils import brand_from_url, external_links, normalize_url  # noqa: E402
 
 # ---------- URL helpers ----------
-def _normalize_url(url: str) -> str:
-    """Normaliza urls:
-      - ignora "#", "/", "javascript:"
-      - añade https:// si falta
-      - descarta si no hay hostname
-    """
-    if not url:
-        return ""
-    u = url.strip()
-    if u in ("/", "#") or u.startswith("#") or u.lower().startswith("javascript:"):
-        return ""
-    if u.startswith("//"):
-        u = "https:" + u
-    if not u.startswith("http"):
-        # evitar 'https://#opinions'
-        if u.startswith("#"):
-            return ""
-        u = "https://" + u.lstrip("/")
-    pu = urlparse(u)
-    if not pu.hostname:  # evita "https://#opinions"
-        return ""
-    return u
-
-def _is_bad_external(href: str) -> bool:
-    """Descarta correos, tel:, redes sociales, mapas, dominios internos, etc."""
-    h = (href or "").strip().lower()
-    if not h:
-        return True
-    if h.startswith("mailto:") or h.startswith("tel:"):
-        return True
-    if any(s in h for s in BAD_HOST_SNIPPETS):
-        return True
-    pu = urlparse(h)
-    if not pu.hostname:
-        return True
-    if "escaperoos.es" in (pu.hostname or ""):
-        return True
-    # enlace que solo es fragmento
-    if pu.fragment and not pu.path and not pu.query:
-        return True
-    return False
-
 def _hostname_to_brand(url: str) -> str:
-    """Deduce la marca desde el host de la web oficial."""
-    try:
-        u = _normalize_url(url)
-        if not u:
-            return ""
-        host = urlparse(u).hostname or ""
-        host = host.replace("www.", "").strip()
-        base = host.split(".")[0]
-        base = base.replace("-", " ").replace("_", " ").strip()
-        return " ".join(w.capitalize() for w in base.split())
-    except Exception:
-        return ""
+    """Deduce la marca desde el dominio de la web oficial."""
+    return brand_from_url(url)
 
 def _pick_best_external(candidates: list[str]) -> str:
     """Elige la mejor web externa candidata (propia de la sala)."""
     scored = []
-    for href in candidates:
-        u = _normalize_url(href)
-        if not u or _is_bad_external(u):
-            continue
+    for u in external_links(candidates):
         pu = urlparse(u)
         host = (pu.hostname or "").replace("www.", "")
         path = (pu.path or "/")
@@ -188,7 +131,7 @@ def _extract_coords_from_page(page):
     try:
         for a in page.query_selector_all("a[href]"):
             href = a.get_attribute("href") or ""
-            href = _normalize_url(href)
+            href = normalize_url(href)
             if not href:
                 continue
             if "maps" not in href.lower():
@@ -271,7 +214,7 @@ def scrape_escaperoos(page):
             external_candidates = []
             for a in page.query_selector_all("a[href]"):
                 href = a.get_attribute("href") or ""
-                href = _normalize_url(href)
+                href = normalize_url(href)
                 if not href:
                     continue
                 external_candidates.append(href)
@@ -4,30 +4,13 @@ Script para agregar logos de empresas a los escape rooms
 Usa Clearbit Logo API que proporciona logos basados en el dominio de la empresa
 """
 
-import json
-import re
-from urllib.parse import urlparse
+from change_journal import ChangeJournal
+from url_utils import domain_key
+
 
 def extract_domain(url):
-    """Extrae el dominio limpio de una URL"""
-    if not url or url in ['/', '#', '']:
-        return None
-
-    # Agregar https si no tiene protocolo
-    if not url.startswith('http'):
-        url = 'https://' + url
-
-    try:
-        parsed = urlparse(url)
-        domain = parsed.netloc or parsed.path
-        # Limpiar www.
-        domain = domain.replace('www.', '')
-        # Tomar solo el dominio principal
-        parts = domain.split('/')
-        domain = parts[0] if parts else domain
-        return domain if domain else None
-    except:
-        return None
+    """Extrae el dominio registrable de una URL (None si no es una web propia)"""
+    return domain_key(url)
 
 
 def get_company_logo_url(web_url, company_name=None):
@@ -62,42 +45,38 @@ def main():
     # Leer JSON
     json_path = "/Users/alejandra/escape_room_application/assets/escape_rooms_completo.json"
 
-    with open(json_path, 'r', encoding='utf-8') as f:
-        escape_rooms = json.load(f)
-
-    print(f"📊 {len(escape_rooms)} escape rooms encontrados\n")
-
     # Estadísticas
     with_valid_domain = 0
     with_company_name = 0
     generic_logo = 0
 
-    for idx, room in enumerate(escape_rooms, 1):
-        web = room.get('web', '')
-        empresa = room.get('empresa', '')
-        nombre = room.get('nombre', room.get('text', ''))
+    total = 0
 
-        # Generar URL del logo
-        logo_url = get_company_logo_url(web, empresa or nombre)
-        room['imagenUrl'] = logo_url
+    # Registro a registro; al diario sólo van los logos que cambian
+    with ChangeJournal(json_path, 'add_company_logos') as journal:
+        for idx, (key, room) in enumerate(journal.rooms(), 1):
+            total = idx
+            web = room.get('web', '')
+            empresa = room.get('empresa', '')
+            nombre = room.get('nombre', room.get('text', ''))
 
-        # Estadísticas
-        if extract_domain(web):
-            with_valid_domain += 1
-        elif empresa:
-            with_company_name += 1
-        else:
-            generic_logo += 1
+            # Generar URL del logo
+            logo_url = get_company_logo_url(web, empresa or nombre)
+            journal.set(key, room, 'imagenUrl', logo_url)
 
-        if idx % 100 == 0:
-            print(f"[{idx}/{len(escape_rooms)}] Procesados...")
+            # Estadísticas
+            if extract_domain(web):
+                with_valid_domain += 1
+            elif empresa:
+                with_company_name += 1
+            else:
+                generic_logo += 1
 
-    # Guardar JSON actualizado
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(escape_rooms, f, ensure_ascii=False, indent=2)
+            if idx % 100 == 0:
+                print(f"[{idx}] Procesados...")
 
     print(f"\n{'='*70}")
-    print(f"✅ Logos agregados a {len(escape_rooms)} escape rooms")
+    print(f"✅ Logos agregados a {total} escape rooms")
     print(f"{'='*70}")
     print(f"\n📊 Estadísticas:")
     print(f"  🌐 Con dominio web válido: {with_valid_domain}")
@@ -3,10 +3,14 @@
 Script para agregar escape rooms faltantes (como Madland) a la base de datos SQLite
 """
 
-import sqlite3
-import json
 import os
 
+from db_utils import BulkLoad
+from fts_index import rebuild_fts
+from json_stream import iter_records
+from migrations import migrate
+from rtree_index import rebuild_rtree
+
 def get_db_path():
     """Encuentra la ruta de la base de datos en el simulador"""
     # Ruta típica del simulador iOS
@@ -22,99 +26,104 @@ def get_db_path():
 def add_escape_rooms_to_db(json_file, db_path):
     """Agrega escape rooms desde un archivo JSON a la base de datos"""
 
-    # Leer el archivo JSON
-    with open(json_file, 'r', encoding='utf-8') as f:
-        escape_rooms = json.load(f)
-
-    print(f"\n📖 Leyendo {len(escape_rooms)} escape rooms de {json_file}")
-
-    # Conectar a la base de datos
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    # Leer el archivo JSON registro a registro
+    escape_rooms = iter_records(json_file)
+    print(f"\n📖 Leyendo escape rooms de {json_file}")
 
     added = 0
     updated = 0
 
-    for room in escape_rooms:
-        try:
-            # Verificar si ya existe
-            cursor.execute("SELECT id FROM words WHERE text = ? AND empresa = ?",
-                          (room['nombre'], room['empresa']))
-            existing = cursor.fetchone()
-
-            if existing:
-                # Actualizar registro existente
-                cursor.execute("""
-                    UPDATE words SET
-                        ubicacion = ?,
-                        web = ?,
-                        genero = ?,
-                        puntuacion = ?,
-                        precio = ?,
-                        jugadores = ?,
-                        duracion = ?,
-                        descripcion = ?,
-                        telefono = ?,
-                        latitud = ?,
-                        longitud = ?,
-                        dificultad = ?,
-                        imagenUrl = ?,
-                        source = ?
-                    WHERE id = ?
-                """, (
-                    room.get('ubicacion', ''),
-                    room.get('web', ''),
-                    room.get('genero', ''),
-                    room.get('puntuacion', ''),
-                    room.get('precio', ''),
-                    room.get('jugadores', ''),
-                    room.get('duracion', ''),
-                    room.get('descripcion', ''),
-                    room.get('telefono', ''),
-                    room.get('latitud', 0.0),
-                    room.get('longitud', 0.0),
-                    room.get('dificultad', ''),
-                    room.get('imagenUrl', ''),
-                    room.get('source', 'escaperoomlover.com'),
-                    existing[0]
-                ))
-                updated += 1
-                print(f"  ✏️ Actualizado: {room['nombre']} - {room['empresa']}")
-            else:
-                # Insertar nuevo registro
-                cursor.execute("""
-                    INSERT INTO words (
-                        text, ubicacion, web, genero, puntuacion, precio,
-                        jugadores, duracion, descripcion, empresa, telefono,
-                        latitud, longitud, dificultad, imagenUrl, source,
-                        wordStatus, isDeleted, isSynced
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'active', 0, 0)
-                """, (
-                    room['nombre'],
-                    room.get('ubicacion', ''),
-                    room.get('web', ''),
-                    room.get('genero', ''),
-                    room.get('puntuacion', ''),
-                    room.get('precio', ''),
-                    room.get('jugadores', ''),
-                    room.get('duracion', ''),
-                    room.get('descripcion', ''),
-                    room.get('empresa', ''),
-                    room.get('telefono', ''),
-                    room.get('latitud', 0.0),
-                    room.get('longitud', 0.0),
-                    room.get('dificultad', ''),
-                    room.get('imagenUrl', ''),
-                    room.get('source', 'escaperoomlover.com')
-                ))
-                added += 1
-                print(f"  ✅ Agregado: {room['nombre']} - {room['empresa']}")
-
-        except Exception as e:
-            print(f"  ❌ Error con {room.get('nombre', 'Unknown')}: {e}")
-
-    conn.commit()
-    conn.close()
+    # Conectar a la base de datos en modo carga masiva (WAL, commits por lotes)
+    with BulkLoad(db_path) as bulk:
+        cursor = bulk.conn.cursor()
+        # Columnas source, wordStatus... e índice (text, empresa) para la búsqueda de cada sala
+        migrate(bulk.conn)
+
+        for room in escape_rooms:
+            try:
+                # Verificar si ya existe
+                cursor.execute("SELECT id FROM words WHERE text = ? AND empresa = ?",
+                              (room['nombre'], room['empresa']))
+                existing = cursor.fetchone()
+
+                if existing:
+                    # Actualizar registro existente
+                    cursor.execute("""
+                        UPDATE words SET
+                            ubicacion = ?,
+                            web = ?,
+                            genero = ?,
+                            puntuacion = ?,
+                            precio = ?,
+                            jugadores = ?,
+                            duracion = ?,
+                            descripcion = ?,
+                            telefono = ?,
+                            latitud = ?,
+                            longitud = ?,
+                            dificultad = ?,
+                            imagenUrl = ?,
+                            source = ?
+                        WHERE id = ?
+                    """, (
+                        room.get('ubicacion', ''),
+                        room.get('web', ''),
+                        room.get('genero', ''),
+                        room.get('puntuacion', ''),
+                        room.get('precio', ''),
+                        room.get('jugadores', ''),
+                        room.get('duracion', ''),
+                        room.get('descripcion', ''),
+                        room.get('telefono', ''),
+                        room.get('latitud', 0.0),
+                        room.get('longitud', 0.0),
+                        room.get('dificultad', ''),
+                        room.get('imagenUrl', ''),
+                        room.get('source', 'escaperoomlover.com'),
+                        existing[0]
+                    ))
+                    updated += 1
+                    bulk.row()
+                    print(f"  ✏️ Actualizado: {room['nombre']} - {room['empresa']}")
+                else:
+                    # Insertar nuevo registro
+                    cursor.execute("""
+                        INSERT INTO words (
+                            text, ubicacion, web, genero, puntuacion, precio,
+                            jugadores, duracion, descripcion, empresa, telefono,
+                            latitud, longitud, dificultad, imagenUrl, source,
+                            wordStatus, isDeleted, isSynced
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'active', 0, 0)
+                    """, (
+                        room['nombre'],
+                        room.get('ubicacion', ''),
+                        room.get('web', ''),
+                        room.get('genero', ''),
+                        room.get('puntuacion', ''),
+                        room.get('precio', ''),
+                        room.get('jugadores', ''),
+                        room.get('duracion', ''),
+                        room.get('descripcion', ''),
+                        room.get('empresa', ''),
+                        room.get('telefono', ''),
+                        room.get('latitud', 0.0),
+                        room.get('longitud', 0.0),
+                        room.get('dificultad', ''),
+                        room.get('imagenUrl', ''),
+                        room.get('source', 'escaperoomlover.com')
+                    ))
+                    added += 1
+                    bulk.row()
+                    print(f"  ✅ Agregado: {room['nombre']} - {room['empresa']}")
+
+            except Exception as e:
+                print(f"  ❌ Error con {room.get('nombre', 'Unknown')}: {e}")
+
+        # Índices de búsqueda (FTS5) y del mapa (R*Tree) al día con las filas nuevas y actualizadas
+        rebuild_fts(bulk.conn)
+        rebuild_rtree(bulk.conn)
+
+    print(f"  ⚡ {bulk.stats['filas_por_segundo']:,.0f} filas/s")
 
     return added, updated
 
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Separa las ubicaciones de texto libre en calle, código postal, ciudad y provincia.
+
+    "9.6 (5 opiniones) · Calle Alcoy, 6 46004 Valencia España"
+        → calle "Calle Alcoy, 6", codigoPostal "46004",
+          ciudad "Valencia", provincia "Valencia"
+
+- La provincia sale del código postal: sus dos primeras cifras son el código
+  INE de la provincia (tabla de data/provincias_es.tsv, consulta O(1))
+- La ciudad la da el nomenclátor (gazetteer.py), dando preferencia a los
+  municipios de la provincia del código postal; si no la conoce, el texto
+  que sigue al código postal
+- Si la ciudad escrita tras el código postal es de otra provincia, se
+  considera una errata del código y manda la ciudad
+- Sin código postal, la provincia es la del nomenclátor
+- La calle es lo que queda antes del código postal (o de la ciudad)
+
+Los campos se guardan junto a `ubicacion`, que no se modifica, y la
+provincia queda como clave exacta para bloquear, filtrar y repartir por
+provincias sin volver a buscar en el texto.
+
+Uso:
+    python3 address_parser.py "Calle Mayor 3, 28801 Alcalá de Henares, España"
+    python3 address_parser.py --json ../assets/escape_rooms_completo.json
+    python3 address_parser.py --db ruta/a/words.db    # añade columnas e índices
+"""
+
+import argparse
+import logging
+import re
+import sqlite3
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+
+from change_journal import run_catalog_step
+from gazetteer import default_gazetteer
+from normalization import CACHE_SIZE, INVALID_VALUES, clean_text, fold
+
+logger = logging.getLogger(__name__)
+
+# Columnas nuevas (provincia ya existe en la app)
+ADDRESS_COLUMNS = {
+    'calle': 'TEXT',
+    'codigoPostal': 'TEXT',
+    'ciudad': 'TEXT',
+}
+
+ADDRESS_INDEXES = {
+    'idx_words_provincia': 'provincia',
+    'idx_words_codigo_postal': 'codigoPostal',
+}
+
+# "46004" y también "15 008" (algunas fuentes separan los miles)
+_POSTCODE_RE = re.compile(r'(?<![\d.,])(\d{2}) ?(\d{3})(?![\d.,])')
+_COUNTRY_RE = re.compile(r'[\s,]*\bespa[ñn]a\s*$', re.IGNORECASE)
+_TRAILING_SEP_RE = re.compile(r'[\s,;\-–]+$')
+_LEADING_SEP_RE = re.compile(r'^[\s,;\-–]+')
+
+
+class Address(NamedTuple):
+    calle: str
+    codigo_postal: str
+    ciudad: str
+    provincia: str
+
+    def as_columns(self) -> Dict[str, str]:
+        """Campos con los nombres de columna de la BD"""
+        return {
+            'calle': self.calle,
+            'codigoPostal': self.codigo_postal,
+            'ciudad': self.ciudad,
+            'provincia': self.provincia,
+        }
+
+
+EMPTY_ADDRESS = Address('', '', '', '')
+
+
+# ===========================================
+# PARSER
+# ===========================================
+
+def postcode_province(codigo_postal: Optional[str]) -> str:
+    """Provincia de un código postal ("46004" → "Valencia"), o "" """
+    if not codigo_postal or len(codigo_postal) != 5:
+        return ""
+    return default_gazetteer().provinces.get(codigo_postal[:2], "")
+
+
+def _find_postcode(text: str):
+    # El último código postal válido (las calles pueden llevar números largos)
+    for match in reversed(list(_POSTCODE_RE.finditer(text))):
+        codigo = match.group(1) + match.group(2)
+        if postcode_province(codigo):
+            return match, codigo
+    return None, ""
+
+
+def _strip_places(parts: List[str]) -> List[str]:
+    # Quita por la derecha las partes que son sólo un lugar ("Sitges", "Barcelona")
+    gazetteer = default_gazetteer()
+    while len(parts) > 1:
+        folded = fold(parts[-1])
+        if not any(m.start == 0 and m.end == len(folded) for m in gazetteer.matches(parts[-1])):
+            break
+        parts = parts[:-1]
+    return parts
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(ubicacion: str) -> Address:
+    text = clean_text(ubicacion)
+    if not text:
+        return EMPTY_ADDRESS
+
+    # "9.6 (5 opiniones) · Calle ...": la valoración va delante del punto medio
+    text = text.rsplit('·', 1)[-1].strip()
+    text = _COUNTRY_RE.sub('', text)
+
+    match, codigo = _find_postcode(text)
+    provincia = postcode_province(codigo)
+
+    gazetteer = default_gazetteer()
+    place, found_provincia = gazetteer.find(text, provincia or None)
+    if provincia and place and place.provincia != provincia:
+        same = [m for m in gazetteer.matches(text)
+                if m.place.tipo == 'municipio' and m.place.provincia == provincia]
+        if same:
+            # Municipio de la provincia del código postal ("... Olivares, 39 35006 ...")
+            place = max(same, key=lambda m: (m.end, m.end - m.start)).place
+        elif any(m.place == place for m in gazetteer.matches(text[match.end():])):
+            # La ciudad escrita tras el código lo contradice: es una errata del código
+            provincia = place.provincia
+        else:
+            place = None
+
+    if match:
+        # "Calle X, 6, San Vicente del Raspeig 03690 Alicante": el municipio
+        # puede ir también delante del código postal
+        parts = [p.strip() for p in text[:match.start()].split(',') if p.strip()]
+        calle = ', '.join(_strip_places(parts))
+        tail = _LEADING_SEP_RE.sub('', text[match.end():])
+        fallback_city = _TRAILING_SEP_RE.sub('', tail.split(',')[0])
+    else:
+        parts = [p.strip() for p in text.split(',') if p.strip()]
+        calle = ', '.join(_strip_places(parts)) if place or found_provincia else text
+        fallback_city = ''
+        if place and len(parts) == 1:
+            calle = ''
+
+    ciudad = place.nombre if place and place.tipo == 'municipio' else fallback_city
+    return Address(
+        calle=_TRAILING_SEP_RE.sub('', calle).strip(),
+        codigo_postal=codigo,
+        ciudad=ciudad,
+        provincia=provincia or found_provincia,
+    )
+
+
+def parse_address(ubicacion: Optional[str]) -> Address:
+    """Calle, código postal, ciudad y provincia de una ubicación"""
+    if not ubicacion or not isinstance(ubicacion, str) or ubicacion.strip().lower() in INVALID_VALUES:
+        return EMPTY_ADDRESS
+    return _parse(ubicacion)
+
+
+# ===========================================
+# POR LOTES
+# ===========================================
+
+def parse_addresses(ubicaciones: List[Optional[str]]) -> Dict[str, List[str]]:
+    """Columnas de dirección para una lista de ubicaciones (mismo orden)"""
+    parsed = [parse_address(u) for u in ubicaciones]
+    return {
+        'calle': [a.calle for a in parsed],
+        'codigoPostal': [a.codigo_postal for a in parsed],
+        'ciudad': [a.ciudad for a in parsed],
+        'provincia': [a.provincia for a in parsed],
+    }
+
+
+def apply_address_columns(rooms: List[Dict], overwrite: bool = False) -> Dict[str, int]:
+    """
+    Escribe calle, codigoPostal, ciudad y provincia en los registros
+
+    Args:
+        rooms: Escape rooms (se modifican; `ubicacion` se conserva)
+        overwrite: Sustituir valores que ya tuvieran
+
+    Returns:
+        Valores rellenados por columna
+    """
+    filled = {}
+    for column, values in parse_addresses([r.get('ubicacion') for r in rooms]).items():
+        count = 0
+        for room, value in zip(rooms, values):
+            if room.get(column) and not overwrite:
+                continue
+            room[column] = value or None
+            count += bool(value)
+        filled[column] = count
+    return filled
+
+
+# ===========================================
+# SQLITE
+# ===========================================
+
+def ensure_address_columns(conn: sqlite3.Connection, indexes: bool = True):
+    """Añade a `words` las columnas de dirección que falten (y sus índices)"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(words)")}
+    for column, sql_type in ADDRESS_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE words ADD COLUMN {column} {sql_type}")
+    if indexes:
+        for name, columns in ADDRESS_INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON words ({columns})")
+
+
+def update_database(db_path: str, overwrite: bool = False) -> int:
+    """Rellena las columnas de dirección de todas las filas de la BD"""
+    conn = sqlite3.connect(db_path)
+    try:
+        from migrations import migrate  # migrations importa este módulo
+        migrate(conn)
+        rows = conn.execute("SELECT id, ubicacion FROM words").fetchall()
+        columns = parse_addresses([u for _, u in rows])
+
+        names = ['calle', 'codigoPostal', 'ciudad', 'provincia']
+        params = [
+            tuple(columns[name][i] or None for name in names) + (row[0],)
+            for i, row in enumerate(rows)
+        ]
+        # La provincia puede venir de las coordenadas (app): sólo se rellenan huecos
+        assignments = ", ".join(
+            f"{name} = COALESCE(NULLIF({name}, ''), ?)" if not overwrite else f"{name} = ?"
+            for name in names
+        )
+        with conn:
+            conn.executemany(f"UPDATE words SET {assignments} WHERE id = ?", params)
+        return len(params)
+    finally:
+        conn.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Calle, código postal, ciudad y provincia de cada ubicación")
+    parser.add_argument('ubicaciones', nargs='*', help="Ubicaciones a analizar (muestra el resultado)")
+    parser.add_argument('--json', help="JSON de escape rooms a completar")
+    parser.add_argument('--salida', help="JSON de salida (por defecto, sobrescribe la entrada)")
+    parser.add_argument('--db', help="BD SQLite a actualizar")
+    parser.add_argument('--sobrescribir', action='store_true', help="Recalcular valores ya presentes")
+    args = parser.parse_args()
+
+    if not args.ubicaciones and not args.json and not args.db:
+        parser.error("indica ubicaciones, --json y/o --db")
+
+    for ubicacion in args.ubicaciones:
+        print(f"{ubicacion!r} → {parse_address(ubicacion).as_columns()}")
+
+    if args.json:
+        run_catalog_step(
+            args.json, 'address_parser', lambda rooms: apply_address_columns(rooms, args.sobrescribir),
+            args.salida, {'sobrescribir': args.sobrescribir},
+            summary=lambda filled: (f"{column}: {count}" for column, count in filled.items()),
+        )
+
+    if args.db:
+        updated = update_database(args.db, args.sobrescribir)
+        logger.info(f"✅ {updated} filas actualizadas en {args.db}")
+
+
+if __name__ == "__main__":
+    main()
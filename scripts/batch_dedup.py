@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Deduplicación en lote del catálogo completo en varios procesos.
+
+Usa los mismos bloques y el mismo criterio que entity_resolution.py, pero
+reparte los pares candidatos entre un pool de procesos y va escribiendo las
+coincidencias en un fichero NDJSON (una por línea) a medida que llegan. Al
+final informa de los pares por segundo para dimensionar la máquina.
+
+- Bloques por nombre: los bloques grandes se trocean por filas y los
+  pequeños se agrupan, de modo que cada tarea tenga unos `--tarea` pares
+- Cada par se puntúa una sola vez: en el primer bloque que comparten
+- Pares por proximidad que no comparten bloque de nombre: en tareas aparte
+
+Uso:
+    python3 batch_dedup.py                          # JSON conocidos
+    python3 batch_dedup.py --db words.db -j 8       # + BD, 8 procesos
+    python3 batch_dedup.py --salida /tmp/dup.ndjson
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import time
+from collections import defaultdict
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Tuple
+
+from entity_resolution import (
+    DEFAULT_SOURCES, REPO_ROOT, SCRIPT_DIR, Record, block_keys, collect_records,
+    is_match, load_db_source, load_json_source, source_name,
+)
+from geo_index import DEFAULT_RADIUS_M, GeoGridIndex, haversine_m
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = os.path.join(SCRIPT_DIR, "dedup_matches.ndjson")
+
+# Pares por tarea: suficientes para amortizar el envío, pocos para repartir bien
+PAIRS_PER_TASK = 20_000
+
+# Estado de cada proceso del pool (se envía una vez en el initializer)
+_records: List[Record] = []
+_blocks: List[List[int]] = []
+_record_blocks: List[Tuple[int, ...]] = []
+_radius_m: float = DEFAULT_RADIUS_M
+
+
+# ===========================================
+# PARTICIÓN
+# ===========================================
+
+def build_blocks(records: List[Record]) -> Tuple[List[List[int]], List[Tuple[int, ...]]]:
+    """Bloques por nombre (sólo los que generan pares) y bloques de cada registro"""
+    by_key = defaultdict(list)
+    for idx, record in enumerate(records):
+        for key in block_keys(record.nombre_norm):
+            by_key[key].append(idx)
+
+    blocks = [members for members in by_key.values() if len(members) > 1]
+    record_blocks = defaultdict(list)
+    for block_id, members in enumerate(blocks):
+        for idx in members:
+            record_blocks[idx].append(block_id)
+    return blocks, [tuple(record_blocks.get(i, ())) for i in range(len(records))]
+
+
+def geo_pairs(records: List[Record], record_blocks: List[Tuple[int, ...]],
+              radius_m: float) -> List[Tuple[int, int]]:
+    """Pares cercanos que no comparten ningún bloque de nombre"""
+    geo = GeoGridIndex(radius_m)
+    for idx, record in enumerate(records):
+        geo.add(idx, record.lat, record.lng)
+
+    pairs = []
+    for a, b, _ in geo.pairs():
+        if not set(record_blocks[a]).intersection(record_blocks[b]):
+            pairs.append((a, b) if a < b else (b, a))
+    return pairs
+
+
+def plan_tasks(blocks: List[List[int]], extra_pairs: List[Tuple[int, int]],
+               pairs_per_task: int = PAIRS_PER_TASK) -> Tuple[List[Tuple], int]:
+    """
+    Reparte el trabajo en tareas de tamaño parecido
+
+    Una tarea de bloques es ('b', [(bloque, fila_inicio, fila_fin), ...]): la
+    fila i de un bloque compara el miembro i con todos los posteriores.
+
+    Returns:
+        (tareas, pares candidatos antes de descartar repetidos)
+    """
+    tasks = []
+    current, current_pairs = [], 0
+    total = 0
+
+    for block_id, members in enumerate(blocks):
+        size = len(members)
+        start = 0
+        for row in range(size - 1):
+            row_pairs = size - 1 - row
+            current_pairs += row_pairs
+            total += row_pairs
+            if current_pairs >= pairs_per_task:
+                current.append((block_id, start, row + 1))
+                tasks.append(('b', current))
+                current, current_pairs = [], 0
+                start = row + 1
+        if start < size - 1:
+            current.append((block_id, start, size - 1))
+
+    if current:
+        tasks.append(('b', current))
+
+    for i in range(0, len(extra_pairs), pairs_per_task):
+        tasks.append(('g', extra_pairs[i:i + pairs_per_task]))
+    total += len(extra_pairs)
+
+    return tasks, total
+
+
+# ===========================================
+# PUNTUACIÓN (en cada proceso)
+# ===========================================
+
+def _init_worker(records, blocks, record_blocks, radius_m):
+    global _records, _blocks, _record_blocks, _radius_m
+    _records, _blocks, _record_blocks, _radius_m = records, blocks, record_blocks, radius_m
+
+
+def _first_shared_block(a: int, b: int) -> int:
+    blocks_b = _record_blocks[b]
+    return min(block for block in _record_blocks[a] if block in blocks_b)
+
+
+def _score_task(task) -> Tuple[int, List[Tuple[int, int]]]:
+    """Puntúa una tarea; devuelve (pares comparados, coincidencias)"""
+    kind, payload = task
+    compared = 0
+    matches = []
+
+    if kind == 'b':
+        for block_id, start, end in payload:
+            members = _blocks[block_id]
+            for row in range(start, end):
+                a = members[row]
+                for b in members[row + 1:]:
+                    # El par se puntúa sólo en el primer bloque que comparten
+                    if len(_record_blocks[a]) > 1 and len(_record_blocks[b]) > 1 \
+                            and _first_shared_block(a, b) != block_id:
+                        continue
+                    compared += 1
+                    if is_match(_records[a], _records[b], _radius_m):
+                        matches.append((a, b) if a < b else (b, a))
+    else:
+        for a, b in payload:
+            compared += 1
+            if is_match(_records[a], _records[b], _radius_m):
+                matches.append((a, b))
+
+    return compared, matches
+
+
+# ===========================================
+# EJECUCIÓN
+# ===========================================
+
+def _match_line(records: List[Record], a: int, b: int) -> str:
+    ra, rb = records[a], records[b]
+    distance = None
+    if ra.lat is not None and rb.lat is not None:
+        distance = round(haversine_m(ra.lat, ra.lng, rb.lat, rb.lng), 1)
+    return json.dumps({
+        'a': ra.key, 'b': rb.key,
+        'nombre_a': ra.nombre, 'nombre_b': rb.nombre,
+        'ciudad_a': ra.ciudad, 'ciudad_b': rb.ciudad,
+        'distancia_m': distance,
+    }, ensure_ascii=False)
+
+
+def run(records: List[Record], output: str, workers: int = 0, radius_m: float = DEFAULT_RADIUS_M,
+        pairs_per_task: int = PAIRS_PER_TASK) -> Dict:
+    """
+    Puntúa todos los pares candidatos y escribe las coincidencias en `output`
+
+    Args:
+        records: Registros de collect_records()
+        output: Fichero NDJSON de salida
+        workers: Procesos (0 = todos los núcleos, 1 = sin pool)
+        radius_m: Radio de proximidad en metros
+        pairs_per_task: Tamaño aproximado de cada tarea
+
+    Returns:
+        Estadísticas: pares, coincidencias, segundos y pares por segundo
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    blocks, record_blocks = build_blocks(records)
+    extra = geo_pairs(records, record_blocks, radius_m)
+    tasks, candidates = plan_tasks(blocks, extra, pairs_per_task)
+    planned = time.perf_counter()
+    logger.info(f"🧩 {len(blocks)} bloques + {len(extra)} pares por proximidad → "
+                f"{len(tasks)} tareas ({candidates} pares candidatos), {workers} procesos")
+
+    compared = found = 0
+    initargs = (records, blocks, record_blocks, radius_m)
+    tmp_output = output + ".tmp"
+
+    with open(tmp_output, 'w', encoding='utf-8') as f:
+        if workers == 1:
+            _init_worker(*initargs)
+            results: Iterable = map(_score_task, tasks)
+            pool = None
+        else:
+            pool = Pool(workers, initializer=_init_worker, initargs=initargs)
+            results = pool.imap_unordered(_score_task, tasks)
+
+        try:
+            for task_compared, matches in results:
+                compared += task_compared
+                found += len(matches)
+                for a, b in matches:
+                    f.write(_match_line(records, a, b) + "\n")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    os.replace(tmp_output, output)
+    elapsed = time.perf_counter() - start
+    scoring = time.perf_counter() - planned
+
+    return {
+        'registros': len(records),
+        'pares': compared,
+        'coincidencias': found,
+        'procesos': workers,
+        'segundos': elapsed,
+        'pares_por_segundo': compared / scoring if scoring else 0.0,
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Deduplicación en lote en varios procesos")
+    parser.add_argument('sources', nargs='*', help="Fuentes JSON (por defecto, todas las conocidas)")
+    parser.add_argument('--db', help="BD SQLite a incluir como fuente")
+    parser.add_argument('--salida', default=DEFAULT_OUTPUT, help="Fichero NDJSON de coincidencias")
+    parser.add_argument('-j', '--procesos', type=int, default=0,
+                        help="Número de procesos (por defecto, todos los núcleos)")
+    parser.add_argument('--radio', type=float, default=DEFAULT_RADIUS_M,
+                        help=f"Radio en metros para candidatos por proximidad (por defecto {DEFAULT_RADIUS_M})")
+    parser.add_argument('--tarea', type=int, default=PAIRS_PER_TASK,
+                        help=f"Pares por tarea (por defecto {PAIRS_PER_TASK})")
+    args = parser.parse_args()
+    if not (args.radio > 0 and math.isfinite(args.radio)):
+        parser.error("--radio debe ser un número de metros mayor que 0")
+
+    logger.info("=" * 60)
+    logger.info("DEDUPLICACIÓN EN LOTE")
+    logger.info("=" * 60)
+
+    paths = args.sources or [os.path.join(REPO_ROOT, p) for p in DEFAULT_SOURCES]
+    sources = [(source_name(p), load_json_source(p)) for p in paths]
+    if args.db:
+        sources.append(('db:words', load_db_source(args.db)))
+
+    records = collect_records(sources)
+    stats = run(records, args.salida, args.procesos, args.radio, args.tarea)
+
+    logger.info(f"\n📊 Resumen:")
+    logger.info(f"   - Registros: {stats['registros']}")
+    logger.info(f"   - Pares comparados: {stats['pares']}")
+    logger.info(f"   - Coincidencias: {stats['coincidencias']}")
+    logger.info(f"   - Procesos: {stats['procesos']}")
+    logger.info(f"   - Tiempo total: {stats['segundos']:.2f}s")
+    logger.info(f"   - Rendimiento: {stats['pares_por_segundo']:,.0f} pares/s")
+    logger.info(f"💾 Coincidencias guardadas en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
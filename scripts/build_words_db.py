@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Genera words.db ya poblado para distribuirlo con la app.
+
+En el primer arranque, WordDatabase lee escape_rooms_seed.json o
+escape_rooms_completo.json con rootBundle, hace jsonDecode e inserta fila a
+fila. Este script hace ese trabajo una vez, en el pipeline:
+
+- esquema de `words` igual al de la app (migrations.py, versión
+  APP_VERSION) y PRAGMA user_version = APP_VERSION, que es lo que sqflite
+  compara para decidir si hay que migrar
+- columnas del pipeline (numéricas, dirección, generoIds) y sus índices,
+  más los de las consultas de la app (query_indexes.py)
+- words_generos, índice FTS5 y R*Tree (se pueden omitir con --sin-virtuales)
+- ANALYZE y VACUUM; el fichero se escribe aparte y se renombra al final
+
+Con --normalizado, empresas y locales van en sus propias tablas y `words`
+es una vista compatible (normalized_schema.py).
+
+Uso:
+    python3 build_words_db.py                                   # ../assets/database/words.db
+    python3 build_words_db.py ../assets/escape_rooms_completo.json --salida /tmp/words.db
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from address_parser import apply_address_columns
+from change_journal import iter_view
+from db_utils import BulkLoad
+from entity_resolution import assign_catalog_ids
+from fts_index import rebuild_fts
+from genre_taxonomy import apply_genre_ids, ensure_genre_tables
+from migrations import APP_VERSION, ensure_indexes, migrate
+from normalization import clean_text, fold
+from normalized_schema import create_normalized_indexes, create_normalized_schema, write_normalized_rooms
+from parse_fields import apply_columns
+from phones import apply_phone_column
+from rtree_index import rebuild_rtree
+from stage_cache import Stage
+from url_utils import brand_from_url, domain_key, normalize_url
+
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets")
+DEFAULT_INPUT = os.path.join(ASSETS_DIR, "escape_rooms_completo.json")
+DEFAULT_OUTPUT = os.path.join(ASSETS_DIR, "database", "words.db")
+
+# Columnas que se rellenan desde el JSON (el resto son datos del usuario)
+CATALOG_COLUMNS = (
+    'id', 'text', 'genero', 'ubicacion', 'puntuacion', 'web', 'latitud', 'longitud',
+    'empresa', 'precio', 'jugadores', 'duracion', 'descripcion',
+    'numJugadoresMin', 'numJugadoresMax', 'dificultad', 'telefono', 'email',
+    'provincia', 'imagenUrl',
+    'precioMin', 'precioMax', 'duracionMinutos', 'puntuacionNum',
+    'calle', 'codigoPostal', 'ciudad', 'generoIds', 'canonicalId',
+)
+
+# ParsingUtils.isValidNombre
+INVALID_NAMES = ('no disponible', 'oops', 'página no encontrada', 'error 404', 'error', '404')
+
+
+def is_valid_nombre(nombre: Optional[str]) -> bool:
+    """Mismo filtro que la app: descarta páginas de error y nombres de menos de 3 caracteres"""
+    if not nombre:
+        return False
+    lowered = nombre.lower().strip()
+    return not any(invalid in lowered for invalid in INVALID_NAMES) and len(nombre) >= 3
+
+
+def _coordinate(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def prepare_rooms(rooms: List[Dict]) -> List[Dict]:
+    """
+    Registros del JSON listos para `words`
+
+    Filtra nombres no válidos y repetidos (misma clave nombre + ubicación
+    que usa WordDatabase.upsertFromJsonList) y calcula en lote las columnas
+    del pipeline y el ID canónico de cada sala.
+    """
+    prepared, seen = [], set()
+    for raw in rooms:
+        nombre = clean_text(raw.get('text') or raw.get('nombre'))
+        if not is_valid_nombre(nombre):
+            continue
+        key = (fold(nombre), fold(raw.get('ubicacion')))
+        if key in seen:
+            continue
+        seen.add(key)
+
+        room = dict(raw)
+        room['text'] = nombre
+        room['latitud'] = _coordinate(room.get('latitud'))
+        room['longitud'] = _coordinate(room.get('longitud'))
+        room['web'] = normalize_url(room.get('web'))
+        brand = brand_from_url(room['web']) if domain_key(room['web']) else ''
+        room['empresa'] = clean_text(room.get('empresa')) or brand or None
+        prepared.append(room)
+
+    apply_columns(prepared)
+    apply_address_columns(prepared)
+    apply_phone_column(prepared)
+    apply_genre_ids(prepared)
+    canonical_ids = assign_catalog_ids(prepared)
+    for word_id, room in enumerate(prepared, 1):
+        room['id'] = word_id
+        room['canonicalId'] = canonical_ids[word_id - 1]
+        room['generoIds'] = ','.join(room['generoIds']) or None
+    return prepared
+
+
+def build_database(rooms: List[Dict], output: str, virtual_tables: bool = True,
+                   normalized: bool = False) -> Dict[str, float]:
+    """
+    Escribe `rooms` (ya preparados) en una BD nueva en `output`
+
+    Con `normalized`, en tablas empresas/ubicaciones/salas con la vista
+    `words` encima (normalized_schema.py).
+
+    Returns:
+        Filas, segundos, filas por segundo y tamaño en bytes
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp_path = output + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    # catalog_delta importa este módulo
+    from catalog_delta import catalog_version, set_catalog_version
+
+    with BulkLoad(tmp_path, analyze=False) as bulk:
+        conn = bulk.conn
+        if normalized:
+            create_normalized_schema(conn)
+            ensure_genre_tables(conn)
+            write_normalized_rooms(conn, rooms)
+        else:
+            migrate(conn, indexes=False)
+
+            placeholders = ', '.join('?' for _ in CATALOG_COLUMNS)
+            conn.executemany(
+                f"INSERT INTO words ({', '.join(CATALOG_COLUMNS)}) VALUES ({placeholders})",
+                [tuple(room.get(column) for column in CATALOG_COLUMNS) for room in rooms],
+            )
+        conn.executemany(
+            "INSERT INTO words_generos (genero_id, word_id) VALUES (?, ?)",
+            [(genre_id, room['id']) for room in rooms for genre_id in (room['generoIds'] or '').split(',') if genre_id],
+        )
+        bulk.row(len(rooms))
+
+        # Índices después de cargar: una sola pasada por índice
+        if normalized:
+            create_normalized_indexes(conn)
+        else:
+            ensure_indexes(conn)
+        if virtual_tables:
+            rebuild_fts(conn)
+            rebuild_rtree(conn)
+        conn.execute(f"PRAGMA user_version = {APP_VERSION}")
+        # Punto de partida para los parches de catalog_delta.py
+        set_catalog_version(conn, catalog_version(rooms))
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+        (status,) = conn.execute("PRAGMA integrity_check").fetchone()
+    finally:
+        conn.close()
+    if status != 'ok':
+        raise sqlite3.DatabaseError(f"integrity_check: {status}")
+
+    os.replace(tmp_path, output)
+    return {**bulk.stats, 'bytes': os.path.getsize(output)}
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Genera words.db poblado para la app")
+    parser.add_argument('entradas', nargs='*', default=[DEFAULT_INPUT], help="JSON de escape rooms")
+    parser.add_argument('--salida', default=DEFAULT_OUTPUT, help="BD de salida")
+    parser.add_argument('--sin-virtuales', action='store_true', help="Sin índices FTS5 ni R*Tree")
+    parser.add_argument('--normalizado', action='store_true',
+                        help="Tablas empresas/ubicaciones/salas con la vista words")
+    parser.add_argument('--forzar', action='store_true', help="Regenerar aunque las entradas no hayan cambiado")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stage = Stage('build_words_db', args.entradas, [args.salida],
+                  {'virtuales': not args.sin_virtuales, 'normalizado': args.normalizado})
+    if not args.forzar and stage.fresh():
+        logger.info(f"♻️ {args.salida} ya está al día ({time.perf_counter() - start:.2f}s)")
+        return
+
+    rooms = []
+    for path in args.entradas:
+        rooms.extend(iter_view(path))
+    prepared = prepare_rooms(rooms)
+    logger.info(f"📋 {len(prepared)} salas de {len(rooms)} registros "
+                f"({time.perf_counter() - start:.2f}s)")
+
+    stats = build_database(prepared, args.salida, not args.sin_virtuales, args.normalizado)
+    stage.done()
+    logger.info(f"✅ {args.salida}: {stats['filas']} salas, versión {APP_VERSION}, "
+                f"{stats['bytes'] / 1024:.0f} KB en {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
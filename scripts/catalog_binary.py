@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Catálogo en formato binario compacto para el arranque de la app.
+
+La app lee escape_rooms_completo.json (indent=2) y hace jsonDecode de todo
+antes de sembrar la BD. Este exportador escribe el mismo catálogo, ya
+preparado como en build_words_db.py, con:
+
+- una tabla de cadenas sin repetidos (empresas, ciudades, provincias,
+  géneros, textos de precio...) y su índice de offsets
+- registros de ancho fijo: coordenadas en float64, precio en céntimos,
+  puntuación en centésimas, duración y jugadores como enteros, y una
+  referencia a la tabla de cadenas por cada campo de texto
+
+Con el ancho fijo, la sala i está en records_offset + i * record_size y se
+puede leer sin decodificar el resto. La especificación para implementarlo en
+Dart está en FORMATO_CATALOGO_BINARIO.md.
+
+Uso:
+    python3 catalog_binary.py                                  # ../assets/escape_rooms_completo.bin
+    python3 catalog_binary.py entrada.json --salida catalogo.bin
+    python3 catalog_binary.py --leer catalogo.bin -n 3
+    python3 catalog_binary.py --bench                          # tamaño y lectura frente a los JSON
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import math
+import os
+import struct
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+from build_words_db import DEFAULT_INPUT, prepare_rooms
+from change_journal import iter_view
+from stage_cache import Stage
+
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = os.path.dirname(DEFAULT_INPUT)
+DEFAULT_OUTPUT = os.path.splitext(DEFAULT_INPUT)[0] + ".bin"
+
+MAGIC = b'ERCB'
+FORMAT_VERSION = 1
+
+# magic, versión, tamaño de registro, registros, campos de texto, bytes por
+# referencia, cadenas, offset de la tabla de cadenas, offset de los registros, CRC32
+HEADER = struct.Struct('<4sHHIHHIIII')
+
+# Campos de texto, en el orden de sus referencias dentro del registro
+STRING_FIELDS = (
+    'canonicalId', 'text', 'empresa', 'genero', 'generoIds',
+    'ubicacion', 'calle', 'codigoPostal', 'ciudad', 'provincia',
+    'puntuacion', 'web', 'precio', 'jugadores', 'duracion',
+    'descripcion', 'dificultad', 'telefono', 'email', 'imagenUrl',
+)
+
+# latitud, longitud, precioMin, precioMax (céntimos), puntuacionNum
+# (centésimas), duracionMinutos, numJugadoresMin, numJugadoresMax, relleno,
+# y una referencia por campo de texto: u16 si hay menos de 65535 cadenas, si no u32
+NUMERIC_FORMAT = '<ddIIHHBBH'
+
+# Valores que significan "sin dato" en cada columna numérica
+NULL_U32 = 0xFFFFFFFF
+NULL_U16 = 0xFFFF
+NULL_U8 = 0xFF
+
+
+def _fixed(value: Optional[float], scale: int, null: int) -> int:
+    if value is None:
+        return null
+    return min(int(round(value * scale)), null - 1)
+
+
+def _unfixed(value: int, scale: int, null: int) -> Optional[float]:
+    return None if value == null else value / scale
+
+
+def record_struct(ref_size: int) -> struct.Struct:
+    """Formato de un registro con referencias de `ref_size` bytes (2 o 4)"""
+    return struct.Struct(NUMERIC_FORMAT + ('H' if ref_size == 2 else 'I') * len(STRING_FIELDS))
+
+
+# ===========================================
+# ESCRITURA
+# ===========================================
+
+class StringTable:
+    """Cadenas sin repetir; la referencia 0 es "sin valor" (None)"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def ref(self, value) -> int:
+        if value is None:
+            return 0
+        value = str(value)
+        if value not in self.ids:
+            self.strings.append(value)
+            self.ids[value] = len(self.strings)
+        return self.ids[value]
+
+    def encode(self) -> bytes:
+        """Offsets u32[n + 1] seguidos de las cadenas en UTF-8"""
+        blobs = [s.encode('utf-8') for s in self.strings]
+        offsets, position = [0], 0
+        for blob in blobs:
+            position += len(blob)
+            offsets.append(position)
+        return struct.pack(f'<{len(offsets)}I', *offsets) + b''.join(blobs)
+
+
+def encode_catalog(rooms: List[Dict]) -> bytes:
+    """Catálogo ya preparado (prepare_rooms) en formato binario"""
+    strings = StringTable()
+    rows = []
+    for room in rooms:
+        lat, lng = room.get('latitud'), room.get('longitud')
+        rows.append((
+            math.nan if lat is None else lat,
+            math.nan if lng is None else lng,
+            _fixed(room.get('precioMin'), 100, NULL_U32),
+            _fixed(room.get('precioMax'), 100, NULL_U32),
+            _fixed(room.get('puntuacionNum'), 100, NULL_U16),
+            _fixed(room.get('duracionMinutos'), 1, NULL_U16),
+            _fixed(room.get('numJugadoresMin'), 1, NULL_U8),
+            _fixed(room.get('numJugadoresMax'), 1, NULL_U8),
+            0,
+            *(strings.ref(room.get(field)) for field in STRING_FIELDS),
+        ))
+
+    ref_size = 2 if len(strings.strings) < 0xFFFF else 4
+    record = record_struct(ref_size)
+    records = b''.join(record.pack(*row) for row in rows)
+    string_table = strings.encode()
+    records_offset = HEADER.size
+    strings_offset = records_offset + len(records)
+    body = records + string_table
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, record.size, len(rooms), len(STRING_FIELDS), ref_size,
+        len(strings.strings), strings_offset, records_offset, zlib.crc32(body),
+    )
+    return header + body
+
+
+def write_catalog(rooms: List[Dict], path: str) -> int:
+    """Escribe el catálogo en `path` (temporal + renombrado); devuelve los bytes"""
+    data = encode_catalog(rooms)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+# ===========================================
+# LECTURA
+# ===========================================
+
+class CatalogReader:
+    """
+    Lector del formato binario
+
+    Las cadenas se decodifican al pedirlas (con caché), así que leer una
+    sala suelta no recorre el resto del fichero.
+    """
+
+    def __init__(self, data: bytes, verify: bool = True):
+        (magic, version, record_size, self.count, fields, ref_size, string_count,
+         strings_offset, self.records_offset, crc) = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("No es un catálogo binario (magic incorrecto)")
+        self.record = record_struct(ref_size)
+        if version != FORMAT_VERSION or record_size != self.record.size or fields != len(STRING_FIELDS):
+            raise ValueError(f"Versión de formato {version} no soportada (se espera {FORMAT_VERSION})")
+        if verify and zlib.crc32(memoryview(data)[HEADER.size:]) != crc:
+            raise ValueError("CRC32 incorrecto: fichero dañado o incompleto")
+        self.data = data
+        self._offsets = struct.unpack_from(f'<{string_count + 1}I', data, strings_offset)
+        self._blob_offset = strings_offset + 4 * (string_count + 1)
+        self._cache: Dict[int, str] = {}
+
+    @classmethod
+    def open(cls, path: str, verify: bool = True) -> 'CatalogReader':
+        with open(path, 'rb') as f:
+            return cls(f.read(), verify)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def string(self, ref: int) -> Optional[str]:
+        """Cadena de la tabla (None para la referencia 0)"""
+        if ref == 0:
+            return None
+        value = self._cache.get(ref)
+        if value is None:
+            start = self._blob_offset + self._offsets[ref - 1]
+            end = self._blob_offset + self._offsets[ref]
+            value = self._cache[ref] = self.data[start:end].decode('utf-8')
+        return value
+
+    def __getitem__(self, index: int) -> Dict:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        values = self.record.unpack_from(self.data, self.records_offset + index * self.record.size)
+        lat, lng, precio_min, precio_max, puntuacion, duracion, jug_min, jug_max, _ = values[:9]
+        room = {field: self.string(ref) for field, ref in zip(STRING_FIELDS, values[9:])}
+        room.update({
+            'latitud': None if math.isnan(lat) else lat,
+            'longitud': None if math.isnan(lng) else lng,
+            'precioMin': _unfixed(precio_min, 100, NULL_U32),
+            'precioMax': _unfixed(precio_max, 100, NULL_U32),
+            'puntuacionNum': _unfixed(puntuacion, 100, NULL_U16),
+            'duracionMinutos': None if duracion == NULL_U16 else duracion,
+            'numJugadoresMin': None if jug_min == NULL_U8 else jug_min,
+            'numJugadoresMax': None if jug_max == NULL_U8 else jug_max,
+        })
+        return room
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (self[i] for i in range(self.count))
+
+
+def read_catalog(path: str) -> List[Dict]:
+    """Todas las salas de un catálogo binario"""
+    return list(CatalogReader.open(path))
+
+
+# ===========================================
+# BENCHMARK
+# ===========================================
+
+def _timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def benchmark(paths: List[str], repeat: int = 20):
+    """
+    Tamaño (en bruto y con gzip, como va en el APK) y tiempo de lectura
+    frente a cada JSON. "lista para usar" incluye, para el JSON, calcular las
+    columnas numéricas y de dirección (prepare_rooms), que el binario ya trae
+    """
+    print(f"{'fichero':<28} {'salas':>6} {'KB':>6} {'KB gzip':>8} {'decodificar (ms)':>17} "
+          f"{'lista para usar (ms)':>21} {'1 sala (ms)':>12}")
+    for path in paths:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        rooms = prepare_rooms(json.loads(raw))
+        binary = encode_catalog(rooms)
+
+        json_ms = _timed(lambda: json.loads(raw.decode('utf-8')), repeat)
+        prepared_ms = _timed(lambda: prepare_rooms(json.loads(raw.decode('utf-8'))), max(repeat // 4, 1))
+        binary_ms = _timed(lambda: list(CatalogReader(binary)), repeat)
+        one_ms = _timed(lambda: CatalogReader(binary, verify=False)[len(rooms) // 2], repeat)
+
+        name = os.path.basename(path)
+        print(f"{name:<28} {len(json.loads(raw)):>6} {len(raw) / 1024:>6.0f} {len(gzip.compress(raw)) / 1024:>8.0f} "
+              f"{json_ms:>17.2f} {prepared_ms:>21.2f} {'-':>12}")
+        print(f"{'  binario':<28} {len(rooms):>6} {len(binary) / 1024:>6.0f} {len(gzip.compress(binary)) / 1024:>8.0f} "
+              f"{binary_ms:>17.2f} {binary_ms:>21.2f} {one_ms:>12.3f}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Catálogo de escape rooms en formato binario")
+    parser.add_argument('entradas', nargs='*', default=[DEFAULT_INPUT], help="JSON de escape rooms")
+    parser.add_argument('--salida', default=DEFAULT_OUTPUT, help="Fichero binario de salida")
+    parser.add_argument('--leer', metavar='BIN', help="Mostrar salas de un catálogo binario")
+    parser.add_argument('-n', type=int, default=5, help="Salas a mostrar con --leer")
+    parser.add_argument('--bench', action='store_true', help="Comparar tamaño y lectura con los JSON de assets")
+    parser.add_argument('--forzar', action='store_true', help="Regenerar aunque las entradas no hayan cambiado")
+    args = parser.parse_args()
+
+    if args.bench:
+        paths = args.entradas if args.entradas != [DEFAULT_INPUT] else [
+            os.path.join(ASSETS_DIR, name) for name in ('escape_rooms_seed.json', 'escape_rooms_completo.json')
+        ]
+        benchmark(paths)
+        return
+
+    if args.leer:
+        reader = CatalogReader.open(args.leer)
+        logger.info(f"📖 {args.leer}: {len(reader)} salas")
+        for i in range(min(args.n, len(reader))):
+            room = reader[i]
+            print(json.dumps({k: v for k, v in room.items() if v is not None}, ensure_ascii=False))
+        return
+
+    stage = Stage('catalog_binary', args.entradas, [args.salida])
+    if not args.forzar and stage.fresh():
+        logger.info(f"♻️ {args.salida} ya está al día")
+        return
+
+    rooms = []
+    for path in args.entradas:
+        rooms.extend(iter_view(path))
+    prepared = prepare_rooms(rooms)
+    size = write_catalog(prepared, args.salida)
+    stage.done()
+    logger.info(f"✅ {args.salida}: {len(prepared)} salas, {size / 1024:.0f} KB "
+                f"(JSON: {sum(os.path.getsize(p) for p in args.entradas) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Parches del catálogo: diferencias entre dos versiones por ID canónico.
+
+Cambiar una sala hoy obliga a regenerar escape_rooms_completo.json y volver
+a sembrar la BD entera. Este script compara dos versiones del catálogo
+(preparadas como en build_words_db.py) sala a sala por canonicalId y genera
+un parche con:
+
+- altas: salas nuevas, con sus columnas no vacías
+- cambios: sólo las columnas que cambian de cada sala
+- bajas: IDs canónicos que ya no están
+
+El parche lleva la versión de partida y la de llegada (hash del catálogo).
+Cada BD guarda la suya en `catalogo_version` (build_words_db.py la escribe
+al generar words.db) y apply_patch():
+
+- no hace nada si la BD ya está en la versión de llegada
+- se niega si está en otra versión que no es la de partida
+- es idempotente: las altas que ya existen se actualizan, los cambios y
+  bajas de salas que no están se ignoran
+- no borra las salas que el usuario tiene en favoritas, jugadas o
+  pendientes
+- mantiene generoIds/words_generos y los índices FTS5 y R*Tree sólo en las
+  filas tocadas, así que aplicarlo cuesta lo que ocupa el cambio
+
+Formatos: .json, .json.gz (binario comprimido) o .sql (sentencias sobre
+canonicalId para una BD de servidor; no comprueba la versión ni toca
+words_generos ni los índices FTS5/R*Tree, que se reconstruyen después).
+
+Uso:
+    python3 catalog_delta.py viejo.json nuevo.json --salida parche.json.gz
+    python3 catalog_delta.py viejo.json nuevo.json --salida parche.sql
+    python3 catalog_delta.py --db ruta/a/words.db --aplicar parche.json.gz
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from build_words_db import CATALOG_COLUMNS, prepare_rooms
+from change_journal import iter_view
+from entity_resolution import assign_catalog_ids
+from fts_index import FTS_TABLE, fts_add_rows, fts_remove_rows, fts_synced_by_triggers
+from genre_taxonomy import write_room_genres
+from migrations import migrate
+from rtree_index import RTREE_TABLE, rtree_update_rows
+from stage_cache import Stage
+
+logger = logging.getLogger(__name__)
+
+PATCH_FORMAT = 1
+
+# Columnas que compara el parche (el id de la fila es distinto en cada BD)
+DELTA_COLUMNS = tuple(c for c in CATALOG_COLUMNS if c not in ('id', 'canonicalId'))
+
+# Una sala marcada por el usuario no se borra aunque salga del catálogo
+USER_COLUMNS = ('isFavorite', 'isPlayed', 'isPending')
+
+
+# ===========================================
+# VERSIONES
+# ===========================================
+
+def catalog_version(rooms: List[Dict]) -> str:
+    """Hash del contenido del catálogo preparado (no depende del orden)"""
+    rows = sorted([room['canonicalId']] + [room.get(c) for c in DELTA_COLUMNS] for room in rooms)
+    payload = json.dumps(rows, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def _ensure_version_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS catalogo_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version TEXT NOT NULL,
+            actualizado TEXT NOT NULL
+        )
+    """)
+
+
+def get_catalog_version(conn: sqlite3.Connection) -> Optional[str]:
+    """Versión del catálogo de la BD; None si nunca se ha registrado"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'catalogo_version'").fetchone():
+        return None
+    row = conn.execute("SELECT version FROM catalogo_version WHERE id = 1").fetchone()
+    return row[0] if row else None
+
+
+def set_catalog_version(conn: sqlite3.Connection, version: str):
+    """Registra la versión del catálogo de la BD"""
+    _ensure_version_table(conn)
+    conn.execute(
+        "INSERT OR REPLACE INTO catalogo_version (id, version, actualizado) VALUES (1, ?, ?)",
+        (version, datetime.now().isoformat(timespec='seconds')),
+    )
+
+
+# ===========================================
+# DIFERENCIAS
+# ===========================================
+
+def load_catalog(paths: List[str]) -> Dict[str, Dict]:
+    """Catálogo preparado (prepare_rooms) indexado por canonicalId"""
+    rooms = []
+    for path in paths:
+        rooms.extend(iter_view(path))
+    return {room['canonicalId']: room for room in prepare_rooms(rooms)}
+
+
+def diff_catalogs(old: Dict[str, Dict], new: Dict[str, Dict]) -> Dict:
+    """Parche que lleva del catálogo `old` al `new`"""
+    inserts, updates = [], []
+    for canonical_id, room in new.items():
+        previous = old.get(canonical_id)
+        if previous is None:
+            inserts.append({'canonicalId': canonical_id,
+                            **{c: room[c] for c in DELTA_COLUMNS if room.get(c) not in (None, '')}})
+            continue
+        changed = {c: room.get(c) for c in DELTA_COLUMNS if room.get(c) != previous.get(c)}
+        if changed:
+            updates.append({'canonicalId': canonical_id, **changed})
+
+    return {
+        'formato': PATCH_FORMAT,
+        'desde': catalog_version(list(old.values())),
+        'hasta': catalog_version(list(new.values())),
+        'altas': inserts,
+        'cambios': updates,
+        'bajas': sorted(set(old) - set(new)),
+    }
+
+
+def patch_summary(patch: Dict) -> str:
+    return (f"{patch['desde']} → {patch['hasta']}: {len(patch['altas'])} altas, "
+            f"{len(patch['cambios'])} cambios, {len(patch['bajas'])} bajas")
+
+
+# ===========================================
+# FORMATOS
+# ===========================================
+
+def _sql_literal(value) -> str:
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def patch_to_sql(patch: Dict) -> str:
+    """Sentencias idempotentes sobre canonicalId (para una BD ya migrada)"""
+    lines = [f"-- Parche del catálogo {patch_summary(patch)}", "BEGIN;"]
+    for room in patch['altas']:
+        columns = list(room)
+        values = ', '.join(_sql_literal(room[c]) for c in columns)
+        lines.append(
+            f"INSERT INTO words ({', '.join(columns)}) SELECT {values} "
+            f"WHERE NOT EXISTS (SELECT 1 FROM words WHERE canonicalId = {_sql_literal(room['canonicalId'])});"
+        )
+    for room in patch['cambios']:
+        assignments = ', '.join(f"{c} = {_sql_literal(v)}" for c, v in room.items() if c != 'canonicalId')
+        lines.append(f"UPDATE words SET {assignments} WHERE canonicalId = {_sql_literal(room['canonicalId'])};")
+    kept = ' AND '.join(f"{c} = 0" for c in USER_COLUMNS)
+    for canonical_id in patch['bajas']:
+        lines.append(f"DELETE FROM words WHERE canonicalId = {_sql_literal(canonical_id)} AND {kept};")
+    lines.append(
+        "CREATE TABLE IF NOT EXISTS catalogo_version "
+        "(id INTEGER PRIMARY KEY CHECK (id = 1), version TEXT NOT NULL, actualizado TEXT NOT NULL);"
+    )
+    lines.append(f"INSERT OR REPLACE INTO catalogo_version VALUES (1, {_sql_literal(patch['hasta'])}, datetime('now'));")
+    lines.append("COMMIT;")
+    return '\n'.join(lines) + '\n'
+
+
+def write_patch(patch: Dict, path: str):
+    """Guarda el parche según la extensión: .json, .json.gz o .sql"""
+    if path.endswith('.sql'):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(patch_to_sql(patch))
+        return
+    payload = json.dumps(patch, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if path.endswith('.gz'):
+        payload = gzip.compress(payload, mtime=0)
+    with open(path, 'wb') as f:
+        f.write(payload)
+
+
+def read_patch(path: str) -> Dict:
+    """Lee un parche .json o .json.gz"""
+    with open(path, 'rb') as f:
+        payload = f.read()
+    if path.endswith('.gz'):
+        payload = gzip.decompress(payload)
+    patch = json.loads(payload.decode('utf-8'))
+    if patch.get('formato') != PATCH_FORMAT:
+        raise ValueError(f"Formato de parche {patch.get('formato')} no soportado (se espera {PATCH_FORMAT})")
+    return patch
+
+
+# ===========================================
+# APLICAR
+# ===========================================
+
+def backfill_canonical_ids(conn: sqlite3.Connection) -> int:
+    """
+    Rellena canonicalId en las filas que no lo tienen (BD sembradas por la
+    app desde el JSON), con el mismo cálculo que build_words_db
+    """
+    rows = conn.execute("SELECT id, text, ubicacion FROM words WHERE canonicalId IS NULL ORDER BY id").fetchall()
+    if not rows:
+        return 0
+    taken = [cid for (cid,) in conn.execute("SELECT canonicalId FROM words WHERE canonicalId IS NOT NULL")]
+    ids = assign_catalog_ids([{'text': text, 'ubicacion': ubicacion} for _, text, ubicacion in rows], taken)
+    conn.executemany("UPDATE words SET canonicalId = ? WHERE id = ?",
+                     [(canonical_id, row[0]) for canonical_id, row in zip(ids, rows)])
+    return len(rows)
+
+
+def _row_id(conn: sqlite3.Connection, canonical_id: str) -> Optional[int]:
+    row = conn.execute("SELECT id FROM words WHERE canonicalId = ?", (canonical_id,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_columns(conn: sqlite3.Connection, row_id: int, values: Dict):
+    conn.execute(f"UPDATE words SET {', '.join(f'{c} = ?' for c in values)} WHERE id = ?",
+                 (*values.values(), row_id))
+    if 'generoIds' in values:
+        write_room_genres(conn, row_id, [g for g in (values['generoIds'] or '').split(',') if g])
+
+
+def apply_patch(conn: sqlite3.Connection, patch: Dict, force: bool = False) -> Dict[str, int]:
+    """
+    Aplica un parche en una sola transacción
+
+    Returns:
+        Filas insertadas, actualizadas, borradas y conservadas (bajas con datos del usuario)
+    """
+    counts = {'altas': 0, 'cambios': 0, 'bajas': 0, 'conservadas': 0}
+    current = get_catalog_version(conn)
+    if current == patch['hasta']:
+        logger.info(f"✅ Catálogo ya en la versión {current}")
+        return counts
+    if current not in (None, patch['desde']) and not force:
+        raise ValueError(f"La BD está en la versión {current} y el parche parte de {patch['desde']}")
+
+    migrate(conn)
+    has_fts = bool(conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (FTS_TABLE,)).fetchone())
+    manual_fts = has_fts and not fts_synced_by_triggers(conn)
+    has_rtree = bool(conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (RTREE_TABLE,)).fetchone())
+
+    conn.execute("SAVEPOINT catalog_patch")
+    try:
+        filled = backfill_canonical_ids(conn)
+        if filled:
+            logger.info(f"🔑 canonicalId calculado para {filled} filas")
+
+        # Filas que ya existen y van a cambiar o desaparecer: fuera del índice con sus valores actuales
+        touched = [_row_id(conn, room['canonicalId']) for room in patch['altas'] + patch['cambios']]
+        gone = [_row_id(conn, canonical_id) for canonical_id in patch['bajas']]
+        if manual_fts:
+            fts_remove_rows(conn, [row_id for row_id in touched + gone if row_id is not None])
+
+        changed_ids = []
+        for room in patch['altas']:
+            values = {c: v for c, v in room.items() if c != 'canonicalId'}
+            row_id = _row_id(conn, room['canonicalId'])
+            if row_id is None:
+                conn.execute(
+                    f"INSERT INTO words (canonicalId, {', '.join(values)}) VALUES (?{', ?' * len(values)})",
+                    (room['canonicalId'], *values.values()),
+                )
+                # lastrowid no se actualiza con un INSERT sobre la vista (normalized_schema.py)
+                row_id = _row_id(conn, room['canonicalId'])
+                if values.get('generoIds'):
+                    write_room_genres(conn, row_id, values['generoIds'].split(','))
+                counts['altas'] += 1
+            else:
+                _set_columns(conn, row_id, values)
+                counts['cambios'] += 1
+            changed_ids.append(row_id)
+
+        for room in patch['cambios']:
+            row_id = _row_id(conn, room['canonicalId'])
+            if row_id is None:
+                continue
+            _set_columns(conn, row_id, {c: v for c, v in room.items() if c != 'canonicalId'})
+            changed_ids.append(row_id)
+            counts['cambios'] += 1
+
+        kept = ' OR '.join(f"{c} != 0" for c in USER_COLUMNS)
+        for row_id in gone:
+            if row_id is None:
+                continue
+            if conn.execute(f"SELECT 1 FROM words WHERE id = ? AND ({kept})", (row_id,)).fetchone():
+                changed_ids.append(row_id)
+                counts['conservadas'] += 1
+                continue
+            conn.execute("DELETE FROM words_generos WHERE word_id = ?", (row_id,))
+            conn.execute("DELETE FROM words WHERE id = ?", (row_id,))
+            counts['bajas'] += 1
+
+        if manual_fts:
+            fts_add_rows(conn, changed_ids)
+        if has_rtree:
+            rtree_update_rows(conn, changed_ids + [row_id for row_id in gone if row_id is not None])
+        set_catalog_version(conn, patch['hasta'])
+    except Exception:
+        conn.execute("ROLLBACK TO catalog_patch")
+        conn.execute("RELEASE catalog_patch")
+        raise
+    conn.execute("RELEASE catalog_patch")
+    return counts
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Parches del catálogo por ID canónico")
+    parser.add_argument('catalogos', nargs='*', metavar='JSON', help="Catálogo viejo y catálogo nuevo")
+    parser.add_argument('--salida', help="Parche de salida (.json, .json.gz o .sql)")
+    parser.add_argument('--db', help="BD a la que aplicar el parche")
+    parser.add_argument('--aplicar', metavar='PARCHE', help="Parche .json o .json.gz a aplicar en --db")
+    parser.add_argument('--forzar', action='store_true',
+                        help="Aplicar aunque la BD esté en otra versión; al generar, aunque no haya cambios")
+    args = parser.parse_args()
+
+    if args.aplicar:
+        if not args.db:
+            parser.error("--aplicar necesita --db")
+        patch = read_patch(args.aplicar)
+        logger.info(f"📦 Parche {patch_summary(patch)}")
+        conn = sqlite3.connect(args.db)
+        try:
+            counts = apply_patch(conn, patch, args.forzar)
+        finally:
+            conn.close()
+        logger.info(f"✅ {counts['altas']} altas, {counts['cambios']} cambios, {counts['bajas']} bajas"
+                    + (f", {counts['conservadas']} salas del usuario conservadas" if counts['conservadas'] else ""))
+        return
+
+    if len(args.catalogos) != 2 or not args.salida:
+        parser.error("indica el catálogo viejo, el nuevo y --salida")
+    stage = Stage('catalog_delta', args.catalogos, [args.salida])
+    if not args.forzar and stage.fresh():
+        logger.info(f"♻️ {args.salida} ya está al día")
+        return
+    old, new = (load_catalog([path]) for path in args.catalogos)
+    patch = diff_catalogs(old, new)
+    write_patch(patch, args.salida)
+    stage.done()
+    logger.info(f"📦 {patch_summary(patch)}")
+    logger.info(f"💾 {args.salida}: {os.path.getsize(args.salida) / 1024:.1f} KB "
+                f"(catálogo nuevo: {os.path.getsize(args.catalogos[1]) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
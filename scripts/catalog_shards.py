@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Catálogo partido por provincias, para cargarlo por partes.
+
+La app carga el catálogo de toda España al arrancar, aunque casi siempre se
+mira una o dos provincias. Este exportador escribe una carpeta con:
+
+- un fichero por provincia en el formato de catalog_binary.py (o JSON con
+  --formato json); las salas sin provincia van en `sin_provincia`
+- manifest.json, que es lo único que hay que leer al arrancar: por cada
+  provincia el fichero, el número de salas, la caja de coordenadas
+  [sur, oeste, norte, este] (null si ninguna sala tiene coordenadas), el
+  tamaño y el SHA-256 del contenido
+
+Con el manifiesto, la app decide qué provincias abrir (la elegida en el
+filtro, o las que cortan el área visible del mapa) y comprueba el hash al
+leerlas o descargarlas. Los ficheros cuyo contenido no cambia no se
+reescriben, así que una actualización sólo toca las provincias afectadas.
+
+ShardedCatalog es el lector de referencia en Python.
+
+Uso:
+    python3 catalog_shards.py                                 # ../assets/catalogo/
+    python3 catalog_shards.py ../assets/escape_rooms_seed.json --salida /tmp/catalogo
+    python3 catalog_shards.py --bench ../assets/escape_rooms_seed.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from build_words_db import DEFAULT_INPUT, prepare_rooms
+from catalog_binary import CatalogReader, encode_catalog
+from change_journal import iter_view
+from catalog_delta import catalog_version
+from geo_index import has_coordinates
+from normalization import fold
+from stage_cache import Stage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(DEFAULT_INPUT), "catalogo")
+MANIFEST = "manifest.json"
+MANIFEST_FORMAT = 1
+NO_PROVINCE = "sin_provincia"
+
+
+def shard_key(provincia: Optional[str]) -> str:
+    """Nombre de fichero de una provincia ("A Coruña" → "a_coruna")"""
+    return fold(provincia).replace(' ', '_') or NO_PROVINCE
+
+
+def bounding_box(rooms: List[Dict]) -> Optional[List[float]]:
+    """[sur, oeste, norte, este] de las salas con coordenadas"""
+    points = [(r['latitud'], r['longitud']) for r in rooms if has_coordinates(r.get('latitud'), r.get('longitud'))]
+    if not points:
+        return None
+    lats, lngs = zip(*points)
+    return [min(lats), min(lngs), max(lats), max(lngs)]
+
+
+def _encode(rooms: List[Dict], formato: str) -> bytes:
+    if formato == 'json':
+        return json.dumps(rooms, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return encode_catalog(rooms)
+
+
+def export_shards(rooms: List[Dict], output_dir: str, formato: str = 'bin') -> Dict:
+    """
+    Escribe un fichero por provincia y el manifiesto
+
+    Returns:
+        El manifiesto, con el número de ficheros reescritos en 'escritos'
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    groups: Dict[str, List[Dict]] = defaultdict(list)
+    names: Dict[str, str] = {}
+    for room in rooms:
+        key = shard_key(room.get('provincia'))
+        groups[key].append(room)
+        names.setdefault(key, room.get('provincia') or '')
+
+    shards, written = [], 0
+    for key in sorted(groups):
+        data = _encode(groups[key], formato)
+        digest = hashlib.sha256(data).hexdigest()
+        filename = f"{key}.{formato}"
+        path = os.path.join(output_dir, filename)
+        # Mismo contenido: no se toca el fichero (ni su fecha)
+        if not os.path.exists(path) or _sha256(path) != digest:
+            with open(path + ".tmp", 'wb') as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+            written += 1
+        shards.append({
+            'provincia': names[key],
+            'fichero': filename,
+            'salas': len(groups[key]),
+            'caja': bounding_box(groups[key]),
+            'bytes': len(data),
+            'sha256': digest,
+        })
+
+    # Ficheros del manifiesto anterior que ya no están (provincias vacías o cambio de formato)
+    current = {shard['fichero'] for shard in shards}
+    for filename in _previous_files(output_dir) - current:
+        if os.path.exists(os.path.join(output_dir, filename)):
+            os.remove(os.path.join(output_dir, filename))
+
+    manifest = {
+        'formato': MANIFEST_FORMAT,
+        'catalogo': formato,
+        'version': catalog_version(rooms),
+        'salas': len(rooms),
+        'provincias': shards,
+    }
+    with open(os.path.join(output_dir, MANIFEST + ".tmp"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(os.path.join(output_dir, MANIFEST + ".tmp"), os.path.join(output_dir, MANIFEST))
+    return {**manifest, 'escritos': written}
+
+
+def _previous_files(output_dir: str) -> set:
+    try:
+        with open(os.path.join(output_dir, MANIFEST), 'r', encoding='utf-8') as f:
+            return {shard['fichero'] for shard in json.load(f)['provincias']}
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return set()
+
+
+def _sha256(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# ===========================================
+# LECTURA
+# ===========================================
+
+class ShardedCatalog:
+    """Lee el manifiesto al abrir y cada provincia sólo cuando se pide"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('formato') != MANIFEST_FORMAT:
+            raise ValueError(f"Manifiesto en formato {self.manifest.get('formato')} no soportado")
+        self.shards = {shard_key(s['provincia']): s for s in self.manifest['provincias']}
+        self._loaded: Dict[str, List[Dict]] = {}
+
+    def provinces(self) -> List[str]:
+        """Provincias del catálogo, sin abrir ningún fichero"""
+        return [s['provincia'] for s in self.manifest['provincias'] if s['provincia']]
+
+    def load(self, provincia: Optional[str]) -> List[Dict]:
+        """Salas de una provincia (comprueba el SHA-256 del manifiesto)"""
+        key = shard_key(provincia)
+        if key in self._loaded:
+            return self._loaded[key]
+        shard = self.shards.get(key)
+        if shard is None:
+            return []
+        with open(os.path.join(self.directory, shard['fichero']), 'rb') as f:
+            data = f.read()
+        if hashlib.sha256(data).hexdigest() != shard['sha256']:
+            raise ValueError(f"{shard['fichero']} no coincide con el manifiesto")
+        if self.manifest['catalogo'] == 'json':
+            rooms = json.loads(data.decode('utf-8'))
+        else:
+            rooms = list(CatalogReader(data, verify=False))
+        self._loaded[key] = rooms
+        return rooms
+
+    def in_bbox(self, south: float, west: float, north: float, east: float) -> List[Dict]:
+        """Salas dentro de la caja, abriendo sólo las provincias cuya caja la corta"""
+        found = []
+        for shard in self.manifest['provincias']:
+            box = shard['caja']
+            if box is None or box[0] > north or box[2] < south or box[1] > east or box[3] < west:
+                continue
+            found.extend(
+                room for room in self.load(shard['provincia'])
+                if has_coordinates(room.get('latitud'), room.get('longitud'))
+                and south <= room['latitud'] <= north and west <= room['longitud'] <= east
+            )
+        return found
+
+
+# ===========================================
+# BENCHMARK
+# ===========================================
+
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmark(rooms: List[Dict], json_path: str):
+    """Arranque con el JSON completo frente al manifiesto más una o dos provincias"""
+    with tempfile.TemporaryDirectory() as tmp:
+        export_shards(rooms, tmp)
+        top = sorted(ShardedCatalog(tmp).manifest['provincias'], key=lambda s: -s['salas'])[:2]
+
+        def whole():
+            with open(json_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        cases = [
+            ("JSON completo", whole),
+            ("sólo manifiesto", lambda: ShardedCatalog(tmp).provinces()),
+            (f"manifiesto + {top[0]['provincia']}", lambda: ShardedCatalog(tmp).load(top[0]['provincia'])),
+            (f"manifiesto + {top[1]['provincia']} (la 2ª)", lambda: ShardedCatalog(tmp).load(top[1]['provincia'])),
+        ]
+        print(f"{'arranque':<36} {'salas':>6} {'ms':>8} {'pico KB':>9}")
+        for name, fn in cases:
+            result, elapsed, peak = _measure(fn)
+            print(f"{name:<36} {len(result):>6} {elapsed:>8.2f} {peak / 1024:>9.0f}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Catálogo partido por provincias con manifiesto")
+    parser.add_argument('entradas', nargs='*', default=[DEFAULT_INPUT], help="JSON de escape rooms")
+    parser.add_argument('--salida', default=DEFAULT_OUTPUT, help="Carpeta de salida")
+    parser.add_argument('--formato', choices=('bin', 'json'), default='bin', help="Formato de cada provincia")
+    parser.add_argument('--bench', action='store_true', help="Comparar el arranque con el JSON completo")
+    parser.add_argument('--forzar', action='store_true', help="Regenerar aunque las entradas no hayan cambiado")
+    args = parser.parse_args()
+
+    stage = Stage('catalog_shards', args.entradas, [args.salida], {'formato': args.formato})
+    if not args.bench and not args.forzar and stage.fresh():
+        logger.info(f"♻️ {args.salida} ya está al día")
+        return
+
+    rooms = []
+    for path in args.entradas:
+        rooms.extend(iter_view(path))
+    prepared = prepare_rooms(rooms)
+
+    if args.bench:
+        benchmark(prepared, args.entradas[0])
+        return
+
+    manifest = export_shards(prepared, args.salida, args.formato)
+    stage.done()
+    logger.info(f"✅ {args.salida}: {manifest['salas']} salas en {len(manifest['provincias'])} provincias, "
+                f"{manifest['escritos']} ficheros reescritos")
+
+
+if __name__ == "__main__":
+    main()
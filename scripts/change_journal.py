@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Diario de cambios por campo para los JSON de escape rooms.
+
+Los scripts de enriquecimiento (campo text, logos, imágenes, merge) leían
+escape_rooms_completo.json entero, tocaban uno o dos campos y lo volvían a
+escribir. Dos pasos a la vez se pisaban: el último en escribir borraba los
+cambios del otro. Con el diario:
+
+- la instantánea (el JSON) sólo se reescribe al compactar
+- cada paso añade al final de `<json>.journal.ndjson` una línea por campo
+  que cambia de verdad, y líneas de alta y baja de salas:
+
+    {"instantanea": "sha256:..."}                                cabecera
+    {"sala": 12, "campo": "imagenUrl", "valor": "...", "paso": "fix_images_picsum"}
+    {"sala": "3f9c...", "alta": {...}, "paso": "merge_data"}
+    {"sala": 7, "baja": true, "paso": "merge_data"}
+
+  `sala` es la posición en la instantánea, o un id para las altas
+- iter_view() devuelve la instantánea con el diario aplicado, registro a
+  registro; los generadores de assets leen así sus entradas
+- update_catalog() hace lo mismo para los pasos por lotes que completan
+  columnas (parse_fields, address_parser, genre_taxonomy, phones);
+  run_catalog_step() es su `--json`, con tiempos y resumen
+- al cerrar un paso, si el diario pasa de COMPACT_BYTES se compacta: se
+  reescribe la instantánea con los cambios y se borra el diario
+
+Bloqueos (flock sobre `<json>.journal.lock`): cada paso tiene un bloqueo
+compartido mientras lee y escribe, así que las posiciones no cambian bajo
+sus pies; la compactación necesita el exclusivo. Si se compacta con pasos
+en marcha, se deja para la próxima vez. La cabecera identifica la
+instantánea por el hash de su contenido (un `touch`, guardarla sin cambios o
+un `git checkout` no la cambian). Si alguien la reescribe por fuera con otro
+contenido (o la compactación se interrumpe tras reemplazarla), el diario
+antiguo no se aplica ni se borra: se aparta a `<json>.journal.<fecha>.ndjson`
+para revisarlo a mano.
+
+La app lee el JSON directamente: hay que compactar antes de compilarla.
+
+Uso:
+    with ChangeJournal(json_path, 'fix_text_field') as journal:
+        for key, room in journal.rooms():
+            journal.set(key, room, 'text', room.get('nombre'))
+
+    python3 change_journal.py ../assets/escape_rooms_completo.json              # cambios pendientes
+    python3 change_journal.py ../assets/escape_rooms_completo.json --compactar
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from json_stream import iter_records, write_records
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".journal.ndjson"
+LOCK_SUFFIX = ".journal.lock"
+COMPACT_BYTES = 512 * 1024
+
+Key = Union[int, str]
+
+
+def journal_path(snapshot: str) -> str:
+    return snapshot + JOURNAL_SUFFIX
+
+
+# Hash de las instantáneas ya leídas en este proceso, por ruta y fecha/tamaño
+_ids: Dict[tuple, str] = {}
+
+
+def _snapshot_id(snapshot: str) -> str:
+    st = os.stat(snapshot)
+    key = (os.path.abspath(snapshot), st.st_ino, st.st_size, st.st_mtime_ns)
+    if key not in _ids:
+        digest = hashlib.sha256()
+        with open(snapshot, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+        _ids[key] = f"sha256:{digest.hexdigest()}"
+    return _ids[key]
+
+
+def _legacy_id(snapshot: str) -> str:
+    # Cabecera de los diarios anteriores: inodo, tamaño y fecha
+    st = os.stat(snapshot)
+    return f"{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _header(snapshot: str) -> str:
+    return json.dumps({'instantanea': _snapshot_id(snapshot)})
+
+
+def _set_aside(snapshot: str) -> str:
+    """Aparta un diario que no es de la instantánea actual; devuelve su nueva ruta"""
+    path = journal_path(snapshot)
+    aside = f"{snapshot}.journal.{time.strftime('%Y%m%d-%H%M%S')}.ndjson"
+    os.replace(path, aside)
+    logger.warning(f"⚠️ {path} es de otra versión de {snapshot}: se aparta a {aside}")
+    return aside
+
+
+def read_journal(snapshot: str) -> Tuple[Dict[Key, List[Dict]], List[Key]]:
+    """
+    Entradas del diario vigente agrupadas por sala, y las altas en orden
+
+    Un diario de otra instantánea se ignora (ya está aplicado, o hay que
+    revisarlo a mano); una última línea a medias, de un paso interrumpido, también.
+    """
+    changes: Dict[Key, List[Dict]] = defaultdict(list)
+    inserts: List[Key] = []
+    path = journal_path(snapshot)
+    if not os.path.exists(path):
+        return changes, inserts
+
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    current = (_snapshot_id(snapshot), _legacy_id(snapshot))
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning(f"⚠️ {path}:{number}: línea incompleta, se ignora")
+            continue
+        if 'instantanea' in entry:
+            if entry['instantanea'] not in current:
+                logger.warning(f"⚠️ {path} es de otra versión de {snapshot}, se ignora")
+                return defaultdict(list), []
+            continue
+        if 'alta' in entry:
+            inserts.append(entry['sala'])
+        changes[entry['sala']].append(entry)
+    return changes, inserts
+
+
+def _apply(room: Optional[Dict], entries: List[Dict]) -> Optional[Dict]:
+    for entry in entries:
+        if 'alta' in entry:
+            room = dict(entry['alta'])
+        elif entry.get('baja'):
+            room = None
+        elif room is not None:
+            room[entry['campo']] = entry['valor']
+    return room
+
+
+def iter_entries(snapshot: str) -> Iterator[Tuple[Key, Dict]]:
+    """(clave, sala) de la instantánea con el diario aplicado"""
+    changes, inserts = read_journal(snapshot)
+    for position, room in enumerate(iter_records(snapshot)):
+        room = _apply(room, changes.get(position, []))
+        if room is not None:
+            yield position, room
+    for key in inserts:
+        room = _apply(None, changes[key])
+        if room is not None:
+            yield key, room
+
+
+def iter_view(snapshot: str) -> Iterator[Dict]:
+    """Salas de la instantánea con el diario aplicado (sin diario, las del JSON)"""
+    for _, room in iter_entries(snapshot):
+        yield room
+
+
+# ===========================================
+# ESCRITURA
+# ===========================================
+
+class ChangeJournal:
+    """
+    Paso de enriquecimiento que escribe sólo sus cambios
+
+    Args:
+        snapshot: JSON de escape rooms
+        step: Nombre del paso (queda en cada línea del diario)
+        compact_bytes: Tamaño del diario a partir del cual se compacta al cerrar
+    """
+
+    def __init__(self, snapshot: str, step: str, compact_bytes: int = COMPACT_BYTES):
+        self.snapshot = snapshot
+        self.step = step
+        self.compact_bytes = compact_bytes
+        self.stats: Counter = Counter()
+        self._pending: List[str] = []
+        self._lock = None
+
+    def __enter__(self) -> 'ChangeJournal':
+        self._lock = open(self.snapshot + LOCK_SUFFIX, 'a')
+        fcntl.flock(self._lock, fcntl.LOCK_SH)
+        path = journal_path(self.snapshot)
+        header = _header(self.snapshot)
+        while True:
+            try:
+                # O_EXCL: si dos pasos empiezan a la vez, sólo uno escribe la cabecera
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(header + '\n')
+            except FileExistsError:
+                if _first_line(path) != header:
+                    # Cabecera antigua o diario de otra instantánea: con el exclusivo (caso raro)
+                    fcntl.flock(self._lock, fcntl.LOCK_EX)
+                    _check_header(self.snapshot)
+                    fcntl.flock(self._lock, fcntl.LOCK_SH)
+                    continue
+            return self
+
+    def rooms(self) -> Iterator[Tuple[Key, Dict]]:
+        """(clave, sala) actuales; la clave es la que piden set() y remove()"""
+        return iter_entries(self.snapshot)
+
+    def set(self, key: Key, room: Dict, field: str, value) -> bool:
+        """Cambia un campo de la sala y lo anota si el valor es distinto"""
+        if field in room and room[field] == value:
+            return False
+        room[field] = value
+        self._write({'sala': key, 'campo': field, 'valor': value})
+        self.stats['cambios'] += 1
+        return True
+
+    def update(self, key: Key, before: Dict, room: Dict) -> int:
+        """Anota los campos de `room` que difieren de `before` (la sala tal como se leyó)"""
+        return sum(self.set(key, before, field, value) for field, value in room.items())
+
+    def add(self, room: Dict) -> str:
+        """Anota una sala nueva; devuelve su clave"""
+        key = uuid.uuid4().hex
+        self._write({'sala': key, 'alta': room})
+        self.stats['altas'] += 1
+        return key
+
+    def remove(self, key: Key):
+        """Anota la baja de una sala"""
+        self._write({'sala': key, 'baja': True})
+        self.stats['bajas'] += 1
+
+    def _write(self, entry: Dict):
+        entry['paso'] = self.step
+        self._pending.append(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            # Un paso que falla no deja cambios a medias
+            if exc_type is None and self._pending:
+                with open(journal_path(self.snapshot), 'a', encoding='utf-8') as f:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    f.write(''.join(self._pending))
+                    f.flush()
+                    os.fsync(f.fileno())
+                logger.info(f"📝 {self.step}: {self.stats['cambios']} cambios, {self.stats['altas']} altas, "
+                            f"{self.stats['bajas']} bajas en {journal_path(self.snapshot)}")
+        finally:
+            self._lock.close()
+            self._lock = None
+        if exc_type is None and os.path.getsize(journal_path(self.snapshot)) > self.compact_bytes:
+            compact(self.snapshot, wait=False)
+        return False
+
+
+def _first_line(path: str) -> str:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.readline().rstrip('\n')
+    except FileNotFoundError:
+        return ''
+
+
+def _check_header(snapshot: str) -> bool:
+    """
+    True si el diario (si existe) es de la instantánea actual
+
+    Con el bloqueo exclusivo: una cabecera antigua (inodo, tamaño y fecha) de
+    esta misma instantánea se pasa a hash; un diario de otra, se aparta.
+    """
+    path = journal_path(snapshot)
+    line = _first_line(path)
+    if line == _header(snapshot):
+        return True
+    if not line:
+        # Sin diario, o creado sin llegar a escribir la cabecera
+        if os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(_header(snapshot) + '\n')
+        return True
+    try:
+        stored = json.loads(line).get('instantanea')
+    except (json.JSONDecodeError, AttributeError):
+        stored = None
+    if stored == _legacy_id(snapshot):
+        with open(path, 'r', encoding='utf-8') as f:
+            f.readline()
+            rest = f.read()
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(_header(snapshot) + '\n' + rest)
+        os.replace(path + ".tmp", path)
+        return True
+    _set_aside(snapshot)
+    return False
+
+
+def update_catalog(snapshot: str, step: str, fn: Callable[[List[Dict]], Any],
+                   output: Optional[str] = None, params: Optional[Dict] = None) -> Tuple[Any, int]:
+    """
+    Aplica fn (que completa campos de la lista de salas) a la vista de `snapshot`
+
+    Sobre el propio JSON sólo se anotan en el diario los campos que cambian,
+    así que repetir el paso no escribe nada. Con otra salida, se escribe entera
+    salvo que la etapa esté al día (stage_cache.py: mismo contenido de
+    entrada, mismos `params` y mismo código de `step`).
+
+    Returns:
+        (lo que devuelve fn, número de salas); (None, 0) si se reutiliza la salida
+    """
+    if output and os.path.abspath(output) != os.path.abspath(snapshot):
+        from stage_cache import Stage
+
+        stage = Stage(step, [snapshot], [output], params)
+        if stage.fresh():
+            return None, 0
+        rooms = list(iter_view(snapshot))
+        result = fn(rooms)
+        write_records(output, rooms)
+        stage.done()
+        return result, len(rooms)
+
+    with ChangeJournal(snapshot, step) as journal:
+        entries = list(journal.rooms())
+        rooms = [room for _, room in entries]
+        before = [dict(room) for room in rooms]
+        result = fn(rooms)
+        for (key, _), old, room in zip(entries, before, rooms):
+            journal.update(key, old, room)
+    return result, len(rooms)
+
+
+def run_catalog_step(snapshot: str, step: str, fn: Callable[[List[Dict]], Any],
+                     output: Optional[str] = None, params: Optional[Dict] = None,
+                     summary: Optional[Callable[[Any], Iterable[str]]] = None) -> Any:
+    """
+    update_catalog() con el registro de los scripts por lotes
+
+    Args:
+        summary: Líneas de detalle a partir de lo que devuelve fn
+
+    Returns:
+        Lo que devuelve fn, o None si la salida ya estaba al día
+    """
+    start = time.perf_counter()
+    output = output or snapshot
+    result, total = update_catalog(snapshot, step, fn, output, params)
+    if result is None:
+        logger.info(f"♻️ {output} ya está al día")
+        return None
+    logger.info(f"📋 {total} escape rooms en {(time.perf_counter() - start) * 1000:.0f} ms")
+    for line in summary(result) if summary else ():
+        logger.info(f"   - {line}")
+    logger.info(f"💾 Guardado en {output}")
+    return result
+
+
+def compact(snapshot: str, wait: bool = True) -> Optional[int]:
+    """
+    Reescribe la instantánea con el diario aplicado y borra el diario
+
+    Returns:
+        Número de entradas compactadas, o None si había pasos en marcha y
+        wait=False
+    """
+    path = journal_path(snapshot)
+    with open(snapshot + LOCK_SUFFIX, 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+        except BlockingIOError:
+            logger.info(f"ℹ️ Pasos en marcha sobre {snapshot}: se compactará más tarde")
+            return None
+        if not _check_header(snapshot):
+            return 0
+        changes, _ = read_journal(snapshot)
+        entries = sum(len(e) for e in changes.values())
+        if entries:
+            total = write_records(snapshot, iter_view(snapshot))
+            logger.info(f"🗜️ {snapshot}: {entries} entradas del diario aplicadas, {total} salas")
+        if os.path.exists(path):
+            os.remove(path)
+    return entries
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Diario de cambios de un JSON de escape rooms")
+    parser.add_argument('instantanea', nargs='?', default="../assets/escape_rooms_completo.json",
+                        help="JSON de escape rooms")
+    parser.add_argument('--compactar', action='store_true', help="Aplicar el diario al JSON y vaciarlo")
+    args = parser.parse_args()
+
+    if args.compactar:
+        entries = compact(args.instantanea)
+        logger.info(f"✅ {args.instantanea} compactado ({entries} entradas)")
+        return
+
+    changes, _ = read_journal(args.instantanea)
+    by_step = Counter(entry['paso'] for entries in changes.values() for entry in entries)
+    if not by_step:
+        logger.info(f"✅ {args.instantanea}: sin cambios pendientes")
+    for step, count in by_step.most_common():
+        logger.info(f"📝 {step}: {count} entradas pendientes")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@
 Mapeo manual de empresas conocidas con sus logos
 """
 
-import json
+from change_journal import ChangeJournal
 
 # Mapeo de empresas conocidas con sus URLs de logo
 COMPANY_LOGOS = {
@@ -79,11 +79,6 @@ def main():
 
     json_path = "/Users/alejandra/escape_room_application/assets/escape_rooms_completo.json"
 
-    with open(json_path, 'r', encoding='utf-8') as f:
-        escape_rooms = json.load(f)
-
-    print(f"📊 {len(escape_rooms)} escape rooms encontrados\n")
-
     # Estadísticas
     stats = {
         'manual_mapping': 0,
@@ -92,38 +87,39 @@ def main():
         'generic_er': 0
     }
 
-    for idx, room in enumerate(escape_rooms, 1):
-        empresa = room.get('empresa', '')
-        web = room.get('web', '')
-        nombre = room.get('nombre', room.get('text', ''))
-
-        # Obtener logo
-        old_logo = room.get('imagenUrl', '')
-        logo_url = get_logo_for_company(empresa, web)
-        room['imagenUrl'] = logo_url
-
-        # Estadísticas
-        empresa_lower = empresa.lower() if empresa else ''
-        found_in_mapping = any(key in empresa_lower for key in COMPANY_LOGOS.keys())
-
-        if found_in_mapping:
-            stats['manual_mapping'] += 1
-        elif web and web not in ['/', '#', ''] and 'clearbit.com' in logo_url:
-            stats['clearbit_domain'] += 1
-        elif empresa and 'ui-avatars' in logo_url:
-            stats['generic_initials'] += 1
-        else:
-            stats['generic_er'] += 1
-
-        if idx % 100 == 0:
-            print(f"[{idx}/{len(escape_rooms)}] Procesados...")
-
-    # Guardar
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(escape_rooms, f, ensure_ascii=False, indent=2)
+    total = 0
+
+    # Registro a registro; al diario sólo van los logos que cambian
+    with ChangeJournal(json_path, 'company_logos_mapping') as journal:
+        for idx, (key, room) in enumerate(journal.rooms(), 1):
+            total = idx
+            empresa = room.get('empresa', '')
+            web = room.get('web', '')
+            nombre = room.get('nombre', room.get('text', ''))
+
+            # Obtener logo
+            old_logo = room.get('imagenUrl', '')
+            logo_url = get_logo_for_company(empresa, web)
+            journal.set(key, room, 'imagenUrl', logo_url)
+
+            # Estadísticas
+            empresa_lower = empresa.lower() if empresa else ''
+            found_in_mapping = any(key in empresa_lower for key in COMPANY_LOGOS.keys())
+
+            if found_in_mapping:
+                stats['manual_mapping'] += 1
+            elif web and web not in ['/', '#', ''] and 'clearbit.com' in logo_url:
+                stats['clearbit_domain'] += 1
+            elif empresa and 'ui-avatars' in logo_url:
+                stats['generic_initials'] += 1
+            else:
+                stats['generic_er'] += 1
+
+            if idx % 100 == 0:
+                print(f"[{idx}] Procesados...")
 
     print(f"\n{'='*70}")
-    print(f"✅ Logos actualizados para {len(escape_rooms)} escape rooms")
+    print(f"✅ Logos actualizados para {total} escape rooms")
     print(f"{'='*70}")
     print(f"\n📊 Distribución de logos:")
     print(f"  🎯 Empresas conocidas (mapeo manual): {stats['manual_mapping']}")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Conexiones SQLite compartidas por los scripts que escriben en words.db.
+
+Modo de carga masiva (BulkLoad):
+
+- journal_mode=WAL y synchronous=OFF mientras dura la carga; al terminar se
+  restauran los valores que tenía la BD
+- cache_size grande, temp_store=MEMORY y page_size mayor (sólo si la BD
+  está vacía: en una BD con datos exige un VACUUM)
+- una transacción por lote de filas en vez de un commit por fila
+- al cerrar: checkpoint del WAL, ANALYZE y filas por segundo
+
+La app abre la BD después, así que siempre se deja en su modo de diario
+original y sin fichero -wal pendiente.
+
+Uso:
+    with BulkLoad(db_path) as bulk:
+        for room in rooms:
+            bulk.conn.execute("INSERT ...", params)
+            bulk.row()
+    print(bulk.stats)
+
+    python3 db_utils.py --bench     # comparación con el modo por defecto
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+CACHE_SIZE_KIB = 64 * 1024     # 64 MiB
+PAGE_SIZE = 8192
+
+
+def _pragma(conn: sqlite3.Connection, name: str):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+class BulkLoad:
+    """
+    Conexión en modo de carga masiva con commits por lotes
+
+    Args:
+        db_path: Ruta de la BD
+        batch_size: Filas por transacción
+        analyze: Ejecutar ANALYZE al terminar
+    """
+
+    def __init__(self, db_path: str, batch_size: int = BATCH_SIZE, analyze: bool = True):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.analyze = analyze
+        self.conn: Optional[sqlite3.Connection] = None
+        self.rows = 0
+        self.stats: Dict[str, float] = {}
+        self._pending = 0
+        self._saved: Dict[str, object] = {}
+        self._start = 0.0
+
+    def __enter__(self) -> 'BulkLoad':
+        # Transacciones manuales: BEGIN/COMMIT por lote
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn = self.conn
+        self._saved = {
+            'journal_mode': _pragma(conn, 'journal_mode'),
+            'synchronous': _pragma(conn, 'synchronous'),
+        }
+        if _pragma(conn, 'page_count') == 0:
+            conn.execute(f"PRAGMA page_size = {PAGE_SIZE}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("BEGIN")
+        self._start = time.perf_counter()
+        return self
+
+    def row(self, count: int = 1):
+        """Anota filas escritas; hace commit cada `batch_size`"""
+        self.rows += count
+        self._pending += count
+        if self._pending >= self.batch_size:
+            self.commit()
+
+    def commit(self):
+        """Cierra el lote actual y abre otro"""
+        self.conn.execute("COMMIT")
+        self.conn.execute("BEGIN")
+        self._pending = 0
+
+    def __exit__(self, exc_type, exc, tb):
+        conn = self.conn
+        try:
+            conn.execute("ROLLBACK" if exc_type else "COMMIT")
+            elapsed = time.perf_counter() - self._start
+            self.finalize()
+            self.stats = {
+                'filas': self.rows,
+                'segundos': elapsed,
+                'filas_por_segundo': self.rows / elapsed if elapsed else 0.0,
+            }
+            if not exc_type:
+                logger.info(f"⚡ {self.rows} filas en {elapsed:.2f}s "
+                            f"({self.stats['filas_por_segundo']:,.0f} filas/s)")
+        finally:
+            conn.close()
+        return False
+
+    def finalize(self):
+        """Checkpoint del WAL, ANALYZE y pragmas originales"""
+        conn = self.conn
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if self.analyze:
+            conn.execute("ANALYZE")
+        conn.execute(f"PRAGMA journal_mode = {self._saved['journal_mode']}")
+        conn.execute(f"PRAGMA synchronous = {self._saved['synchronous']}")
+
+
+# ===========================================
+# BENCHMARK
+# ===========================================
+
+_BENCH_SCHEMA = """
+    CREATE TABLE words (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT, ubicacion TEXT, genero TEXT, descripcion TEXT,
+        latitud REAL, longitud REAL
+    )
+"""
+_BENCH_INSERT = "INSERT INTO words (text, ubicacion, genero, descripcion, latitud, longitud) VALUES (?, ?, ?, ?, ?, ?)"
+
+
+def _bench_rows(count: int):
+    for i in range(count):
+        yield (f"Sala {i}", f"Calle {i}, 28001 Madrid", "Aventura", "x" * 200, 40.4 + i * 1e-5, -3.7)
+
+
+def benchmark(rows: int = 5000) -> Dict[str, float]:
+    """Filas por segundo: commit por fila (como los scripts antes) frente a BulkLoad"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "default.db")
+        conn = sqlite3.connect(path)
+        conn.execute(_BENCH_SCHEMA)
+        start = time.perf_counter()
+        for params in _bench_rows(rows):
+            conn.execute(_BENCH_INSERT, params)
+            conn.commit()
+        elapsed = time.perf_counter() - start
+        conn.close()
+        results['por_defecto'] = rows / elapsed
+
+        path = os.path.join(tmp, "bulk.db")
+        sqlite3.connect(path).execute(_BENCH_SCHEMA).connection.close()
+        with BulkLoad(path) as bulk:
+            for params in _bench_rows(rows):
+                bulk.conn.execute(_BENCH_INSERT, params)
+                bulk.row()
+        results['carga_masiva'] = bulk.stats['filas_por_segundo']
+
+    print(f"📋 {rows} inserciones")
+    print(f"{'commit por fila':<20}: {results['por_defecto']:>10,.0f} filas/s")
+    print(f"{'BulkLoad':<20}: {results['carga_masiva']:>10,.0f} filas/s "
+          f"(x{results['carga_masiva'] / results['por_defecto']:.1f})")
+    return results
+
+
+if __name__ == "__main__":
+    if '--bench' in sys.argv:
+        benchmark()
+        sys.exit(0)
+    print(__doc__)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Snapshot persistente de claves de duplicados de la BD SQLite.
+
+Los scrapers y el importador necesitan las claves normalizadas de todos los
+escape rooms de `words` para detectar duplicados. En vez de abrir la BD,
+leer todas las filas y recalcular las claves en cada arranque, se genera una
+vez (tras cada importación) un fichero `<bd>.dedup` con:
+
+- clave MD5 de nombre + ciudad (la de scrape_all_sources.py)
+- nombre normalizado y ciudad (los bloques de import_to_database.py)
+- ubicación original y coordenadas
+- teléfono en E.164 (coincidencia exacta teléfono + nombre)
+
+El fichero se invalida cuando cambia la BD (fecha de modificación o tamaño
+de la BD y de su `-wal`, número de filas e id máximo) y se lee con mmap al
+arrancar. El `-wal` cuenta porque con journal_mode=WAL (db_utils.BulkLoad)
+las filas nuevas pueden quedarse ahí sin que el fichero principal cambie.
+
+Uso:
+    python3 dedup_snapshot.py ruta/a/words.db
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from typing import List, NamedTuple, Optional
+
+from gazetteer import city_of
+from normalization import normalize_text
+from phones import normalize_phone
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 5
+SNAPSHOT_SUFFIX = ".dedup"
+
+
+# ===========================================
+# CLAVES (compartidas con los scrapers y el importador)
+# ===========================================
+
+def room_key(nombre: str, ubicacion: str) -> str:
+    """Clave MD5 de nombre + ciudad usada por scrape_all_sources.py"""
+    key = f"{normalize_text(nombre)}_{city_of(ubicacion)}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def extract_city(ubicacion: str) -> str:
+    """Extrae la ciudad de una ubicación completa"""
+    return city_of(ubicacion)
+
+
+# ===========================================
+# SNAPSHOT
+# ===========================================
+
+class SnapshotRow(NamedTuple):
+    id: int
+    key: str
+    nombre: str
+    nombre_norm: str
+    ciudad: str
+    ubicacion: str
+    latitud: Optional[float]
+    longitud: Optional[float]
+    telefono: Optional[str] = None
+
+
+def snapshot_path(db_path: str) -> str:
+    """Ruta del snapshot asociado a una BD"""
+    return db_path + SNAPSHOT_SUFFIX
+
+
+def make_row(row_id: int, nombre: str, ubicacion: Optional[str], lat=None, lng=None,
+             telefono=None) -> SnapshotRow:
+    """Calcula todas las claves de una fila"""
+    nombre = nombre or ""
+    ubicacion = ubicacion or ""
+    return SnapshotRow(
+        row_id, room_key(nombre, ubicacion), nombre, normalize_text(nombre),
+        extract_city(ubicacion), ubicacion, lat, lng, normalize_phone(telefono),
+    )
+
+
+def _db_signature(db_path: str) -> dict:
+    stat = os.stat(db_path)
+    try:
+        wal = os.stat(db_path + "-wal")
+        wal_signature = [wal.st_mtime_ns, wal.st_size]
+    except FileNotFoundError:
+        wal_signature = None
+    return {'db_mtime_ns': stat.st_mtime_ns, 'db_size': stat.st_size, 'wal': wal_signature}
+
+
+def _db_contents(conn: sqlite3.Connection) -> dict:
+    count, max_id = conn.execute("SELECT COUNT(*), MAX(id) FROM words").fetchone()
+    return {'row_count': count, 'max_id': max_id}
+
+
+def build_snapshot(db_path: str, path: Optional[str] = None) -> List[SnapshotRow]:
+    """Lee la tabla words, calcula las claves y escribe el snapshot"""
+    path = path or snapshot_path(db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = [
+            make_row(*row)
+            for row in conn.execute("SELECT id, text, ubicacion, latitud, longitud, telefono FROM words ORDER BY id")
+        ]
+    finally:
+        conn.close()
+
+    header = {'version': SNAPSHOT_VERSION, 'row_count': len(rows),
+              'max_id': rows[-1].id if rows else None, **_db_signature(db_path)}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(header) + "\n")
+        for row in rows:
+            f.write(json.dumps(list(row), ensure_ascii=False, separators=(',', ':')) + "\n")
+    os.replace(tmp_path, path)
+
+    logger.info(f"💾 Snapshot de duplicados: {len(rows)} filas en {path}")
+    return rows
+
+
+def load_snapshot(db_path: str, path: Optional[str] = None,
+                  conn: Optional[sqlite3.Connection] = None) -> Optional[List[SnapshotRow]]:
+    """
+    Lee el snapshot con mmap si sigue siendo válido para la BD
+
+    Args:
+        db_path: Ruta de la BD
+        path: Ruta del snapshot (por defecto `<db_path>.dedup`)
+        conn: Conexión ya abierta para comparar número de filas e id máximo
+              (si no se pasa, se abre una)
+
+    Returns:
+        Las filas, o None si no existe o está desactualizado
+    """
+    path = path or snapshot_path(db_path)
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+
+    with f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # fichero vacío
+            return None
+
+        with mm:
+            try:
+                header = json.loads(mm.readline())
+            except json.JSONDecodeError:
+                return None
+
+            if header.get('version') != SNAPSHOT_VERSION:
+                return None
+            signature = _db_signature(db_path)
+            if any(header.get(k) != v for k, v in signature.items()):
+                return None
+            if conn is not None:
+                contents = _db_contents(conn)
+            else:
+                with closing(sqlite3.connect(db_path)) as own_conn:
+                    contents = _db_contents(own_conn)
+            if any(header.get(k) != v for k, v in contents.items()):
+                return None
+
+            rows = [SnapshotRow(*json.loads(line)) for line in iter(mm.readline, b"")]
+
+    return rows if len(rows) == header.get('row_count') else None
+
+
+def load_or_build_snapshot(db_path: str, conn: Optional[sqlite3.Connection] = None) -> List[SnapshotRow]:
+    """Snapshot válido de la BD, regenerándolo si hace falta"""
+    rows = load_snapshot(db_path, conn=conn)
+    if rows is not None:
+        logger.info(f"⚡ Snapshot de duplicados reutilizado ({len(rows)} filas)")
+        return rows
+    logger.info("🔄 Snapshot de duplicados ausente o desactualizado, regenerando...")
+    return build_snapshot(db_path)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if len(sys.argv) != 2:
+        print("Uso: python3 dedup_snapshot.py ruta/a/words.db")
+        sys.exit(1)
+    build_snapshot(sys.argv[1])
+
+
+if __name__ == "__main__":
+    main()
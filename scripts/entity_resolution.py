@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Resolución de entidades entre fuentes de escape rooms.
+
+Lee todos los JSON del proyecto (y opcionalmente la BD SQLite), agrupa los
+registros que describen la misma sala con union-find sobre pares candidatos
+(bloqueados por nombre normalizado y por proximidad geográfica) y asigna a cada grupo un ID canónico
+estable. El resultado es una tabla fuente → ID canónico que el merge y la
+importación usan como join directo en vez de repetir comparaciones difusas.
+
+Uso:
+    python3 entity_resolution.py                 # sólo JSON
+    python3 entity_resolution.py --db words.db   # JSON + BD
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from gazetteer import city_of
+from geo_index import DEFAULT_RADIUS_M, GeoGridIndex, has_coordinates, haversine_m
+from normalization import fold
+from phones import normalize_phone
+from similarity import is_similar
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SCRIPT_DIR)
+
+# Fuentes conocidas (rutas relativas a la raíz del repositorio)
+DEFAULT_SOURCES = [
+    "escape_rooms_scraped.json",
+    "escape_rooms_escaperoos.json",
+    "escape_rooms_detallado.json",
+    "assets/escape_rooms_completo.json",
+    "assets/escape_rooms_seed.json",
+    "assets/escape_rooms_nuevos.json",
+    "scripts/escaperoomlover_api.json",
+    "scripts/escaperoomlover_completo.json",
+    "scripts/escaperoomlover_manual.json",
+    "scripts/nuevos_escape_rooms.json",
+    "scripts/nuevos_escape_rooms_combinado.json",
+]
+
+DEFAULT_MAPPING_FILE = os.path.join(SCRIPT_DIR, "canonical_ids.json")
+
+# Umbral de similitud de nombre (mismo criterio que scrape_all_sources.py)
+NAME_THRESHOLD = 0.85
+
+INVALID_NAMES = ('no disponible', 'oops', 'página no encontrada', 'error 404', 'error', '404')
+
+# Palabras que no aportan al bloqueo por nombre
+BLOCK_STOP_WORDS = {
+    'escape', 'room', 'rooms', 'escaperoom', 'the', 'el', 'la', 'los', 'las',
+    'de', 'del', 'un', 'una',
+}
+
+
+
+# ===========================================
+# NORMALIZACIÓN
+# ===========================================
+
+def extract_city(ubicacion: Optional[str]) -> str:
+    """Ciudad normalizada según el nomenclátor (gazetteer.py)"""
+    return city_of(ubicacion)
+
+
+def is_valid_name(nombre: Optional[str]) -> bool:
+    """Mismo filtro que ParsingUtils.isValidNombre en la app"""
+    if not nombre:
+        return False
+    lower = nombre.lower().strip()
+    if any(invalid in lower for invalid in INVALID_NAMES):
+        return False
+    return len(nombre) >= 3
+
+
+def record_key(source: str, room: Dict) -> str:
+    """Clave estable de un registro dentro de su fuente (no depende del orden)"""
+    if room.get('_db_id') is not None:
+        return f"{source}#{room['_db_id']}"
+    raw = "|".join([
+        fold(room.get('nombre') or room.get('text')),
+        fold(room.get('ubicacion')),
+        (room.get('web') or '').strip().lower(),
+    ])
+    return f"{source}#{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+def block_keys(nombre_norm: str) -> List[str]:
+    """Claves de bloqueo: nombre completo y primera palabra significativa"""
+    keys = [f"n:{nombre_norm}"]
+    tokens = [t for t in nombre_norm.split() if t not in BLOCK_STOP_WORDS]
+    if tokens:
+        keys.append(f"t:{tokens[0][:5]}")
+    return keys
+
+
+# ===========================================
+# UNION-FIND
+# ===========================================
+
+class UnionFind:
+    """Union-find con compresión de caminos y unión por tamaño"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int) -> bool:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+        return True
+
+    def groups(self) -> Dict[int, List[int]]:
+        result = defaultdict(list)
+        for i in range(len(self.parent)):
+            result[self.find(i)].append(i)
+        return result
+
+
+# ===========================================
+# CARGA DE FUENTES
+# ===========================================
+
+def source_name(path: str) -> str:
+    """Nombre de la fuente: ruta relativa a la raíz del repositorio"""
+    return os.path.relpath(os.path.abspath(path), REPO_ROOT).replace(os.sep, '/')
+
+
+def load_json_source(path: str) -> List[Dict]:
+    """Carga una fuente JSON (lista de registros); devuelve [] si no es válida"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        logger.info(f"ℹ️ Fuente no encontrada: {path}")
+        return []
+    except json.JSONDecodeError as e:
+        logger.warning(f"⚠️ JSON inválido en {path}: {e}")
+        return []
+
+    if not isinstance(data, list):
+        logger.warning(f"⚠️ {path} no contiene una lista de escape rooms")
+        return []
+    return [r for r in data if isinstance(r, dict)]
+
+
+def load_db_source(db_path: str) -> List[Dict]:
+    """Carga los escape rooms de la tabla words de SQLite"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute("SELECT id, text, ubicacion, web, latitud, longitud, telefono FROM words")
+        return [
+            {'_db_id': row_id, 'nombre': text, 'ubicacion': ubicacion, 'web': web,
+             'latitud': lat, 'longitud': lng, 'telefono': telefono}
+            for row_id, text, ubicacion, web, lat, lng, telefono in cursor.fetchall()
+        ]
+    finally:
+        conn.close()
+
+
+class Record:
+    """Registro mínimo necesario para la resolución"""
+
+    __slots__ = ('key', 'source', 'nombre', 'nombre_norm', 'ciudad', 'lat', 'lng', 'telefono')
+
+    def __init__(self, key: str, source: str, nombre: str, ubicacion: str, lat=None, lng=None,
+                 telefono=None):
+        self.key = key
+        self.source = source
+        self.nombre = nombre
+        self.nombre_norm = fold(nombre)
+        self.ciudad = extract_city(ubicacion)
+        self.telefono = normalize_phone(telefono)
+        if has_coordinates(lat, lng):
+            self.lat, self.lng = float(lat), float(lng)
+        else:
+            self.lat = self.lng = None
+
+
+def collect_records(sources: Iterable[Tuple[str, List[Dict]]]) -> List[Record]:
+    """Convierte las fuentes en registros, sin repetir claves"""
+    records = []
+    seen = set()
+    for source, rooms in sources:
+        for room in rooms:
+            nombre = room.get('nombre') or room.get('text') or ''
+            if not is_valid_name(nombre):
+                continue
+            key = record_key(source, room)
+            if key in seen:
+                continue
+            seen.add(key)
+            records.append(Record(
+                key, source, nombre, room.get('ubicacion') or '',
+                room.get('latitud'), room.get('longitud'), room.get('telefono'),
+            ))
+    return records
+
+
+# ===========================================
+# RESOLUCIÓN
+# ===========================================
+
+def names_match(a: Record, b: Record) -> bool:
+    """Nombre normalizado idéntico o similitud >= NAME_THRESHOLD"""
+    if a.nombre_norm == b.nombre_norm:
+        return True
+    return is_similar(a.nombre_norm, b.nombre_norm, NAME_THRESHOLD)
+
+
+def is_match(a: Record, b: Record, radius_m: float = DEFAULT_RADIUS_M) -> bool:
+    """
+    Decide si dos registros son la misma sala
+
+    Mismo teléfono y mismo nombre es coincidencia directa. Con coordenadas
+    en ambos y a menos de `radius_m` basta con el nombre, aunque las
+    ubicaciones estén escritas de forma totalmente distinta. Si no, hace falta
+    la misma información de ciudad.
+    """
+    if a.telefono and a.telefono == b.telefono and a.nombre_norm == b.nombre_norm:
+        return True
+    if a.lat is not None and b.lat is not None and haversine_m(a.lat, a.lng, b.lat, b.lng) <= radius_m:
+        return names_match(a, b)
+    if a.ciudad != b.ciudad:
+        return False
+    if a.nombre_norm == b.nombre_norm:
+        return True
+    if not a.ciudad:
+        return False
+    return names_match(a, b)
+
+
+def candidate_pairs(records: List[Record], radius_m: float = DEFAULT_RADIUS_M) -> Iterable[Tuple[int, int]]:
+    """Pares candidatos: registros que comparten clave de bloqueo o están cerca"""
+    blocks = defaultdict(list)
+    geo = GeoGridIndex(radius_m)
+    for idx, record in enumerate(records):
+        for key in block_keys(record.nombre_norm):
+            blocks[key].append(idx)
+        geo.add(idx, record.lat, record.lng)
+
+    emitted = set()
+    for members in blocks.values():
+        for i in range(len(members)):
+            for j in range(i + 1, len(members)):
+                pair = (members[i], members[j])
+                if pair not in emitted:
+                    emitted.add(pair)
+                    yield pair
+
+    for a, b, _ in geo.pairs():
+        pair = (a, b) if a < b else (b, a)
+        if pair not in emitted:
+            emitted.add(pair)
+            yield pair
+
+
+def cluster(records: List[Record], radius_m: float = DEFAULT_RADIUS_M) -> List[List[int]]:
+    """
+    Agrupa los registros que son la misma sala
+
+    Los registros sin ciudad se enlazan en una segunda pasada y sólo si su
+    nombre apunta a un único grupo; si no, harían de puente entre salas
+    homónimas de ciudades distintas.
+    """
+    uf = UnionFind(len(records))
+    compared = 0
+    for i, j in candidate_pairs(records, radius_m):
+        compared += 1
+        if is_match(records[i], records[j], radius_m):
+            uf.union(i, j)
+
+    by_name = defaultdict(set)
+    for idx, record in enumerate(records):
+        if record.ciudad:
+            by_name[record.nombre_norm].add(idx)
+
+    attached = 0
+    for idx, record in enumerate(records):
+        if record.ciudad:
+            continue
+        roots = {uf.find(m) for m in by_name.get(record.nombre_norm, ())}
+        if len(roots) == 1:
+            uf.union(idx, roots.pop())
+            attached += 1
+
+    logger.info(f"🔗 {compared} pares candidatos comparados, {attached} registros sin ciudad enlazados")
+    return sorted(uf.groups().values(), key=lambda members: min(records[m].key for m in members))
+
+
+def mint_id(seed: str) -> str:
+    """ID canónico nuevo y determinista"""
+    return "er_" + hashlib.sha1(seed.encode('utf-8')).hexdigest()[:12]
+
+
+def assign_ids(records: List[Record], clusters: List[List[int]], previous: Dict[str, str]) -> Dict[str, Dict]:
+    """
+    Asigna IDs canónicos estables
+
+    Un grupo reutiliza el ID que ya tenían la mayoría de sus miembros. Si un
+    grupo se parte, el fragmento más grande conserva el ID y el resto recibe
+    uno nuevo.
+    """
+    rooms: Dict[str, Dict] = {}
+    ordered = sorted(clusters, key=len, reverse=True)
+
+    for members in ordered:
+        votes = Counter(previous[records[m].key] for m in members if records[m].key in previous)
+        canonical_id = None
+        for candidate, _ in sorted(votes.items(), key=lambda kv: (-kv[1], kv[0])):
+            if candidate not in rooms:
+                canonical_id = candidate
+                break
+
+        if canonical_id is None:
+            rep = min((records[m] for m in members), key=lambda r: (r.nombre_norm, r.ciudad, r.key))
+            seed = f"{rep.nombre_norm}|{rep.ciudad}"
+            canonical_id = mint_id(seed)
+            suffix = 1
+            while canonical_id in rooms:
+                canonical_id = mint_id(f"{seed}|{suffix}")
+                suffix += 1
+
+        rep = min((records[m] for m in members), key=lambda r: (r.source.startswith('db:'), r.key))
+        rooms[canonical_id] = {
+            'nombre': rep.nombre,
+            'ciudad': rep.ciudad,
+            'miembros': sorted(records[m].key for m in members),
+        }
+
+    return rooms
+
+
+def assign_catalog_ids(rooms: List[Dict], taken: Iterable[str] = ()) -> List[str]:
+    """
+    ID canónico de cada sala de un catálogo (columna canonicalId de words)
+
+    Usa el canonical_id que deja merge_data.py. Si no lo hay, uno
+    determinista con la semilla de assign_ids (nombre + ciudad), o con la
+    ubicación completa si esa ya la tiene otra sala del catálogo.
+    """
+    used = set(taken)
+    ids = []
+    for room in rooms:
+        nombre_norm = fold(room.get('text') or room.get('nombre'))
+        ubicacion = room.get('ubicacion')
+        candidates = [
+            room.get('canonical_id'),
+            mint_id(f"{nombre_norm}|{extract_city(ubicacion)}"),
+            mint_id(f"{nombre_norm}|{fold(ubicacion)}"),
+        ]
+        canonical_id = next((c for c in candidates if c and c not in used), None)
+        suffix = 1
+        while canonical_id is None or canonical_id in used:
+            canonical_id = mint_id(f"{nombre_norm}|{fold(ubicacion)}|{suffix}")
+            suffix += 1
+        used.add(canonical_id)
+        ids.append(canonical_id)
+    return ids
+
+
+def resolve(sources: Iterable[Tuple[str, List[Dict]]], previous: Optional[Dict[str, str]] = None,
+            radius_m: float = DEFAULT_RADIUS_M) -> Dict:
+    """Ejecuta la resolución completa y devuelve la tabla de mapeo"""
+    records = collect_records(sources)
+    with_coords = sum(1 for r in records if r.lat is not None)
+    logger.info(f"📋 {len(records)} registros válidos ({with_coords} con coordenadas)")
+
+    clusters = cluster(records, radius_m)
+    rooms = assign_ids(records, clusters, previous or {})
+
+    mapping = {}
+    for canonical_id, room in rooms.items():
+        for key in room['miembros']:
+            mapping[key] = canonical_id
+
+    return {'version': 1, 'rooms': rooms, 'mapping': mapping}
+
+
+# ===========================================
+# TABLA DE MAPEO
+# ===========================================
+
+def load_mapping(path: str = DEFAULT_MAPPING_FILE) -> Dict:
+    """Carga la tabla de mapeo; vacía si todavía no se ha generado"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'version': 1, 'rooms': {}, 'mapping': {}}
+
+
+def save_mapping(table: Dict, path: str = DEFAULT_MAPPING_FILE):
+    """Guarda la tabla de mapeo"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(table, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def canonical_id_for(table: Dict, source: str, room: Dict) -> Optional[str]:
+    """ID canónico de un registro de una fuente, si la resolución lo conoce"""
+    return room.get('canonical_id') or table.get('mapping', {}).get(record_key(source, room))
+
+
+def db_member_ids(table: Dict, canonical_id: Optional[str]) -> List[int]:
+    """
+    ids de words de las filas de la BD en el grupo canónico
+
+    Son los de la BD que se pasó con --db al generar la tabla, que puede no
+    ser la misma ni estar al día: hay que comprobarlos contra la BD destino.
+    """
+    room = table.get('rooms', {}).get(canonical_id or '')
+    if not room:
+        return []
+    return [int(m.rsplit('#', 1)[1]) for m in room['miembros'] if m.startswith('db:') and m.rsplit('#', 1)[1].isdigit()]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Resolución de entidades entre fuentes de escape rooms")
+    parser.add_argument('sources', nargs='*', help="Fuentes JSON (por defecto, todas las conocidas)")
+    parser.add_argument('--db', help="BD SQLite a incluir como fuente")
+    parser.add_argument('--output', default=DEFAULT_MAPPING_FILE, help="Tabla de mapeo de salida")
+    parser.add_argument('--radio', type=float, default=DEFAULT_RADIUS_M,
+                        help=f"Radio en metros para candidatos por proximidad (por defecto {DEFAULT_RADIUS_M})")
+    args = parser.parse_args()
+    if not (args.radio > 0 and math.isfinite(args.radio)):
+        parser.error("--radio debe ser un número de metros mayor que 0")
+
+    logger.info("=" * 60)
+    logger.info("RESOLUCIÓN DE ENTIDADES ENTRE FUENTES")
+    logger.info("=" * 60)
+
+    paths = args.sources or [os.path.join(REPO_ROOT, p) for p in DEFAULT_SOURCES]
+    sources = [(source_name(p), load_json_source(p)) for p in paths]
+    if args.db:
+        sources.append(('db:words', load_db_source(args.db)))
+
+    for name, rooms in sources:
+        if rooms:
+            logger.info(f"📂 {name}: {len(rooms)} registros")
+
+    previous = load_mapping(args.output).get('mapping', {})
+    table = resolve(sources, previous, args.radio)
+    save_mapping(table, args.output)
+
+    reused = sum(1 for key, cid in table['mapping'].items() if previous.get(key) == cid)
+    logger.info(f"\n📊 Resumen:")
+    logger.info(f"   - Registros: {len(table['mapping'])}")
+    logger.info(f"   - Salas canónicas: {len(table['rooms'])}")
+    logger.info(f"   - IDs conservados de la ejecución anterior: {reused}")
+    logger.info(f"💾 Tabla de mapeo guardada en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,10 @@
 Script para actualizar las URLs de imágenes usando Picsum Photos (más confiable que Unsplash)
 """
 
-import json
 import hashlib
 
+from change_journal import ChangeJournal
+
 def get_picsum_image(seed_text):
     """Obtiene una URL de imagen de Picsum Photos con seed para consistencia"""
     # Usar hash del texto como seed para obtener siempre la misma imagen
@@ -26,30 +27,19 @@ def main():
     # Leer JSON original
     json_path = "/Users/alejandra/escape_room_application/assets/escape_rooms_completo.json"
 
-    with open(json_path, 'r', encoding='utf-8') as f:
-        escape_rooms = json.load(f)
-
-    print(f"📊 {len(escape_rooms)} escape rooms encontrados\n")
-
-    # Actualizar imágenes
+    # Actualizar imágenes registro a registro; al diario sólo van las que cambian
     updated = 0
+    with ChangeJournal(json_path, 'fix_images_picsum') as journal:
+        for idx, (key, room) in enumerate(journal.rooms(), 1):
+            nombre = room.get('nombre', room.get('text', ''))
 
-    for idx, room in enumerate(escape_rooms, 1):
-        nombre = room.get('nombre', room.get('text', ''))
-
-        # Generar URL de imagen usando el nombre como seed para consistencia
-        seed = f"{nombre}"
-        imagen_url = get_picsum_image(seed)
-        room['imagenUrl'] = imagen_url
-
-        updated += 1
-
-        if idx % 100 == 0:
-            print(f"[{idx}/{len(escape_rooms)}] Procesados...")
+            # Generar URL de imagen usando el nombre como seed para consistencia
+            seed = f"{nombre}"
+            imagen_url = get_picsum_image(seed)
+            updated += journal.set(key, room, 'imagenUrl', imagen_url)
 
-    # Guardar JSON actualizado
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(escape_rooms, f, ensure_ascii=False, indent=2)
+            if idx % 100 == 0:
+                print(f"[{idx}] Procesados...")
 
     print(f"\n{'='*70}")
     print(f"✅ {updated} imágenes actualizadas a Picsum Photos")
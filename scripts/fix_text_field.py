@@ -4,43 +4,35 @@ Agrega el campo 'text' a los registros que no lo tienen,
 copiando el valor del campo 'nombre'
 """
 
-import json
 import logging
 
+from change_journal import ChangeJournal
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 def main():
     input_file = '../assets/escape_rooms_completo.json'
 
-    logging.info(f"📂 Cargando datos de {input_file}...")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    logging.info(f"✓ {len(data)} escape rooms cargados")
-
-    # Contar cuántos necesitan el campo text
-    missing_text = sum(1 for r in data if not r.get('text'))
-    logging.info(f"📊 Registros sin campo 'text': {missing_text}")
-
-    # Agregar el campo text donde falta
+    logging.info(f"📂 Procesando {input_file} registro a registro...")
+    total = 0
+    missing_text = 0
     fixed = 0
-    for record in data:
-        if not record.get('text') and record.get('nombre'):
-            record['text'] = record['nombre']
-            fixed += 1
 
+    # Agregar el campo text donde falta (sólo se anotan en el diario los cambios)
+    with ChangeJournal(input_file, 'fix_text_field') as journal:
+        for key, record in journal.rooms():
+            total += 1
+            if not record.get('text'):
+                missing_text += 1
+                if record.get('nombre'):
+                    journal.set(key, record, 'text', record['nombre'])
+                    fixed += 1
+
+    logging.info(f"✓ {total} escape rooms procesados")
+    logging.info(f"📊 Registros sin campo 'text': {missing_text}")
     logging.info(f"✓ Agregado campo 'text' a {fixed} registros")
-
-    # Guardar
-    logging.info(f"💾 Guardando en {input_file}...")
-    with open(input_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
     logging.info("✅ ¡Archivo actualizado exitosamente!")
-
-    # Verificar
-    missing_after = sum(1 for r in data if not r.get('text'))
-    logging.info(f"📊 Registros sin 'text' después de la corrección: {missing_after}")
+    logging.info(f"📊 Registros sin 'text' después de la corrección: {missing_text - fixed}")
 
 if __name__ == '__main__':
     main()
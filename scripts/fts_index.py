@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Índice de texto completo (FTS5) del catálogo en words.db.
+
+`words_fts` es una tabla FTS5 de contenido externo sobre `words` (no duplica
+el texto) con las columnas text, empresa, ubicacion y descripcion:
+
+- tokenizador unicode61 sin acentos ("Cádiz" = "cadiz", "TERROR" = "terror")
+- índices de prefijo de 2 y 3 caracteres para la búsqueda mientras se escribe
+- orden por BM25, con más peso para el nombre que para la descripción
+
+El índice se reconstruye al importar (import_to_database.py,
+add_missing_escapes_to_db.py). Los triggers de sincronización son opcionales
+(--triggers): la app escribe en `words` con el SQLite del sistema, que en
+Android no siempre trae FTS5, y un trigger sobre una tabla FTS5 rompería
+esas escrituras.
+
+Uso:
+    python3 fts_index.py --db ruta/a/words.db                  # crea/reconstruye
+    python3 fts_index.py --db ruta/a/words.db terror madrid    # busca
+    python3 fts_index.py --db ruta/a/words.db --bench 50000    # FTS5 frente a LIKE
+"""
+
+import argparse
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "words_fts"
+FTS_COLUMNS = ("text", "empresa", "ubicacion", "descripcion")
+# Pesos BM25 por columna, en el orden de FTS_COLUMNS
+FTS_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_TRIGGERS = {
+    "words_fts_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS words_fts_ai AFTER INSERT ON words BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)})
+            VALUES (new.id, {', '.join('new.' + c for c in FTS_COLUMNS)});
+        END
+    """,
+    "words_fts_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS words_fts_ad AFTER DELETE ON words BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {', '.join(FTS_COLUMNS)})
+            VALUES ('delete', old.id, {', '.join('old.' + c for c in FTS_COLUMNS)});
+        END
+    """,
+    "words_fts_au": f"""
+        CREATE TRIGGER IF NOT EXISTS words_fts_au AFTER UPDATE OF {', '.join(FTS_COLUMNS)} ON words BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {', '.join(FTS_COLUMNS)})
+            VALUES ('delete', old.id, {', '.join('old.' + c for c in FTS_COLUMNS)});
+            INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)})
+            VALUES (new.id, {', '.join('new.' + c for c in FTS_COLUMNS)});
+        END
+    """,
+}
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    """True si el SQLite de esta conexión tiene FTS5"""
+    return bool(conn.execute(
+        "SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_FTS5'"
+    ).fetchone())
+
+
+def ensure_fts(conn: sqlite3.Connection, triggers: bool = False):
+    """Crea words_fts (y, si se pide, los triggers que lo mantienen al día)"""
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            {', '.join(FTS_COLUMNS)},
+            content='words', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    for sql in _TRIGGERS.values() if triggers else ():
+        conn.execute(sql)
+
+
+def drop_fts_triggers(conn: sqlite3.Connection):
+    """Quita los triggers de sincronización (antes de copiar la BD a la app)"""
+    for name in _TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild_fts(conn: sqlite3.Connection, triggers: bool = False) -> bool:
+    """
+    Crea o reconstruye words_fts desde `words` en una sola pasada
+
+    Returns:
+        False si el SQLite no tiene FTS5 (el índice se omite)
+    """
+    if not fts5_available(conn):
+        logger.warning("⚠️ SQLite sin FTS5: se omite el índice de texto completo")
+        return False
+    ensure_fts(conn, triggers)
+    conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def fts_synced_by_triggers(conn: sqlite3.Connection) -> bool:
+    """True si words_fts existe y lo mantienen los triggers"""
+    return bool(conn.execute(
+        f"SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' for _ in _TRIGGERS)})",
+        tuple(_TRIGGERS),
+    ).fetchone())
+
+
+def fts_remove_rows(conn: sqlite3.Connection, ids: List[int]):
+    """Quita del índice las filas `ids` con sus valores actuales (antes de cambiarlas o borrarlas)"""
+    conn.executemany(f"""
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {', '.join(FTS_COLUMNS)})
+        SELECT 'delete', id, {', '.join(FTS_COLUMNS)} FROM words WHERE id = ?
+    """, [(row_id,) for row_id in ids])
+
+
+def fts_add_rows(conn: sqlite3.Connection, ids: List[int]):
+    """Indexa las filas `ids` (nuevas o ya cambiadas)"""
+    conn.executemany(f"""
+        INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)})
+        SELECT id, {', '.join(FTS_COLUMNS)} FROM words WHERE id = ?
+    """, [(row_id,) for row_id in ids])
+
+
+def match_query(text: Optional[str]) -> str:
+    """
+    Consulta MATCH para lo que escribe el usuario
+
+    Cada palabra se busca como prefijo y todas deben aparecer
+    ("terr madr" → "terr"* "madr"*). Las comillas evitan que FTS5
+    interprete AND, OR, NEAR o los guiones como operadores.
+    """
+    return ' '.join(f'"{token}"*' for token in _TOKEN_RE.findall(text or ''))
+
+
+def search(conn: sqlite3.Connection, text: str, limit: int = 20) -> List[Tuple[int, str, str, str, float]]:
+    """Salas que coinciden con `text`, de más a menos relevante: (id, text, empresa, ubicacion, bm25)"""
+    query = match_query(text)
+    if not query:
+        return []
+    return conn.execute(f"""
+        SELECT w.id, w.text, w.empresa, w.ubicacion, bm25({FTS_TABLE}, {', '.join(map(str, FTS_WEIGHTS))}) AS rank
+        FROM {FTS_TABLE} JOIN words w ON w.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH ?
+        ORDER BY rank
+        LIMIT ?
+    """, (query, limit)).fetchall()
+
+
+def search_like(conn: sqlite3.Connection, text: str) -> List[int]:
+    """Ids de todas las salas que contienen cada palabra, por LIKE (recorre la tabla; para comparar)"""
+    clauses, params = [], []
+    for token in _TOKEN_RE.findall(text or ''):
+        clauses.append('(' + ' OR '.join(f"{c} LIKE ?" for c in FTS_COLUMNS) + ')')
+        params.extend([f"%{token}%"] * len(FTS_COLUMNS))
+    if not clauses:
+        return []
+    return [row_id for (row_id,) in conn.execute(f"SELECT id FROM words WHERE {' AND '.join(clauses)}", params)]
+
+
+def search_ids(conn: sqlite3.Connection, text: str) -> List[int]:
+    """Ids de todas las salas que coinciden con `text`, sin ordenar"""
+    query = match_query(text)
+    if not query:
+        return []
+    return [row_id for (row_id,) in conn.execute(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?", (query,))]
+
+
+# ===========================================
+# BENCHMARK
+# ===========================================
+
+def benchmark(db_path: str, rows: int, queries: List[str], repeat: int = 20):
+    """Compara FTS5 y LIKE en una copia del catálogo ampliada hasta `rows` filas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        source = sqlite3.connect(db_path)
+        conn = sqlite3.connect(path)
+        conn.execute(f"CREATE TABLE words (id INTEGER PRIMARY KEY, {', '.join(c + ' TEXT' for c in FTS_COLUMNS)})")
+        catalog = source.execute(f"SELECT {', '.join(FTS_COLUMNS)} FROM words").fetchall()
+        source.close()
+        if not catalog:
+            logger.error(f"❌ {db_path} no tiene salas")
+            return
+        conn.executemany(
+            f"INSERT INTO words ({', '.join(FTS_COLUMNS)}) VALUES (?, ?, ?, ?)",
+            (catalog[i % len(catalog)] for i in range(rows)),
+        )
+        start = time.perf_counter()
+        rebuild_fts(conn)
+        conn.commit()
+        logger.info(f"🔨 Índice de {rows} filas en {time.perf_counter() - start:.2f}s")
+
+        # Todas las coincidencias con LIKE y con FTS5, y las 20 primeras por BM25
+        print(f"{'consulta':<20} {'salas':>7} {'LIKE (ms)':>10} {'FTS5 (ms)':>10} {'top 20 (ms)':>12}")
+        for query in queries:
+            timings = []
+            for fn in (search_like, search_ids, search):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    fn(conn, query)
+                timings.append((time.perf_counter() - start) * 1000 / repeat)
+            matches = len(search_ids(conn, query))
+            print(f"{query:<20} {matches:>7} {timings[0]:>10.2f} {timings[1]:>10.2f} {timings[2]:>12.2f}")
+        conn.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Índice FTS5 de búsqueda del catálogo")
+    parser.add_argument('consulta', nargs='*', help="Texto a buscar (si no, reconstruye el índice)")
+    parser.add_argument('--db', required=True, help="BD SQLite")
+    parser.add_argument('--triggers', action='store_true', help="Mantener el índice con triggers")
+    parser.add_argument('--sin-triggers', action='store_true', help="Quitar los triggers de sincronización")
+    parser.add_argument('--bench', type=int, metavar='FILAS', help="Comparar con LIKE en un catálogo de FILAS salas")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.db, args.bench, args.consulta or ["terror", "madr", "escape barcelona", "sherlock"])
+        return
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.consulta:
+            for row_id, nombre, empresa, ubicacion, rank in search(conn, ' '.join(args.consulta)):
+                print(f"{rank:8.2f}  [{row_id}] {nombre} - {empresa or ''} ({ubicacion or ''})")
+            return
+
+        start = time.perf_counter()
+        with conn:
+            if args.sin_triggers:
+                drop_fts_triggers(conn)
+            built = rebuild_fts(conn, args.triggers)
+        if built:
+            (count,) = conn.execute("SELECT COUNT(*) FROM words").fetchone()
+            logger.info(f"✅ {FTS_TABLE}: {count} salas indexadas en {time.perf_counter() - start:.2f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
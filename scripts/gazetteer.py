@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Nomenclátor offline de municipios y provincias españolas.
+
+Todos los nombres y alias (sin acentos ni símbolos) se compilan en un
+autómata Aho-Corasick, así que una ubicación se recorre una sola vez para
+encontrar todas las ciudades, islas y provincias que menciona. De ellas se
+elige la mejor:
+
+- Municipio justo después del código postal ("28001 Madrid")
+- Si no, el municipio más a la derecha (las calles con nombre de ciudad van
+  antes: "Calle Valencia 12, Barcelona"), y a igual final el más largo
+- Si no hay municipio, la isla
+- Un municipio que coincide con la provincia de otro anterior cuenta como
+  provincia ("Sitges, Barcelona" → Sitges)
+- La provincia es la del municipio (o la de la isla); si el nombre del
+  municipio existe en varias provincias, la que aparezca en el texto
+
+Datos en scripts/data/:
+- provincias_es.tsv: código INE, nombre y alias de las 52 provincias
+- municipios_es.tsv: municipios principales e islas con sus alias
+- municipios_ine.csv (opcional): nomenclátor completo del INE
+  (columnas CPRO y NOMBRE, separadas por ; o ,); si existe se añade
+
+Uso:
+    python3 gazetteer.py "Calle Mayor 3, 28801 Alcalá de Henares, España"
+"""
+
+import csv
+import os
+import re
+import sys
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from normalization import CACHE_SIZE, INVALID_VALUES, fold
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+PROVINCES_FILE = os.path.join(DATA_DIR, "provincias_es.tsv")
+MUNICIPALITIES_FILE = os.path.join(DATA_DIR, "municipios_es.tsv")
+INE_FILE = os.path.join(DATA_DIR, "municipios_ine.csv")
+
+_POSTCODE_RE = re.compile(r'\b\d{5}$')
+_POSTCODE_CITY_RE = re.compile(r'\b\d{5}\s+([^\d,·]+?)\s*(?:,|\bespaña\b|$)', re.IGNORECASE)
+# Artículos que el INE pospone: "Coruña, A", "Hospitalet de Llobregat, L'"
+_INE_ARTICLE_RE = re.compile(r"^(.*), (A|As|O|Os|El|La|Las|Los|L'|Les|Es|Sa|Ses|Lo)$")
+
+
+class Place(NamedTuple):
+    tipo: str        # 'municipio', 'isla' o 'provincia'
+    nombre: str
+    provincia: str
+
+
+class Match(NamedTuple):
+    start: int
+    end: int
+    place: Place
+
+
+# ===========================================
+# AHO-CORASICK
+# ===========================================
+
+class Automaton:
+    """Autómata Aho-Corasick sobre caracteres con coincidencias por palabra completa"""
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[int, object]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, value):
+        """Añade un patrón (ya normalizado) con su valor asociado"""
+        node = 0
+        for char in pattern:
+            nxt = self.goto[node].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        self.output[node].append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        """Calcula los enlaces de fallo (BFS)"""
+        queue = deque(self.goto[0].values())
+        for child in queue:
+            self.fail[child] = 0
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+        self._built = True
+
+    def search(self, text: str) -> Iterable[Tuple[int, int, object]]:
+        """(inicio, fin, valor) de cada patrón que aparece como palabra(s) completa(s)"""
+        if not self._built:
+            self.build()
+        node = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        length = len(text)
+        for pos, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not output[node]:
+                continue
+            end = pos + 1
+            if end < length and text[end] != ' ':
+                continue
+            for size, value in output[node]:
+                start = end - size
+                if start == 0 or text[start - 1] == ' ':
+                    yield start, end, value
+
+
+# ===========================================
+# NOMENCLÁTOR
+# ===========================================
+
+def _read_tsv(path: str) -> Iterable[List[str]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line and not line.startswith('#'):
+                yield line.split('\t')
+
+
+def _aliases(field: str) -> List[str]:
+    return [a for a in (field or '').split('|') if a]
+
+
+def _ine_names(nombre: str) -> List[str]:
+    """Formas de un nombre del INE: "Alicante/Alacant", "Coruña, A" → "A Coruña" """
+    names = []
+    for part in nombre.split('/'):
+        part = part.strip()
+        match = _INE_ARTICLE_RE.match(part)
+        if match:
+            base, article = match.groups()
+            names.append(f"{article}{base}" if article.endswith("'") else f"{article} {base}")
+            names.append(base)
+        elif part:
+            names.append(part)
+    return names
+
+
+class Gazetteer:
+    """Municipios, islas y provincias compilados en un único autómata"""
+
+    def __init__(self):
+        self.automaton = Automaton()
+        self.provinces: Dict[str, str] = {}       # código INE → provincia
+        self._patterns = set()
+
+    def add(self, place: Place, names: Iterable[str]):
+        """Registra un lugar con su nombre y alias"""
+        for name in [place.nombre, *names]:
+            pattern = fold(name)
+            if pattern and (pattern, place) not in self._patterns:
+                self._patterns.add((pattern, place))
+                self.automaton.add(pattern, place)
+
+    def load_provinces(self, path: str = PROVINCES_FILE):
+        for row in _read_tsv(path):
+            code, nombre = row[0], row[1]
+            self.provinces[code] = nombre
+            self.add(Place('provincia', nombre, nombre), _aliases(row[2] if len(row) > 2 else ''))
+
+    def load_municipalities(self, path: str = MUNICIPALITIES_FILE):
+        for row in _read_tsv(path):
+            tipo, nombre, provincia = row[0], row[1], row[2]
+            self.add(Place(tipo, nombre, provincia), _aliases(row[3] if len(row) > 3 else ''))
+
+    def load_ine(self, path: str = INE_FILE):
+        """Añade el nomenclátor del INE (CSV con columnas CPRO y NOMBRE)"""
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            sample = f.read(4096)
+            f.seek(0)
+            dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+            for row in csv.DictReader(f, dialect=dialect):
+                provincia = self.provinces.get((row.get('CPRO') or '').strip().zfill(2))
+                nombre = (row.get('NOMBRE') or '').strip()
+                if not provincia or not nombre:
+                    continue
+                names = _ine_names(nombre)
+                self.add(Place('municipio', names[0], provincia), names[1:])
+
+    def matches(self, ubicacion: Optional[str]) -> List[Match]:
+        """Todos los lugares mencionados en una ubicación"""
+        text = fold(ubicacion)
+        if not text:
+            return []
+        return [Match(start, end, place) for start, end, place in self.automaton.search(text)]
+
+    def find(self, ubicacion: Optional[str], provincia: Optional[str] = None) -> Tuple[Optional[Place], str]:
+        """
+        Mejor municipio (o isla) y provincia de una ubicación
+
+        Args:
+            ubicacion: Texto libre
+            provincia: Provincia ya conocida (p. ej. por el código postal);
+                desempata igual que una provincia mencionada en el texto
+
+        Returns:
+            (lugar o None, provincia o "")
+        """
+        if not ubicacion or ubicacion.strip().lower() in INVALID_VALUES:
+            return None, ""
+
+        text = fold(ubicacion)
+        found = self.matches(ubicacion)
+        provinces = {m.place.provincia for m in found if m.place.tipo == 'provincia'}
+        if provincia:
+            provinces.add(provincia)
+
+        def score(match: Match):
+            after_postcode = bool(_POSTCODE_RE.search(text[:match.start].rstrip()))
+            in_province = match.place.provincia in provinces
+            return after_postcode, match.end, match.end - match.start, in_province
+
+        # "Sitges, Barcelona": el nombre que también es la provincia del otro
+        # municipio mencionado hace de provincia, no de ciudad
+        province_spans = {(m.start, m.end): m.place.provincia for m in found if m.place.tipo == 'provincia'}
+
+        def acts_as_province(match: Match, candidates: List[Match]) -> bool:
+            provincia = province_spans.get((match.start, match.end))
+            return provincia is not None and any(
+                other.place.provincia == provincia and other.end <= match.start for other in candidates
+            )
+
+        for tipo in ('municipio', 'isla'):
+            candidates = [m for m in found if m.place.tipo == tipo]
+            candidates = [m for m in candidates if not acts_as_province(m, candidates)] or candidates
+            if candidates:
+                best = max(candidates, key=score).place
+                return best, best.provincia
+
+        province_matches = [m for m in found if m.place.tipo == 'provincia']
+        if province_matches:
+            return None, max(province_matches, key=score).place.provincia
+        return None, ""
+
+
+@lru_cache(maxsize=1)
+def default_gazetteer() -> Gazetteer:
+    """Nomenclátor con los datos incluidos (y el del INE si está descargado)"""
+    gazetteer = Gazetteer()
+    gazetteer.load_provinces()
+    gazetteer.load_municipalities()
+    if os.path.exists(INE_FILE):
+        gazetteer.load_ine()
+    gazetteer.automaton.build()
+    return gazetteer
+
+
+def _fallback_city(ubicacion: str) -> str:
+    # Sin coincidencias: la palabra tras el código postal o la penúltima parte
+    match = _POSTCODE_CITY_RE.search(ubicacion)
+    if match:
+        return fold(match.group(1))
+
+    parts = [p.strip() for p in ubicacion.split(',') if p.strip()]
+    if parts and fold(parts[-1]) == 'espana':
+        parts = parts[:-1]
+    return fold(parts[-1]) if parts else ""
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _lookup(ubicacion: str) -> Tuple[str, str]:
+    # Las mismas ubicaciones se repiten entre fuentes: (ciudad, provincia) en caché
+    place, provincia = default_gazetteer().find(ubicacion)
+    return (fold(place.nombre) if place else _fallback_city(ubicacion)), provincia
+
+
+def city_of(ubicacion: Optional[str]) -> str:
+    """Ciudad normalizada (sin acentos, minúsculas) de una ubicación"""
+    if not ubicacion or ubicacion.strip().lower() in INVALID_VALUES:
+        return ""
+    return _lookup(ubicacion)[0]
+
+
+def province_of(ubicacion: Optional[str]) -> str:
+    """Provincia (nombre como en la app) de una ubicación, o "" """
+    if not ubicacion or ubicacion.strip().lower() in INVALID_VALUES:
+        return ""
+    return _lookup(ubicacion)[1]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    for arg in sys.argv[1:]:
+        place, provincia = default_gazetteer().find(arg)
+        print(f"{arg!r} → ciudad={city_of(arg)!r} lugar={place.nombre if place else None!r} provincia={provincia!r}")
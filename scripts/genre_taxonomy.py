@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Taxonomía canónica de géneros de escape rooms.
+
+Los 33 géneros (data/generos.tsv) son los de los iconos de
+generate_genre_icons.py y GenreUtils en la app; el id coincide con el nombre
+del icono (assets/genres/<id>.png). Cada género tiene alias en español e
+inglés ("Sci-fi", "Ciencia Ficción", "space" → scifi).
+
+Todos los alias normalizados se precalculan en una tabla alias → id y en un
+autómata (el de gazetteer.py), así que clasificar un texto es:
+
+- una consulta a la tabla por cada parte ("Terror, Vampiros")
+- si una parte no es un alias exacto, una sola pasada del autómata
+  buscando alias como palabras completas ("Escape de terror")
+
+El resultado se escribe por lotes como `generoIds` (JSON y columna de la
+BD) y en la tabla `words_generos` (género, sala) con índice, para que la app
+filtre por género sin `LIKE`.
+
+Uso:
+    python3 genre_taxonomy.py "Terror, Vampiros" "Sci-fi"
+    python3 genre_taxonomy.py --json ../assets/escape_rooms_completo.json
+    python3 genre_taxonomy.py --db ruta/a/words.db
+"""
+
+import argparse
+import logging
+import os
+import re
+import sqlite3
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from change_journal import run_catalog_step
+from gazetteer import Automaton
+from normalization import CACHE_SIZE, INVALID_VALUES, fold
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+GENRES_FILE = os.path.join(DATA_DIR, "generos.tsv")
+
+DEFAULT_IMAGE_QUERY = "escape room"
+
+# Palabras del nombre que no son género pero dan una buena búsqueda de imagen
+IMAGE_KEYWORDS = {
+    'prison': 'prison', 'bunker': 'bunker', 'búnker': 'bunker',
+    'sherlock': 'detective', 'treasure': 'treasure', 'tesoro': 'treasure',
+    'templo': 'temple', 'castle': 'castle', 'mansion': 'mansion', 'mansión': 'mansion',
+    'lab': 'laboratory', 'laboratorio': 'laboratory', 'hospital': 'hospital',
+    'orfanato': 'asylum', 'manicomio': 'asylum', 'circus': 'circus', 'circo': 'circus',
+    'tumba': 'tomb', 'cripta': 'crypt', 'asesino': 'killer', 'maldita': 'cursed',
+    'maldito': 'cursed',
+}
+
+_SEPARATORS_RE = re.compile(r'\s*[,/;|]\s*|\s+y\s+')
+
+
+class Genre(NamedTuple):
+    id: str
+    nombre: str
+    busqueda: str
+
+
+class Taxonomy:
+    """Géneros canónicos con la tabla alias → id y el autómata de alias"""
+
+    def __init__(self, path: str = GENRES_FILE):
+        self.genres: Dict[str, Genre] = {}
+        self.aliases: Dict[str, str] = {}
+        self.automaton = Automaton()
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                if not line or line.startswith('#'):
+                    continue
+                genre_id, nombre, busqueda, *rest = line.split('\t')
+                self.genres[genre_id] = Genre(genre_id, nombre, busqueda)
+                for alias in [genre_id, nombre, *(rest[0].split('|') if rest else [])]:
+                    key = fold(alias)
+                    if key and key not in self.aliases:
+                        self.aliases[key] = genre_id
+                        self.automaton.add(key, genre_id)
+        self.automaton.build()
+
+    def scan(self, text: Optional[str]) -> List[str]:
+        """Géneros mencionados en cualquier parte de un texto, en orden de aparición"""
+        folded = fold(text)
+        if not folded:
+            return []
+        found = sorted(self.automaton.search(folded), key=lambda m: (m[0], m[0] - m[1]))
+        return _unique(genre_id for _, _, genre_id in found)
+
+    def classify(self, genero: Optional[str]) -> List[str]:
+        """Ids de los géneros de un campo `genero` ("Terror, Vampiros" → [terror, vampiros])"""
+        ids = []
+        for part in _SEPARATORS_RE.split(genero or ''):
+            key = fold(part)
+            if not key or key in INVALID_VALUES:
+                continue
+            genre_id = self.aliases.get(key)
+            ids.extend([genre_id] if genre_id else self.scan(key))
+        return _unique(ids)
+
+
+def _unique(ids: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(ids))
+
+
+@lru_cache(maxsize=1)
+def default_taxonomy() -> Taxonomy:
+    """Taxonomía de data/generos.tsv (se carga una sola vez)"""
+    return Taxonomy()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _genre_ids(genero: str) -> tuple:
+    return tuple(default_taxonomy().classify(genero))
+
+
+def genre_ids(genero: Optional[str]) -> List[str]:
+    """Ids canónicos de un campo `genero` de texto libre"""
+    if not genero or not isinstance(genero, str):
+        return []
+    return list(_genre_ids(genero))
+
+
+def genre_name(genre_id: str) -> str:
+    """Nombre visible de un género ("scifi" → "Ciencia ficción")"""
+    genre = default_taxonomy().genres.get(genre_id)
+    return genre.nombre if genre else genre_id
+
+
+# ===========================================
+# IMÁGENES
+# ===========================================
+
+@lru_cache(maxsize=1)
+def _keyword_automaton() -> Automaton:
+    automaton = Automaton()
+    for keyword, query in IMAGE_KEYWORDS.items():
+        automaton.add(fold(keyword), query)
+    automaton.build()
+    return automaton
+
+
+def image_query(nombre: Optional[str], genero: Optional[str] = None,
+                default: str = DEFAULT_IMAGE_QUERY) -> str:
+    """
+    Término de búsqueda de imagen para una sala
+
+    Por prioridad: palabra clave del nombre ("cripta" → crypt), género
+    mencionado en el nombre, género del campo `genero`.
+    """
+    folded = fold(nombre)
+    if folded:
+        keywords = sorted(_keyword_automaton().search(folded))
+        if keywords:
+            return keywords[0][2]
+
+    taxonomy = default_taxonomy()
+    for ids in (taxonomy.scan(nombre), genre_ids(genero)):
+        if ids:
+            return taxonomy.genres[ids[0]].busqueda
+    return default
+
+
+# ===========================================
+# LOTES
+# ===========================================
+
+def apply_genre_ids(rooms: List[Dict]) -> Dict[str, int]:
+    """
+    Escribe `generoIds` (lista de ids) en los registros, en una pasada
+
+    Returns:
+        Salas por género (y 'sin_genero')
+    """
+    counts: Dict[str, int] = {}
+    for room in rooms:
+        ids = genre_ids(room.get('genero'))
+        room['generoIds'] = ids
+        for genre_id in ids or ['sin_genero']:
+            counts[genre_id] = counts.get(genre_id, 0) + 1
+    return counts
+
+
+# ===========================================
+# SQLITE
+# ===========================================
+
+def ensure_genre_tables(conn: sqlite3.Connection):
+    """Columna generoIds, tabla de géneros y tabla (género, sala) indexada"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(words)")}
+    if 'generoIds' not in existing:
+        conn.execute("ALTER TABLE words ADD COLUMN generoIds TEXT")
+    conn.execute("CREATE TABLE IF NOT EXISTS generos (id TEXT PRIMARY KEY, nombre TEXT NOT NULL)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS words_generos (
+            genero_id TEXT NOT NULL,
+            word_id INTEGER NOT NULL,
+            PRIMARY KEY (genero_id, word_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_words_generos_word ON words_generos (word_id)")
+    # Sólo los géneros nuevos o renombrados: si no hay cambios, la BD no se toca
+    stored = dict(conn.execute("SELECT id, nombre FROM generos"))
+    conn.executemany(
+        "INSERT OR REPLACE INTO generos (id, nombre) VALUES (?, ?)",
+        [(g.id, g.nombre) for g in default_taxonomy().genres.values() if stored.get(g.id) != g.nombre],
+    )
+
+
+def write_room_genres(conn: sqlite3.Connection, word_id: int, ids: List[str]):
+    """Guarda los géneros de una sala (columna y tabla de relación)"""
+    conn.execute("UPDATE words SET generoIds = ? WHERE id = ?", (','.join(ids) or None, word_id))
+    conn.execute("DELETE FROM words_generos WHERE word_id = ?", (word_id,))
+    conn.executemany(
+        "INSERT OR IGNORE INTO words_generos (genero_id, word_id) VALUES (?, ?)",
+        [(genre_id, word_id) for genre_id in ids],
+    )
+
+
+def update_database(db_path: str) -> Dict[str, int]:
+    """Recalcula generoIds y words_generos para toda la BD"""
+    conn = sqlite3.connect(db_path)
+    try:
+        from migrations import migrate  # migrations importa este módulo
+        migrate(conn)
+        with conn:
+            rows = conn.execute("SELECT id, genero FROM words").fetchall()
+            by_room = [(row_id, genre_ids(genero)) for row_id, genero in rows]
+            conn.executemany(
+                "UPDATE words SET generoIds = ? WHERE id = ?",
+                [(','.join(ids) or None, row_id) for row_id, ids in by_room],
+            )
+            conn.execute("DELETE FROM words_generos")
+            conn.executemany(
+                "INSERT INTO words_generos (genero_id, word_id) VALUES (?, ?)",
+                [(genre_id, row_id) for row_id, ids in by_room for genre_id in ids],
+            )
+        return {'salas': len(rows), 'con_genero': sum(1 for _, ids in by_room if ids)}
+    finally:
+        conn.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Géneros canónicos (generoIds) del catálogo")
+    parser.add_argument('generos', nargs='*', help="Textos a clasificar (muestra el resultado)")
+    parser.add_argument('--json', help="JSON de escape rooms a completar")
+    parser.add_argument('--salida', help="JSON de salida (por defecto, sobrescribe la entrada)")
+    parser.add_argument('--db', help="BD SQLite a actualizar")
+    args = parser.parse_args()
+
+    if not args.generos and not args.json and not args.db:
+        parser.error("indica géneros, --json y/o --db")
+
+    for genero in args.generos:
+        print(f"{genero!r} → {genre_ids(genero)}")
+
+    if args.json:
+        run_catalog_step(
+            args.json, 'genre_taxonomy', apply_genre_ids, args.salida,
+            summary=lambda counts: (f"{genre_id}: {count}"
+                                    for genre_id, count in sorted(counts.items(), key=lambda kv: -kv[1])),
+        )
+
+    if args.db:
+        stats = update_database(args.db)
+        logger.info(f"✅ {stats['con_genero']}/{stats['salas']} salas con género en {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Índice espacial en rejilla para buscar escape rooms cercanos.
+
+Divide el mapa en celdas del tamaño del radio de búsqueda, de modo que los
+vecinos de un punto sólo pueden estar en su celda o en las adyacentes. Se usa
+para sacar candidatos a duplicado por proximidad en vez de por ciudad.
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_M = 6_371_000
+METERS_PER_DEGREE = 111_320
+
+# Radio por defecto para considerar que dos salas están en el mismo local
+DEFAULT_RADIUS_M = 150
+
+
+def has_coordinates(lat, lng) -> bool:
+    """True si las coordenadas son utilizables (no vacías, no 0,0 y en rango)"""
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return False
+    if lat == 0.0 and lng == 0.0:
+        return False
+    return -90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distancia en metros entre dos puntos"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class GeoGridIndex:
+    """Rejilla de celdas de `radius_m` metros con búsqueda por radio"""
+
+    def __init__(self, radius_m: float = DEFAULT_RADIUS_M):
+        if not (radius_m > 0 and math.isfinite(radius_m)):
+            raise ValueError(f"El radio debe ser un número de metros mayor que 0: {radius_m}")
+        self.radius_m = radius_m
+        self.cell_deg = radius_m / METERS_PER_DEGREE
+        self.cells: Dict[Tuple[int, int], List[Tuple[Hashable, float, float]]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return sum(len(points) for points in self.cells.values())
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+    def _lng_span(self, lat: float) -> int:
+        # Un grado de longitud mide menos cuanto más al norte
+        cos_lat = max(math.cos(math.radians(abs(lat) + self.cell_deg)), 0.01)
+        return int(math.ceil(1 / cos_lat))
+
+    def add(self, item: Hashable, lat, lng) -> bool:
+        """Añade un punto; ignora coordenadas no válidas"""
+        if not has_coordinates(lat, lng):
+            return False
+        lat, lng = float(lat), float(lng)
+        self.cells[self._cell(lat, lng)].append((item, lat, lng))
+        return True
+
+    def near(self, lat, lng, radius_m: Optional[float] = None) -> Iterable[Tuple[Hashable, float]]:
+        """Puntos a `radius_m` metros o menos, como (item, distancia)"""
+        if not has_coordinates(lat, lng):
+            return
+        lat, lng = float(lat), float(lng)
+        radius_m = radius_m or self.radius_m
+        span_lat = int(math.ceil(radius_m / self.radius_m))
+        span_lng = span_lat * self._lng_span(lat)
+        row, col = self._cell(lat, lng)
+
+        for dr in range(-span_lat, span_lat + 1):
+            for dc in range(-span_lng, span_lng + 1):
+                for item, plat, plng in self.cells.get((row + dr, col + dc), ()):
+                    distance = haversine_m(lat, lng, plat, plng)
+                    if distance <= radius_m:
+                        yield item, distance
+
+    def pairs(self) -> Iterable[Tuple[Hashable, Hashable, float]]:
+        """Todos los pares de puntos a distancia <= radio, cada par una vez"""
+        for (row, col), points in self.cells.items():
+            span_lng = self._lng_span((row + 0.5) * self.cell_deg)
+            # Sólo la mitad "posterior" de las celdas vecinas para no repetir pares
+            for dr in range(0, 2):
+                for dc in range(-span_lng, span_lng + 1):
+                    if dr == 0 and dc < 0:
+                        continue
+                    neighbours = self.cells.get((row + dr, col + dc))
+                    if not neighbours:
+                        continue
+                    same_cell = dr == 0 and dc == 0
+                    for i, (item_a, lat_a, lng_a) in enumerate(points):
+                        start = i + 1 if same_cell else 0
+                        for item_b, lat_b, lng_b in neighbours[start:]:
+                            distance = haversine_m(lat_a, lng_a, lat_b, lng_b)
+                            if distance <= self.radius_m:
+                                yield item_a, item_b, distance
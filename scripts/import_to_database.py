@@ -4,58 +4,93 @@ Script para importar los escape rooms scrapeados desde JSON a SQLite y Firebase.
 Lee el archivo nuevos_escape_rooms.json y los inserta en la base de datos local SQLite.
 """
 
-import json
 import sqlite3
 import os
 import sys
-import re
-from difflib import SequenceMatcher
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from address_parser import parse_address
+from db_utils import BulkLoad
+from dedup_snapshot import build_snapshot, extract_city, load_or_build_snapshot
+from entity_resolution import canonical_id_for, db_member_ids, load_mapping, source_name
+from fts_index import rebuild_fts
+from genre_taxonomy import genre_ids
+from json_stream import iter_records
+from migrations import migrate
+from normalization import fold, normalize_text
+from parse_fields import parse_room
+from phones import PhoneIndex, phone_field
+from rtree_index import rebuild_rtree
+from similarity import CandidateSet, is_similar
+
+
+def is_similar_text(text1: str, text2: str, threshold: float) -> bool:
+    """True si la similitud entre dos textos (0.0 a 1.0) supera el umbral"""
+    return is_similar((text1 or '').lower(), (text2 or '').lower(), threshold, strict=True)
+
+
+class ExistingRooms:
+    """
+    Índices en memoria de los escape rooms de la BD para detectar duplicados
+
+    Se rellena desde el snapshot de claves (dedup_snapshot.py) y se actualiza
+    con cada inserción, así cada escape room se compara sólo con los de su
+    ciudad o con los de su mismo nombre en vez de releer toda la tabla.
+    """
+
+    def __init__(self, rows=()):
+        self.by_city: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        self.by_norm: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        self.by_phone = PhoneIndex()
+        self._candidates: Dict[str, CandidateSet] = {}
+        for row in rows:
+            self.add(row.nombre, row.ubicacion, row.nombre_norm, row.ciudad, row.telefono)
+
+    def add(self, nombre: str, ubicacion: str, nombre_norm: str = None, ciudad: str = None,
+            telefono: str = None):
+        nombre, ubicacion = nombre or '', ubicacion or ''
+        nombre_norm = normalize_text(nombre) if nombre_norm is None else nombre_norm
+        ciudad = extract_city(ubicacion) if ciudad is None else ciudad
+        self.by_city[ciudad].append((nombre, nombre_norm))
+        self.by_norm[nombre_norm].append((nombre, ubicacion))
+        self.by_phone.add(telefono, nombre, nombre)
+        self._candidates.pop(ciudad, None)
+
+    def find_duplicate(self, nombre_norm: str, ciudad: str, ubicacion: str,
+                       nombre: str = None, telefono: str = None) -> Optional[str]:
+        """Motivo por el que el escape room ya existe, o None"""
+        # VERIFICACIÓN 0: Mismo teléfono (misma empresa) + mismo nombre
+        if telefono and nombre:
+            existing_name = self.by_phone.find(telefono, nombre)
+            if existing_name is not None:
+                return f"mismo teléfono y nombre que '{existing_name}'"
+
+        rooms = self.by_city.get(ciudad)
+        if rooms:
+            # VERIFICACIÓN 1: Nombre normalizado exacto + misma ciudad
+            for existing_name, existing_norm in rooms:
+                if existing_norm == nombre_norm:
+                    return f"ya existe como '{existing_name}' en {ciudad}"
+
+            # VERIFICACIÓN 2: Similitud de nombre >90% + misma ciudad
+            candidates = self._candidates.get(ciudad)
+            if candidates is None:
+                candidates = self._candidates[ciudad] = CandidateSet(norm for _, norm in rooms)
+            best = candidates.best(nombre_norm, 0.90, strict=True)
+            if best:
+                index, similarity = best
+                return f"muy similar ({similarity*100:.0f}%) a '{rooms[index][0]}' en {ciudad}"
+
+        # VERIFICACIÓN 3: Nombre exacto en la misma dirección (sin importar ciudad):
+        # mismo código postal o, si falta, ubicación completa similar
+        codigo_postal = parse_address(ubicacion).codigo_postal
+        for existing_name, existing_location in self.by_norm.get(nombre_norm, ()):
+            if codigo_postal and codigo_postal == parse_address(existing_location).codigo_postal:
+                return f"mismo nombre y código postal que '{existing_name}'"
+            if is_similar_text(ubicacion, existing_location, 0.70):
+                return f"mismo nombre y ubicación similar a '{existing_name}'"
 
-
-def similarity_ratio(text1: str, text2: str) -> float:
-    """Calcula la similitud entre dos textos (0.0 a 1.0)"""
-    return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
-
-
-def normalize_text(text: str) -> str:
-    """Normaliza un texto eliminando acentos, símbolos y convirtiendo a minúsculas"""
-    if not text:
-        return ""
-    # Quitar acentos
-    replacements = {
-        'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-        'Á': 'a', 'É': 'e', 'Í': 'i', 'Ó': 'o', 'Ú': 'u',
-        'ñ': 'n', 'Ñ': 'n', 'ü': 'u', 'Ü': 'u'
-    }
-    normalized = text
-    for old, new in replacements.items():
-        normalized = normalized.replace(old, new)
-
-    # Quitar símbolos y convertir a minúsculas
-    normalized = re.sub(r'[^\w\s]', '', normalized.lower())
-    normalized = re.sub(r'\s+', ' ', normalized).strip()
-    return normalized
-
-
-def extract_city(ubicacion: str) -> str:
-    """Extrae la ciudad de una ubicación completa"""
-    if not ubicacion:
-        return ""
-
-    # Patrones comunes: "Calle X, Ciudad" o "Ciudad, Provincia"
-    # Tomar la última palabra antes de "España" o la penúltima parte
-    parts = [p.strip() for p in ubicacion.split(',')]
-
-    # Si tiene "España" al final, tomar la parte anterior
-    if parts and 'españa' in parts[-1].lower():
-        if len(parts) >= 2:
-            return normalize_text(parts[-2])
-
-    # Si no, tomar la última parte significativa
-    if len(parts) >= 2:
-        return normalize_text(parts[-1])
-
-    return normalize_text(ubicacion)
+        return None
 
 
 def get_db_path():
@@ -89,104 +124,131 @@ def import_to_sqlite(json_file: str, db_path: str):
         print(f"❌ No se encontró el archivo: {json_file}")
         return 0
 
-    with open(json_file, 'r', encoding='utf-8') as f:
-        escape_rooms = json.load(f)
-
-    print(f"📖 Leyendo {len(escape_rooms)} escape rooms desde {json_file}")
-
-    # Conectar a SQLite
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    # Registro a registro: el JSON no se carga entero
+    escape_rooms = iter_records(json_file)
+    print(f"📖 Leyendo escape rooms desde {json_file}")
 
     imported = 0
     duplicates = 0
     errors = 0
 
-    for room in escape_rooms:
-        try:
-            nombre = room.get('nombre', '')
-            ubicacion = room.get('ubicacion', '')
-
-            # Normalizar nombre y extraer ciudad
-            nombre_norm = normalize_text(nombre)
-            ciudad_new = extract_city(ubicacion)
-
-            # Verificar si ya existe (triple verificación)
-            # Obtener todos los escape rooms para comparar con normalización
-            cursor.execute("SELECT id, text, ubicacion FROM words")
-            existing_rooms = cursor.fetchall()
-
-            is_duplicate = False
-            duplicate_reason = ""
-
-            for existing_id, existing_name, existing_location in existing_rooms:
-                existing_norm = normalize_text(existing_name)
-                ciudad_existing = extract_city(existing_location)
-
-                # VERIFICACIÓN 1: Nombre normalizado exacto + misma ciudad
-                if existing_norm == nombre_norm and ciudad_new == ciudad_existing:
-                    is_duplicate = True
-                    duplicate_reason = f"ya existe como '{existing_name}' en {ciudad_existing}"
-                    break
-
-                # VERIFICACIÓN 2: Similitud de nombre >90% + misma ciudad
-                similarity = similarity_ratio(nombre_norm, existing_norm)
-                if similarity > 0.90 and ciudad_new == ciudad_existing:
-                    is_duplicate = True
-                    duplicate_reason = f"muy similar ({similarity*100:.0f}%) a '{existing_name}' en {ciudad_existing}"
-                    break
-
-                # VERIFICACIÓN 3: Nombre exacto en ubicación completa (sin importar ciudad)
-                if existing_norm == nombre_norm and similarity_ratio(ubicacion, existing_location) > 0.70:
-                    is_duplicate = True
-                    duplicate_reason = f"mismo nombre y ubicación similar a '{existing_name}'"
-                    break
-
-            if is_duplicate:
-                duplicates += 1
-                print(f"⏭️ Duplicado: {nombre} ({duplicate_reason})")
-                continue
-
-            # Insertar nuevo escape room
-            cursor.execute("""
-                INSERT INTO words (
-                    text, empresa, ubicacion, genero, puntuacion, web,
-                    latitud, longitud, precio, jugadores, duracion,
-                    numJugadoresMin, numJugadoresMax, dificultad,
-                    telefono, email, provincia, descripcion, imagenUrl
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                room.get('nombre', ''),
-                room.get('empresa'),
-                room.get('ubicacion', ''),
-                room.get('genero', ''),
-                room.get('puntuacion', ''),
-                room.get('web', ''),
-                room.get('latitud', 0.0),
-                room.get('longitud', 0.0),
-                room.get('precio'),
-                room.get('jugadores'),
-                room.get('duracion'),
-                room.get('numJugadoresMin'),
-                room.get('numJugadoresMax'),
-                room.get('dificultad'),
-                room.get('telefono'),
-                room.get('email'),
-                room.get('provincia'),
-                room.get('descripcion'),
-                room.get('imagenUrl')
-            ))
-
-            imported += 1
-            print(f"✅ Importado: {room.get('nombre', 'Sin nombre')}")
-
-        except Exception as e:
-            errors += 1
-            print(f"❌ Error importando {room.get('nombre', 'Sin nombre')}: {e}")
-
-    # Guardar cambios
-    conn.commit()
-    conn.close()
+    # Tabla de IDs canónicos (entity_resolution.py --db): join directo por ID
+    canonical_ids = load_mapping()
+    source = source_name(json_file)
+    imported_ids = set()
+
+    # Esquema al día (migrations.py) y claves de los escape rooms ya en la BD
+    # (snapshot precalculado). Antes de la carga masiva, que cambia el modo de
+    # diario de la BD
+    conn = sqlite3.connect(db_path)
+    try:
+        migrate(conn)
+        existing = ExistingRooms(load_or_build_snapshot(db_path, conn))
+        # La tabla de mapeo se generó con otra BD (o una copia antigua): la
+        # pertenencia se comprueba aquí, por canonicalId o por id + nombre
+        db_ids = {row[0] for row in conn.execute("SELECT canonicalId FROM words WHERE canonicalId IS NOT NULL")}
+        db_names = {row_id: fold(text) for row_id, text in conn.execute("SELECT id, text FROM words")}
+    finally:
+        conn.close()
+
+    def in_db(canonical_id: str, nombre: str) -> bool:
+        return canonical_id in db_ids or any(
+            db_names.get(row_id) == fold(nombre) for row_id in db_member_ids(canonical_ids, canonical_id)
+        )
+
+    # Conectar a SQLite en modo carga masiva (WAL, commits por lotes)
+    with BulkLoad(db_path) as bulk:
+        cursor = bulk.conn.cursor()
+
+        for room in escape_rooms:
+            try:
+                nombre = room.get('nombre', '')
+                ubicacion = room.get('ubicacion', '')
+
+                canonical_id = canonical_id_for(canonical_ids, source, room)
+                if canonical_id and (in_db(canonical_id, nombre) or canonical_id in imported_ids):
+                    duplicates += 1
+                    print(f"⏭️ Duplicado: {nombre} (ID canónico {canonical_id} ya en la BD)")
+                    continue
+
+                # Normalizar nombre y extraer ciudad
+                nombre_norm = normalize_text(nombre)
+                ciudad_new = extract_city(ubicacion)
+
+                # Verificar si ya existe (teléfono + triple verificación)
+                telefono = phone_field(room.get('telefono'))
+                duplicate_reason = existing.find_duplicate(nombre_norm, ciudad_new, ubicacion, nombre, telefono)
+                if duplicate_reason:
+                    duplicates += 1
+                    print(f"⏭️ Duplicado: {nombre} ({duplicate_reason})")
+                    continue
+
+                # Insertar nuevo escape room (con las columnas numéricas y la dirección parseadas)
+                numeric = parse_room(room)
+                address = parse_address(ubicacion)
+                generos = genre_ids(room.get('genero'))
+                cursor.execute("""
+                    INSERT INTO words (
+                        text, empresa, ubicacion, genero, puntuacion, web,
+                        latitud, longitud, precio, jugadores, duracion,
+                        numJugadoresMin, numJugadoresMax, dificultad,
+                        telefono, email, provincia, descripcion, imagenUrl,
+                        precioMin, precioMax, duracionMinutos, puntuacionNum,
+                        calle, codigoPostal, ciudad, generoIds, canonicalId
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    room.get('nombre', ''),
+                    room.get('empresa'),
+                    room.get('ubicacion', ''),
+                    room.get('genero', ''),
+                    room.get('puntuacion', ''),
+                    room.get('web', ''),
+                    room.get('latitud', 0.0),
+                    room.get('longitud', 0.0),
+                    room.get('precio'),
+                    room.get('jugadores'),
+                    room.get('duracion'),
+                    room.get('numJugadoresMin') or numeric['numJugadoresMin'],
+                    room.get('numJugadoresMax') or numeric['numJugadoresMax'],
+                    room.get('dificultad'),
+                    telefono,
+                    room.get('email'),
+                    room.get('provincia') or address.provincia or None,
+                    room.get('descripcion'),
+                    room.get('imagenUrl'),
+                    numeric['precioMin'],
+                    numeric['precioMax'],
+                    numeric['duracionMinutos'],
+                    numeric['puntuacionNum'],
+                    address.calle or None,
+                    address.codigo_postal or None,
+                    address.ciudad or None,
+                    ','.join(generos) or None,
+                    canonical_id
+                ))
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO words_generos (genero_id, word_id) VALUES (?, ?)",
+                    [(genre_id, cursor.lastrowid) for genre_id in generos]
+                )
+
+                existing.add(nombre, ubicacion, nombre_norm, ciudad_new, telefono)
+                imported += 1
+                if canonical_id:
+                    imported_ids.add(canonical_id)
+                bulk.row()
+                print(f"✅ Importado: {room.get('nombre', 'Sin nombre')}")
+
+            except Exception as e:
+                errors += 1
+                print(f"❌ Error importando {room.get('nombre', 'Sin nombre')}: {e}")
+
+        # Índices de búsqueda (FTS5) y del mapa (R*Tree) al día con las filas nuevas
+        rebuild_fts(bulk.conn)
+        rebuild_rtree(bulk.conn)
+
+    # Regenerar el snapshot para la próxima importación y los scrapers (la
+    # carga masiva reescribe la cabecera de la BD aunque no se importe nada)
+    build_snapshot(db_path)
 
     print(f"\n{'='*70}")
     print(f"📊 RESUMEN DE IMPORTACIÓN")
@@ -194,6 +256,7 @@ def import_to_sqlite(json_file: str, db_path: str):
     print(f"✅ Importados: {imported}")
     print(f"⏭️ Duplicados omitidos: {duplicates}")
     print(f"❌ Errores: {errors}")
+    print(f"⚡ {bulk.stats['filas_por_segundo']:,.0f} filas/s ({bulk.stats['segundos']:.2f}s)")
     print(f"{'='*70}\n")
 
     return imported
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Lectura y escritura de catálogos registro a registro.
+
+Los scripts que transforman cada escape room (logos, imágenes, campo text,
+importación) cargaban el JSON entero con json.load y lo volvían a escribir
+con json.dump: la memoria crece con el tamaño del fichero. Aquí:
+
+- iter_records(): recorre un array JSON (`[{...}, {...}]`) o un NDJSON (un
+  objeto por línea) leyendo bloques de CHUNK_SIZE y decodificando cada
+  registro con JSONDecoder.raw_decode; en memoria sólo está el registro
+  actual y el bloque pendiente
+- write_records(): escribe un iterable de registros en un fichero temporal
+  y lo renombra al final, así se puede reescribir el mismo fichero que se
+  está leyendo. Para .json la salida es idéntica a
+  json.dump(lista, indent=2, ensure_ascii=False); .ndjson/.jsonl, una línea
+  por registro
+
+Uso:
+    python3 json_stream.py fichero.json                       # cuenta registros y memoria
+    python3 json_stream.py fichero.json --salida fichero.ndjson   # convierte
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+import tracemalloc
+from typing import Dict, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+
+
+def iter_records(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Registros de un array JSON o de un NDJSON, uno a uno
+
+    Raises:
+        json.JSONDecodeError: si el fichero no es un array ni NDJSON válido
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, pos, eof = '', 0, False
+        in_array = None
+
+        while True:
+            # Saltar espacios y separadores; pedir más texto si hace falta
+            while True:
+                while pos < len(buffer) and (buffer[pos] in _WHITESPACE or (in_array and buffer[pos] == ',')):
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                chunk = f.read(chunk_size)
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+
+            if pos >= len(buffer):
+                if in_array:
+                    raise json.JSONDecodeError("Array sin cerrar", buffer, pos)
+                return
+            if in_array is None:
+                in_array = buffer[pos] == '['
+                pos += in_array
+                continue
+            if in_array and buffer[pos] == ']':
+                return
+
+            try:
+                record, end = _decoder.raw_decode(buffer, pos)
+                # Un valor que acaba justo al final del bloque puede seguir en el siguiente
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                chunk = f.read(chunk_size)
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+                continue
+            pos = end
+            yield record
+
+
+def is_ndjson(path: str) -> bool:
+    """True si la extensión es de NDJSON (.ndjson, .jsonl)"""
+    return path.endswith(NDJSON_EXTENSIONS)
+
+
+def write_records(path: str, records: Iterable[Dict]) -> int:
+    """
+    Escribe los registros en `path` (array JSON con indent=2, o NDJSON)
+
+    Returns:
+        Número de registros escritos
+    """
+    tmp_path = path + ".tmp"
+    count = 0
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if is_ndjson(path):
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    count += 1
+            else:
+                for record in records:
+                    text = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                    f.write(("[\n  " if count == 0 else ",\n  ") + text)
+                    count += 1
+                f.write("\n]" if count else "[]")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Lee un catálogo JSON/NDJSON registro a registro")
+    parser.add_argument('entrada', help="Array JSON o NDJSON")
+    parser.add_argument('--salida', help="Convertir a este fichero (.json, .ndjson o .jsonl)")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    if args.salida:
+        count = write_records(args.salida, iter_records(args.entrada))
+    else:
+        count = sum(1 for _ in iter_records(args.entrada))
+    _, peak = tracemalloc.get_traced_memory()
+    logger.info(f"✅ {count} registros de {args.entrada} en {time.perf_counter() - start:.2f}s, "
+                f"pico de memoria {peak / 1024:.0f} KB ({os.path.getsize(args.entrada) / 1024:.0f} KB en disco)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,29 @@
 """
 Script para combinar los datos nuevos con los existentes
 y actualizar escape_rooms_completo.json
+
+Los cambios (campos rellenados, salas nuevas, duplicados que se quitan) van
+al diario de change_journal.py en vez de reescribir el JSON
 """
 
 import json
 import logging
 
+from change_journal import ChangeJournal, iter_view
+from entity_resolution import canonical_id_for, load_mapping, source_name
+from json_stream import write_records
+from normalization import fold, merge_key
+from phones import PhoneIndex
+from url_utils import domain_key
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
 def load_json(filepath):
-    """Carga un archivo JSON"""
+    """Carga un archivo JSON (array o NDJSON) con su diario de cambios aplicado"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return list(iter_view(filepath))
     except FileNotFoundError:
         logger.warning(f"Archivo no encontrado: {filepath}")
         return []
@@ -24,24 +33,40 @@ def load_json(filepath):
         return []
 
 
-def normalize_key(name, location):
-    """Crea una clave normalizada para comparación"""
-    name = (name or '').lower().strip()
-    location = (location or '').lower().strip()[:30]
-    return f"{name}::{location}"
-
+def merge_escape_rooms(existing_data, new_data, canonical_ids=None, existing_source='', new_source=''):
+    """
+    Combina datos existentes con nuevos, evitando duplicados
 
-def merge_escape_rooms(existing_data, new_data):
-    """Combina datos existentes con nuevos, evitando duplicados"""
+    Si se pasa la tabla de entity_resolution.py, los registros se cruzan por
+    ID canónico; después por teléfono + nombre o dominio de la web + nombre,
+    y la clave nombre + ubicación queda como alternativa para los registros
+    que no coinciden de otra forma.
+    """
     logger.info("🔄 Combinando datos...")
+    canonical_ids = canonical_ids or {}
 
     # Crear diccionario con datos existentes
     merged = {}
+    by_canonical = {}
+    by_phone = PhoneIndex()
+    by_domain = {}
+
+    def index_room(room, key):
+        nombre = room.get('nombre') or room.get('text')
+        by_phone.add(room.get('telefono'), nombre, key, room.get('empresa'))
+        domain = domain_key(room.get('web'))
+        if domain and fold(nombre):
+            by_domain.setdefault((domain, fold(nombre)), key)
 
     for room in existing_data:
-        key = normalize_key(room.get('nombre') or room.get('text'), room.get('ubicacion'))
+        key = merge_key(room.get('nombre') or room.get('text'), room.get('ubicacion'))
         if key and key != '::':
             merged[key] = room
+            index_room(room, key)
+            canonical_id = canonical_id_for(canonical_ids, existing_source, room)
+            if canonical_id:
+                room['canonical_id'] = canonical_id
+                by_canonical.setdefault(canonical_id, key)
 
     logger.info(f"✓ Cargados {len(merged)} escape rooms existentes")
 
@@ -50,11 +75,22 @@ def merge_escape_rooms(existing_data, new_data):
     updated = 0
 
     for room in new_data:
-        key = normalize_key(room.get('nombre') or room.get('text'), room.get('ubicacion'))
+        key = merge_key(room.get('nombre') or room.get('text'), room.get('ubicacion'))
 
         if not key or key == '::':
             continue
 
+        canonical_id = canonical_id_for(canonical_ids, new_source, room)
+        if canonical_id:
+            room['canonical_id'] = canonical_id
+            key = by_canonical.setdefault(canonical_id, key)
+        elif key not in merged:
+            # Mismo teléfono o misma web y mismo nombre: misma sala aunque la ubicación difiera
+            nombre = room.get('nombre') or room.get('text')
+            key = (by_phone.find(room.get('telefono'), nombre)
+                   or by_domain.get((domain_key(room.get('web')), fold(nombre)))
+                   or key)
+
         if key in merged:
             # Actualizar campos vacíos del existente con datos nuevos
             existing_room = merged[key]
@@ -68,6 +104,7 @@ def merge_escape_rooms(existing_data, new_data):
             if 'nombre' in room and 'text' not in room:
                 room['text'] = room['nombre']
             merged[key] = room
+            index_room(room, key)
             added += 1
 
     logger.info(f"✓ Agregados: {added} nuevos")
@@ -87,29 +124,44 @@ def main():
     output_file = "../assets/escape_rooms_completo.json"
     backup_file = "../assets/escape_rooms_completo_backup.json"
 
-    # Cargar datos
-    logger.info(f"\n📂 Cargando datos existentes de {existing_file}...")
-    existing_data = load_json(existing_file)
-    logger.info(f"✓ {len(existing_data)} escape rooms cargados")
-
-    logger.info(f"\n📂 Cargando datos nuevos de {new_file}...")
-    new_data = load_json(new_file)
-    logger.info(f"✓ {len(new_data)} escape rooms nuevos cargados")
-
-    # Hacer backup
-    if existing_data:
-        logger.info(f"\n💾 Creando backup en {backup_file}...")
-        with open(backup_file, 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, ensure_ascii=False, indent=2)
-        logger.info("✓ Backup creado")
-
-    # Combinar
-    merged_data = merge_escape_rooms(existing_data, new_data)
-
-    # Guardar resultado
-    logger.info(f"\n💾 Guardando resultado en {output_file}...")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(merged_data, f, ensure_ascii=False, indent=2)
+    with ChangeJournal(output_file, 'merge_data') as journal:
+        # Cargar datos
+        logger.info(f"\n📂 Cargando datos existentes de {existing_file}...")
+        entries = list(journal.rooms())
+        existing_data = [room for _, room in entries]
+        logger.info(f"✓ {len(existing_data)} escape rooms cargados")
+
+        logger.info(f"\n📂 Cargando datos nuevos de {new_file}...")
+        new_data = load_json(new_file)
+        logger.info(f"✓ {len(new_data)} escape rooms nuevos cargados")
+
+        # Hacer backup
+        if existing_data:
+            logger.info(f"\n💾 Creando backup en {backup_file}...")
+            write_records(backup_file, existing_data)
+            logger.info("✓ Backup creado")
+
+        # Combinar (por ID canónico si se ha ejecutado entity_resolution.py)
+        canonical_ids = load_mapping()
+        logger.info(f"\n🔗 {len(canonical_ids['rooms'])} salas canónicas en la tabla de mapeo")
+        before = [dict(room) for room in existing_data]
+        merged_data = merge_escape_rooms(
+            existing_data, new_data, canonical_ids,
+            existing_source=source_name(existing_file), new_source=source_name(new_file),
+        )
+
+        # Anotar sólo las diferencias con lo que había
+        logger.info(f"\n💾 Anotando cambios en el diario de {output_file}...")
+        kept = {id(room) for room in merged_data}
+        for (key, room), old in zip(entries, before):
+            if id(room) not in kept:
+                journal.remove(key)
+                continue
+            journal.update(key, old, room)
+        existing_ids = {id(room) for room in existing_data}
+        for room in merged_data:
+            if id(room) not in existing_ids:
+                journal.add(room)
 
     logger.info(f"✅ Archivo actualizado exitosamente!")
     logger.info(f"\n📊 Resumen:")
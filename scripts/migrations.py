@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Migraciones del esquema de words.db, las mismas que hace la app.
+
+WordDatabase (word_database.dart) crea `words` en _createDB y añade columnas
+en _onUpgrade según PRAGMA user_version. migrate() repite esos pasos desde la
+versión que tenga la BD hasta APP_VERSION y después añade las columnas que
+escriben los scripts:
+
+- APP_MIGRATIONS: columnas de cada versión de la app (2: empresa, 3: precio,
+  jugadores..., 4: imagenUrl)
+- PIPELINE_COLUMNS: source, wordStatus, isDeleted e isSynced
+  (add_missing_escapes_to_db.py) y canonicalId (catalog_delta.py), más las
+  numéricas, de dirección y generoIds (parse_fields, address_parser,
+  genre_taxonomy)
+
+Todo va en una sola transacción (SAVEPOINT, así sirve también dentro de
+BulkLoad): o la BD queda migrada entera o no cambia. Sobre una BD ya al día
+no escribe nada (ni user_version ni los géneros), para no cambiar su fecha
+y no invalidar el snapshot de duplicados (dedup_snapshot.py). Sólo se añaden las
+columnas que falten, porque hay BD creadas por scripts antiguos con
+user_version 0 y las columnas ya puestas. user_version nunca pasa de
+APP_VERSION: si fuera mayor, sqflite trataría la BD como de otra versión.
+
+Los scripts que escriben en la BD llaman a migrate() antes de la carga, de
+modo que ninguna fila falla por una columna que no existe.
+
+Uso:
+    python3 migrations.py --db ruta/a/words.db            # migra
+    python3 migrations.py --db ruta/a/words.db --estado   # versión y columnas que faltan
+"""
+
+import argparse
+import logging
+import sqlite3
+from typing import Dict, List
+
+from address_parser import ADDRESS_COLUMNS, ensure_address_columns
+from genre_taxonomy import ensure_genre_tables
+from parse_fields import NUMERIC_COLUMNS, ensure_numeric_columns
+from query_indexes import ensure_query_indexes
+
+logger = logging.getLogger(__name__)
+
+# Versión de la BD en WordDatabase._initDB (openDatabase(version: ...))
+APP_VERSION = 4
+
+# WordDatabase._createDB: la tabla completa de APP_VERSION (BD nueva)
+APP_SCHEMA = """
+    CREATE TABLE words (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        genero TEXT,
+        ubicacion TEXT,
+        puntuacion TEXT,
+        web TEXT,
+        latitud REAL,
+        longitud REAL,
+        isFavorite INTEGER NOT NULL DEFAULT 0,
+        isPlayed INTEGER NOT NULL DEFAULT 0,
+        isPending INTEGER NOT NULL DEFAULT 0,
+        empresa TEXT,
+        review TEXT,
+        photoPath TEXT,
+        datePlayed TEXT,
+        personalRating INTEGER,
+        ratingPlayed INTEGER,
+        reviewPlayed TEXT,
+        historiaRating INTEGER,
+        ambientacionRating INTEGER,
+        jugabilidadRating INTEGER,
+        gameMasterRating INTEGER,
+        miedoRating INTEGER,
+        precio TEXT,
+        jugadores TEXT,
+        duracion TEXT,
+        descripcion TEXT,
+        numJugadoresMin INTEGER,
+        numJugadoresMax INTEGER,
+        dificultad TEXT,
+        telefono TEXT,
+        email TEXT,
+        provincia TEXT,
+        imagenUrl TEXT
+    )
+"""
+
+# WordDatabase._onUpgrade: columnas que añade cada versión
+APP_MIGRATIONS: Dict[int, Dict[str, str]] = {
+    2: {'empresa': "TEXT DEFAULT ''"},
+    3: {
+        'precio': 'TEXT',
+        'jugadores': 'TEXT',
+        'duracion': 'TEXT',
+        'descripcion': 'TEXT',
+        'numJugadoresMin': 'INTEGER',
+        'numJugadoresMax': 'INTEGER',
+        'dificultad': 'TEXT',
+        'telefono': 'TEXT',
+        'email': 'TEXT',
+        'provincia': 'TEXT',
+    },
+    4: {'imagenUrl': 'TEXT'},
+}
+
+# Columnas que escriben los scripts y que la app no crea
+PIPELINE_COLUMNS: Dict[str, str] = {
+    'source': 'TEXT',
+    'wordStatus': "TEXT DEFAULT 'active'",
+    'isDeleted': 'INTEGER NOT NULL DEFAULT 0',
+    'isSynced': 'INTEGER NOT NULL DEFAULT 0',
+    # ID canónico de la sala (entity_resolution.py), clave de catalog_delta.py
+    'canonicalId': 'TEXT',
+}
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """PRAGMA user_version de la BD"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _words_type(conn: sqlite3.Connection):
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'words'").fetchone()
+    return row[0] if row else None
+
+
+def missing_columns(conn: sqlite3.Connection) -> List[str]:
+    """Columnas de la app y del pipeline que le faltan a `words`"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(words)")}
+    expected = [c for version in sorted(APP_MIGRATIONS) for c in APP_MIGRATIONS[version]]
+    expected += [*PIPELINE_COLUMNS, *NUMERIC_COLUMNS, *ADDRESS_COLUMNS, 'generoIds']
+    return [column for column in expected if column not in existing]
+
+
+def _add_columns(conn: sqlite3.Connection, columns: Dict[str, str]) -> int:
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(words)")}
+    added = 0
+    for column, sql_type in columns.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE words ADD COLUMN {column} {sql_type}")
+            added += 1
+    return added
+
+
+def ensure_indexes(conn: sqlite3.Connection):
+    """Índices de las columnas del pipeline y de las consultas de la app"""
+    ensure_numeric_columns(conn)
+    ensure_address_columns(conn)
+    ensure_query_indexes(conn)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_words_canonical ON words (canonicalId) "
+                 "WHERE canonicalId IS NOT NULL")
+
+
+def migrate(conn: sqlite3.Connection, indexes: bool = True) -> int:
+    """
+    Lleva `words` a APP_VERSION con todas las columnas del pipeline
+
+    Con `indexes` crea además sus índices; build_words_db los deja para
+    después de la carga.
+
+    Returns:
+        Versión de la BD antes de migrar (0 si no existía la tabla)
+    """
+    kind = _words_type(conn)
+    version = schema_version(conn) if kind else 0
+    if version > APP_VERSION:
+        raise sqlite3.DatabaseError(
+            f"words.db en versión {version} y migrations.py en {APP_VERSION}: "
+            f"añade aquí las migraciones nuevas de WordDatabase._onUpgrade")
+    if kind == 'view':
+        # Esquema normalizado: las columnas se añaden en salas, no en la vista
+        missing = missing_columns(conn)
+        if missing:
+            raise sqlite3.DatabaseError(f"words es una vista (normalized_schema.py), faltan: {', '.join(missing)}")
+        return version
+
+    conn.execute("SAVEPOINT migrate")
+    try:
+        added = 0
+        if kind is None:
+            conn.execute(APP_SCHEMA)
+        else:
+            for step in sorted(APP_MIGRATIONS):
+                if step > version:
+                    added += _add_columns(conn, APP_MIGRATIONS[step])
+        added += _add_columns(conn, PIPELINE_COLUMNS)
+        before = len(missing_columns(conn))
+        ensure_numeric_columns(conn, indexes=False)
+        ensure_address_columns(conn, indexes=False)
+        ensure_genre_tables(conn)
+        added += before - len(missing_columns(conn))
+        if indexes:
+            ensure_indexes(conn)
+        if version != APP_VERSION:
+            conn.execute(f"PRAGMA user_version = {APP_VERSION}")
+    except Exception:
+        conn.execute("ROLLBACK TO migrate")
+        conn.execute("RELEASE migrate")
+        raise
+    conn.execute("RELEASE migrate")
+
+    if kind is None:
+        logger.info(f"🆕 words creada en la versión {APP_VERSION}")
+    elif added or version != APP_VERSION:
+        logger.info(f"🔧 words: versión {version} → {APP_VERSION}, {added} columnas nuevas")
+    return version
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Migra words.db al esquema de la app y del pipeline")
+    parser.add_argument('--db', required=True, help="BD SQLite")
+    parser.add_argument('--estado', action='store_true', help="Sólo mostrar versión y columnas que faltan")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.estado:
+            missing = missing_columns(conn) if _words_type(conn) else ['words']
+            print(f"📋 Versión {schema_version(conn)} (app: {APP_VERSION})")
+            print(f"   Faltan: {', '.join(missing)}" if missing else "   ✅ Esquema completo")
+            return
+        migrate(conn)
+        logger.info(f"✅ {args.db} en la versión {schema_version(conn)}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
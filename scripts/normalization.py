@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Normalización de texto compartida por todos los scripts.
+
+- Patrones precompilados una sola vez
+- Acentos con `str.translate` (tabla generada desde la descomposición
+  Unicode); sólo los caracteres raros pasan por `unicodedata`
+- Caché LRU: los mismos nombres y ciudades se repiten mucho entre fuentes
+- API por lotes para normalizar columnas enteras
+
+Funciones:
+- fold(): minúsculas, sin acentos, símbolos → espacio (claves y bloqueo)
+- normalize_text(): minúsculas, sin acentos, símbolos eliminados (importador)
+- clean_text(): espacios colapsados y valores vacíos ("No disponible") → ""
+- merge_key(): clave nombre + ubicación de merge_data.py
+
+Uso:
+    python3 normalization.py --bench   # comparación con las versiones anteriores
+"""
+
+import re
+import sys
+import time
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+CACHE_SIZE = 65536
+
+# Valores que las fuentes usan para "sin dato"
+INVALID_VALUES = frozenset({'', 'no disponible', '/', '#', 'null', 'n/a'})
+
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+_SPACES_RE = re.compile(r'\s+')
+
+
+# Caracteres cubiertos por la tabla (latinos, griegos, puntuación, símbolos)
+_TABLE_LIMIT = '\u3000'
+
+
+def _build_accent_table() -> dict:
+    # Carácter → su descomposición NFKD sin marcas combinantes ('' para las marcas)
+    table = {}
+    for code in range(0x80, ord(_TABLE_LIMIT)):
+        char = chr(code)
+        decomposed = unicodedata.normalize('NFKD', char)
+        base = ''.join(c for c in decomposed if not unicodedata.combining(c))
+        if base != char:
+            table[code] = base
+    return table
+
+
+_ACCENT_TABLE = _build_accent_table()
+
+
+def strip_accents(text: str) -> str:
+    """Quita acentos y diacríticos (mismo resultado que NFKD sin marcas combinantes)"""
+    if text.isascii():
+        return text
+    if max(text) < _TABLE_LIMIT:
+        return text.translate(_ACCENT_TABLE)
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _fold(text: str) -> str:
+    text = strip_accents(text.lower())
+    text = _NON_WORD_RE.sub(' ', text)
+    return _SPACES_RE.sub(' ', text).strip()
+
+
+def fold(text: Optional[str]) -> str:
+    """Minúsculas, sin acentos, sin símbolos y con espacios colapsados"""
+    return _fold(text) if text else ""
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalize_text(text: str) -> str:
+    text = _NON_WORD_RE.sub('', strip_accents(text.lower()))
+    return _SPACES_RE.sub(' ', text).strip()
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Normaliza un texto eliminando acentos, símbolos y convirtiendo a minúsculas"""
+    return _normalize_text(text) if text else ""
+
+
+def clean_text(text: Optional[str]) -> str:
+    """Limpia espacios y saltos de línea; "" si el valor es un marcador de vacío"""
+    if not text:
+        return ""
+    text = _SPACES_RE.sub(' ', text).strip()
+    return "" if text.lower() in INVALID_VALUES else text
+
+
+def merge_key(name: Optional[str], location: Optional[str]) -> str:
+    """Clave nombre + ubicación (primeros 30 caracteres) para combinar datos
+
+    Sólo minúsculas y sin espacios en los extremos, como la normalize_key
+    original de merge_data.py: con fold() "Sala 1" y "Sala-1" (o "Léon" y
+    "Leon") darían la misma clave y se fusionarían salas distintas.
+    """
+    name = (name or '').lower().strip()
+    location = (location or '').lower().strip()[:30]
+    return f"{name}::{location}"
+
+
+# ===========================================
+# LOTES
+# ===========================================
+
+def fold_many(texts: Iterable[Optional[str]]) -> List[str]:
+    """fold() sobre una columna entera"""
+    return [_fold(t) if t else "" for t in texts]
+
+
+def normalize_many(texts: Iterable[Optional[str]]) -> List[str]:
+    """normalize_text() sobre una columna entera"""
+    return [_normalize_text(t) if t else "" for t in texts]
+
+
+def clean_many(texts: Iterable[Optional[str]]) -> List[str]:
+    """clean_text() sobre una columna entera"""
+    return [clean_text(t) for t in texts]
+
+
+def cache_info() -> dict:
+    """Aciertos y fallos de las cachés (para los benchmarks)"""
+    return {'fold': _fold.cache_info(), 'normalize_text': _normalize_text.cache_info()}
+
+
+# ===========================================
+# BENCHMARK
+# ===========================================
+
+def _legacy_fold(text):
+    # entity_resolution.fold / gazetteer.fold anteriores
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _legacy_normalize_text(text):
+    # import_to_database.normalize_text anterior
+    if not text:
+        return ""
+    replacements = {
+        'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
+        'Á': 'a', 'É': 'e', 'Í': 'i', 'Ó': 'o', 'Ú': 'u',
+        'ñ': 'n', 'Ñ': 'n', 'ü': 'u', 'Ü': 'u'
+    }
+    normalized = text
+    for old, new in replacements.items():
+        normalized = normalized.replace(old, new)
+    normalized = re.sub(r'[^\w\s]', '', normalized.lower())
+    normalized = re.sub(r'\s+', ' ', normalized).strip()
+    return normalized
+
+
+def _corpus() -> List[str]:
+    import json
+    import os
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    texts = []
+    for path in ("escape_rooms_scraped.json", "assets/escape_rooms_completo.json",
+                 "assets/escape_rooms_seed.json", "scripts/nuevos_escape_rooms.json"):
+        try:
+            with open(os.path.join(root, path), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+        for room in data if isinstance(data, list) else []:
+            texts.append(room.get('nombre') or room.get('text') or '')
+            texts.append(room.get('ubicacion') or '')
+    return texts
+
+
+def _timed(label: str, func, texts: List[str], baseline: Optional[float] = None) -> float:
+    start = time.perf_counter()
+    func(texts)
+    elapsed = time.perf_counter() - start
+    speedup = f" (x{baseline / elapsed:.1f})" if baseline else ""
+    print(f"{label:<32}: {elapsed * 1000:8.1f} ms{speedup}")
+    return elapsed
+
+
+def benchmark(rounds: int = 5):
+    """Compara con las implementaciones anteriores sobre los JSON del proyecto"""
+    texts = _corpus() * rounds
+    print(f"📋 {len(texts)} textos ({len(set(texts))} distintos)")
+
+    _fold.cache_clear()
+    _normalize_text.cache_clear()
+
+    t_fold = _timed("fold anterior (NFKD + re)", lambda ts: [_legacy_fold(t) for t in ts], texts)
+    _timed("fold sin caché", lambda ts: [_fold.__wrapped__(t) if t else "" for t in ts], texts, t_fold)
+    _timed("fold_many (caché)", fold_many, texts, t_fold)
+
+    t_norm = _timed("normalize_text anterior (replace)", lambda ts: [_legacy_normalize_text(t) for t in ts], texts)
+    _timed("normalize_many (caché)", normalize_many, texts, t_norm)
+
+    identical = fold_many(texts) == [_legacy_fold(t) for t in texts]
+    print(f"{'✅' if identical else '❌'} fold idéntico a la versión NFKD")
+    info = cache_info()['fold']
+    print(f"ℹ️ Caché de fold: {info.hits} aciertos, {info.misses} fallos")
+    return identical
+
+
+if __name__ == "__main__":
+    if '--bench' in sys.argv:
+        sys.exit(0 if benchmark() else 1)
+    print(__doc__)
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Esquema normalizado del catálogo, con una vista `words` compatible con la app.
+
+En `words` cada sala repite los datos de su empresa (nombre, web, teléfono,
+email) y de su local (dirección, coordenadas, provincia). Aquí van una vez:
+
+- empresas (id, nombre UNIQUE, web, telefono, email)
+- ubicaciones (id, ubicacion, calle, codigoPostal, ciudad, provincia,
+  latitud, longitud), un local por dirección + coordenadas
+- salas: los datos propios de la sala (con canonicalId), las columnas del
+  pipeline (source, wordStatus, isDeleted, isSynced) y las del usuario, con
+  empresa_id y ubicacion_id; web/telefono/email sólo si difieren de los de
+  la empresa
+- generos y words_generos (genre_taxonomy.py)
+
+La vista `words` une las tablas con los mismos nombres de columna que la
+tabla original, así que las consultas de la app no cambian. Los triggers
+INSTEAD OF traducen sus INSERT, UPDATE y DELETE a las tablas normalizadas.
+Dos diferencias con una tabla: un INSERT sobre la vista no actualiza
+last_insert_rowid(), y ALTER TABLE words no funciona, así que una migración
+futura de la app tiene que tocar `salas`. Por lo mismo, los scripts que
+añaden columnas o índices a `words` (import_to_database.py...) trabajan
+sobre la BD plana; ésta la genera build_words_db.py --normalizado. Los
+parches de catalog_delta.py sí se aplican: van por la vista, con canonicalId
+como clave.
+
+Filtrar por empresa o género pasa a ser una búsqueda por índice
+(empresas.nombre → idx_salas_empresa, words_generos).
+
+Uso:
+    python3 normalized_schema.py                      # compara plana y normalizada
+    python3 build_words_db.py --normalizado           # genera la BD normalizada
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+from change_journal import iter_view
+from normalization import fold
+
+logger = logging.getLogger(__name__)
+
+# Columnas de la sala (sin empresa ni ubicación), en el orden de `words`
+ROOM_COLUMNS = (
+    'text', 'genero', 'puntuacion', 'precio', 'jugadores', 'duracion', 'descripcion',
+    'numJugadoresMin', 'numJugadoresMax', 'dificultad', 'imagenUrl',
+    'precioMin', 'precioMax', 'duracionMinutos', 'puntuacionNum', 'generoIds', 'canonicalId',
+)
+# Columnas del pipeline (migrations.PIPELINE_COLUMNS) salvo canonicalId
+PIPELINE_COLUMNS = ('source', 'wordStatus', 'isDeleted', 'isSynced')
+USER_COLUMNS = (
+    'isFavorite', 'isPlayed', 'isPending', 'review', 'photoPath', 'datePlayed',
+    'personalRating', 'ratingPlayed', 'reviewPlayed', 'historiaRating',
+    'ambientacionRating', 'jugabilidadRating', 'gameMasterRating', 'miedoRating',
+)
+COMPANY_COLUMNS = ('web', 'telefono', 'email')
+LOCATION_COLUMNS = ('calle', 'codigoPostal', 'ciudad', 'provincia')
+
+SCHEMA = [
+    """
+    CREATE TABLE empresas (
+        id INTEGER PRIMARY KEY,
+        nombre TEXT NOT NULL UNIQUE,
+        web TEXT,
+        telefono TEXT,
+        email TEXT
+    )
+    """,
+    """
+    CREATE TABLE ubicaciones (
+        id INTEGER PRIMARY KEY,
+        ubicacion TEXT NOT NULL,
+        calle TEXT,
+        codigoPostal TEXT,
+        ciudad TEXT,
+        provincia TEXT,
+        latitud REAL NOT NULL DEFAULT 0,
+        longitud REAL NOT NULL DEFAULT 0,
+        UNIQUE (ubicacion, latitud, longitud)
+    )
+    """,
+    """
+    CREATE TABLE salas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        empresa_id INTEGER REFERENCES empresas (id),
+        ubicacion_id INTEGER REFERENCES ubicaciones (id),
+        genero TEXT,
+        puntuacion TEXT,
+        precio TEXT,
+        jugadores TEXT,
+        duracion TEXT,
+        descripcion TEXT,
+        numJugadoresMin INTEGER,
+        numJugadoresMax INTEGER,
+        dificultad TEXT,
+        imagenUrl TEXT,
+        precioMin REAL,
+        precioMax REAL,
+        duracionMinutos INTEGER,
+        puntuacionNum REAL,
+        generoIds TEXT,
+        canonicalId TEXT,
+        source TEXT,
+        wordStatus TEXT DEFAULT 'active',
+        isDeleted INTEGER NOT NULL DEFAULT 0,
+        isSynced INTEGER NOT NULL DEFAULT 0,
+        web TEXT,
+        telefono TEXT,
+        email TEXT,
+        isFavorite INTEGER NOT NULL DEFAULT 0,
+        isPlayed INTEGER NOT NULL DEFAULT 0,
+        isPending INTEGER NOT NULL DEFAULT 0,
+        review TEXT,
+        photoPath TEXT,
+        datePlayed TEXT,
+        personalRating INTEGER,
+        ratingPlayed INTEGER,
+        reviewPlayed TEXT,
+        historiaRating INTEGER,
+        ambientacionRating INTEGER,
+        jugabilidadRating INTEGER,
+        gameMasterRating INTEGER,
+        miedoRating INTEGER
+    )
+    """,
+]
+
+INDEXES = {
+    'idx_salas_empresa': 'salas (empresa_id)',
+    'idx_salas_ubicacion': 'salas (ubicacion_id)',
+    'idx_salas_precio_min': 'salas (precioMin)',
+    'idx_salas_jugadores': 'salas (numJugadoresMin, numJugadoresMax)',
+    'idx_salas_duracion': 'salas (duracionMinutos)',
+    'idx_salas_puntuacion': 'salas (puntuacionNum)',
+    'idx_ubicaciones_provincia': 'ubicaciones (provincia)',
+    'idx_ubicaciones_codigo_postal': 'ubicaciones (codigoPostal)',
+}
+
+# Vista con las columnas de la tabla `words` (las de la app y las del pipeline)
+WORDS_VIEW = f"""
+    CREATE VIEW words AS
+    SELECT
+        s.id, s.text, s.genero, u.ubicacion, s.puntuacion,
+        COALESCE(s.web, e.web) AS web, u.latitud, u.longitud,
+        s.isFavorite, s.isPlayed, s.isPending, e.nombre AS empresa,
+        {', '.join('s.' + c for c in USER_COLUMNS[3:])},
+        s.precio, s.jugadores, s.duracion, s.descripcion,
+        s.numJugadoresMin, s.numJugadoresMax, s.dificultad,
+        COALESCE(s.telefono, e.telefono) AS telefono,
+        COALESCE(s.email, e.email) AS email,
+        u.provincia, s.imagenUrl,
+        {', '.join('s.' + c for c in PIPELINE_COLUMNS)}, s.canonicalId,
+        s.precioMin, s.precioMax, s.duracionMinutos, s.puntuacionNum,
+        u.calle, u.codigoPostal, u.ciudad, s.generoIds
+    FROM salas s
+    LEFT JOIN empresas e ON e.id = s.empresa_id
+    LEFT JOIN ubicaciones u ON u.id = s.ubicacion_id
+"""
+
+# Empresa y local de NEW (se crean si no existen); la app no conoce calle,
+# codigoPostal ni ciudad, así que sólo se cambian si NEW trae un valor
+_UPSERT_REFS = f"""
+    INSERT OR IGNORE INTO empresas (nombre)
+    SELECT NEW.empresa WHERE NEW.empresa IS NOT NULL AND NEW.empresa != '';
+    INSERT OR IGNORE INTO ubicaciones (ubicacion, latitud, longitud)
+    VALUES (COALESCE(NEW.ubicacion, ''), COALESCE(NEW.latitud, 0), COALESCE(NEW.longitud, 0));
+    UPDATE ubicaciones SET provincia = NEW.provincia,
+        {', '.join(f"{c} = COALESCE(NEW.{c}, {c})" for c in LOCATION_COLUMNS[:3])}
+    WHERE ubicacion = COALESCE(NEW.ubicacion, '') AND latitud = COALESCE(NEW.latitud, 0)
+      AND longitud = COALESCE(NEW.longitud, 0)
+      AND (provincia IS NOT NEW.provincia
+           OR {' OR '.join(f"COALESCE(NEW.{c}, {c}) IS NOT {c}" for c in LOCATION_COLUMNS[:3])});
+"""
+_COMPANY_ID = "(SELECT id FROM empresas WHERE nombre = NEW.empresa)"
+_LOCATION_ID = """(SELECT id FROM ubicaciones WHERE ubicacion = COALESCE(NEW.ubicacion, '')
+                   AND latitud = COALESCE(NEW.latitud, 0) AND longitud = COALESCE(NEW.longitud, 0))"""
+# web/telefono/email de la sala sólo si difieren de los de la empresa
+_OWN_VALUES = [
+    f"NULLIF(NEW.{c}, (SELECT {c} FROM empresas WHERE nombre = NEW.empresa))" for c in COMPANY_COLUMNS
+]
+_WRITABLE = ROOM_COLUMNS + PIPELINE_COLUMNS + USER_COLUMNS
+# Valores por defecto de salas para un INSERT en la vista sin esas columnas
+_DEFAULTS = {'wordStatus': "'active'", 'isDeleted': '0', 'isSynced': '0',
+             **{c: '0' for c in USER_COLUMNS[:3]}}
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER words_insert INSTEAD OF INSERT ON words BEGIN
+        {_UPSERT_REFS}
+        INSERT INTO salas (id, empresa_id, ubicacion_id, {', '.join(COMPANY_COLUMNS)}, {', '.join(_WRITABLE)})
+        VALUES (NEW.id, {_COMPANY_ID}, {_LOCATION_ID}, {', '.join(_OWN_VALUES)},
+                {', '.join(f"COALESCE(NEW.{c}, {_DEFAULTS[c]})" if c in _DEFAULTS else f"NEW.{c}" for c in _WRITABLE)});
+    END
+    """,
+    f"""
+    CREATE TRIGGER words_update INSTEAD OF UPDATE ON words BEGIN
+        {_UPSERT_REFS}
+        UPDATE salas SET
+            empresa_id = {_COMPANY_ID},
+            ubicacion_id = {_LOCATION_ID},
+            {', '.join(f"{c} = {v}" for c, v in zip(COMPANY_COLUMNS, _OWN_VALUES))},
+            {', '.join(f"{c} = NEW.{c}" for c in _WRITABLE)}
+        WHERE id = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER words_delete INSTEAD OF DELETE ON words BEGIN
+        DELETE FROM words_generos WHERE word_id = OLD.id;
+        DELETE FROM salas WHERE id = OLD.id;
+    END
+    """,
+]
+
+
+def create_normalized_schema(conn: sqlite3.Connection):
+    """Tablas normalizadas, vista `words` y sus triggers (BD vacía)"""
+    for sql in SCHEMA:
+        conn.execute(sql)
+    conn.execute(WORDS_VIEW)
+    for sql in TRIGGERS:
+        conn.execute(sql)
+
+
+def create_normalized_indexes(conn: sqlite3.Connection):
+    """Índices de las tablas normalizadas (después de cargar)"""
+    for name, target in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    # Clave de los parches de catalog_delta.py, como idx_words_canonical en la BD plana
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_salas_canonical ON salas (canonicalId) "
+                 "WHERE canonicalId IS NOT NULL")
+
+
+def _company_name(room: Dict) -> Optional[str]:
+    return room.get('empresa') or None
+
+
+def write_normalized_rooms(conn: sqlite3.Connection, rooms: List[Dict]) -> Dict[str, int]:
+    """
+    Inserta salas ya preparadas (build_words_db.prepare_rooms) directamente en
+    las tablas, sin pasar por los triggers
+
+    Returns:
+        Número de salas, empresas y ubicaciones
+    """
+    companies: Dict[str, Tuple] = {}
+    locations: Dict[Tuple, Tuple] = {}
+    for room in rooms:
+        nombre = _company_name(room)
+        # La primera sala con cada dato lo aporta a la empresa
+        if nombre:
+            previous = companies.get(fold(nombre), (nombre, None, None, None))
+            companies[fold(nombre)] = (nombre,) + tuple(
+                previous[i + 1] or room.get(c) or None for i, c in enumerate(COMPANY_COLUMNS)
+            )
+        key = (room.get('ubicacion') or '', room.get('latitud') or 0.0, room.get('longitud') or 0.0)
+        if key not in locations:
+            locations[key] = tuple(room.get(c) or None for c in LOCATION_COLUMNS)
+
+    company_ids = {key: i for i, key in enumerate(companies, 1)}
+    location_ids = {key: i for i, key in enumerate(locations, 1)}
+    conn.executemany(
+        f"INSERT INTO empresas (id, nombre, {', '.join(COMPANY_COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+        [(company_ids[key],) + values for key, values in companies.items()],
+    )
+    conn.executemany(
+        f"INSERT INTO ubicaciones (id, ubicacion, latitud, longitud, {', '.join(LOCATION_COLUMNS)}) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(location_ids[key],) + key + values for key, values in locations.items()],
+    )
+
+    rows = []
+    for room in rooms:
+        nombre = _company_name(room)
+        company = companies.get(fold(nombre)) if nombre else None
+        own = tuple(
+            None if company and room.get(c) == company[i + 1] else room.get(c)
+            for i, c in enumerate(COMPANY_COLUMNS)
+        )
+        key = (room.get('ubicacion') or '', room.get('latitud') or 0.0, room.get('longitud') or 0.0)
+        rows.append(
+            (room['id'], company_ids.get(fold(nombre)) if nombre else None, location_ids[key])
+            + own + tuple(room.get(c) for c in ROOM_COLUMNS)
+        )
+    conn.executemany(
+        f"INSERT INTO salas (id, empresa_id, ubicacion_id, {', '.join(COMPANY_COLUMNS)}, {', '.join(ROOM_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in range(3 + len(COMPANY_COLUMNS) + len(ROOM_COLUMNS)))})",
+        rows,
+    )
+    return {'salas': len(rows), 'empresas': len(companies), 'ubicaciones': len(locations)}
+
+
+# ===========================================
+# COMPARACIÓN
+# ===========================================
+
+def compare(json_paths: List[str], repeat: int = 200):
+    """Construye la BD plana y la normalizada y compara tamaño y filtros"""
+    from build_words_db import build_database, prepare_rooms
+
+    rooms = []
+    for path in json_paths:
+        rooms.extend(iter_view(path))
+    prepared = prepare_rooms(rooms)
+    company = next((r['empresa'] for r in prepared if r.get('empresa')), '')
+    queries = {
+        'por empresa': ("SELECT id FROM words WHERE empresa = ?", (company,)),
+        'por género': ("SELECT w.id FROM words_generos g JOIN words w ON w.id = g.word_id WHERE g.genero_id = ?",
+                       ('terror',)),
+        'por provincia': ("SELECT id FROM words WHERE provincia = ?", ('Madrid',)),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'':<16} {'plana':>12} {'normalizada':>12}")
+        results = {}
+        for normalized in (False, True):
+            path = os.path.join(tmp, f"words_{normalized}.db")
+            stats = build_database([dict(r) for r in prepared], path, virtual_tables=False, normalized=normalized)
+            conn = sqlite3.connect(path)
+            timings = {}
+            for name, (sql, params) in queries.items():
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    conn.execute(sql, params).fetchall()
+                timings[name] = (time.perf_counter() - start) * 1000 / repeat
+            conn.close()
+            results[normalized] = (stats['bytes'], timings)
+        print(f"{'tamaño (KB)':<16} {results[False][0] / 1024:>12.0f} {results[True][0] / 1024:>12.0f}")
+        for name in queries:
+            print(f"{name + ' (ms)':<16} {results[False][1][name]:>12.3f} {results[True][1][name]:>12.3f}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from build_words_db import DEFAULT_INPUT
+
+    parser = argparse.ArgumentParser(description="Compara words.db plana y normalizada")
+    parser.add_argument('entradas', nargs='*', default=[DEFAULT_INPUT], help="JSON de escape rooms")
+    args = parser.parse_args()
+    compare(args.entradas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Convierte los campos de texto libre del catálogo en columnas numéricas.
+
+    precio      "€ Desde 15€ por persona"        → precioMin 15, precioMax None
+    jugadores   "De 2 a 6 jugadores"             → numJugadoresMin 2, numJugadoresMax 6
+    duracion    "Duración del juego: 75 min."    → duracionMinutos 75
+                "1h 30min", "1 hora y 30 minutos" → duracionMinutos 90
+    puntuacion  "9.6"                            → puntuacionNum 9.6
+
+Se procesa por columnas: cada columna se extrae entera, se parsea una sola
+vez cada valor distinto (hay pocos: "De 2 a 6 jugadores" se repite cientos
+de veces) y se vuelve a escribir. Los criterios de jugadores y duración son
+los de ParsingUtils en la app.
+
+Uso:
+    python3 parse_fields.py ../assets/escape_rooms_completo.json
+    python3 parse_fields.py entrada.json --salida salida.json
+    python3 parse_fields.py --db ruta/a/words.db    # añade columnas e índices
+"""
+
+import argparse
+import logging
+import re
+import sqlite3
+from typing import Callable, Dict, List, Optional, Tuple
+
+from change_journal import run_catalog_step
+
+logger = logging.getLogger(__name__)
+
+# Columnas numéricas nuevas (las de jugadores ya existen en la app)
+NUMERIC_COLUMNS = {
+    'precioMin': 'REAL',
+    'precioMax': 'REAL',
+    'numJugadoresMin': 'INTEGER',
+    'numJugadoresMax': 'INTEGER',
+    'duracionMinutos': 'INTEGER',
+    'puntuacionNum': 'REAL',
+}
+
+# Índices para filtrar con comparaciones numéricas
+NUMERIC_INDEXES = {
+    'idx_words_precio_min': 'precioMin',
+    'idx_words_jugadores': 'numJugadoresMin, numJugadoresMax',
+    'idx_words_duracion': 'duracionMinutos',
+    'idx_words_puntuacion': 'puntuacionNum',
+}
+
+MAX_PLAYERS = 50
+MIN_MINUTES, MAX_MINUTES = 10, 600
+
+_AMOUNT = r'(\d+(?:[.,]\d{1,2})?)'
+_PRICE_RANGE_RE = re.compile(_AMOUNT + r'\s*€?\s*(?:-|–|a)\s*' + _AMOUNT + r'\s*€')
+_PRICE_FROM_RE = re.compile(r'(?:desde|a partir de)\s*' + _AMOUNT)
+_PRICE_RE = re.compile(_AMOUNT + r'\s*(?:€|eur)')
+
+_PLAYERS_RANGE_RES = [
+    re.compile(r'de\s+(\d+)\s+a\s+(\d+)'),
+    re.compile(r'(\d+)\s*-\s*(\d+)'),
+    re.compile(r'(\d+)\s+a\s+(\d+)'),
+]
+_PLAYERS_MAX_RE = re.compile(r'(?:hasta|m[aá]ximo)\s+(\d+)')
+_PLAYERS_MIN_RE = re.compile(r'(?:m[ií]nimo|desde)\s+(\d+)')
+_NUMBER_RE = re.compile(r'\d+')
+
+_DURATION_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(horas?|hours?|h(?![a-z])|min)')
+# Minutos después de las horas: con unidad ("1h 30min", "1 hora y 30 minutos")
+# o pegados a la h ("1h30"); "1h, 4 jugadores" no son 64 minutos
+_MINUTES_AFTER_HOURS_RE = re.compile(r'\s*(?:y|and|,)?\s*(\d{1,2})\s*min|(\d{1,2})(?![\d.,])')
+_BARE_DURATION_RE = re.compile(r'^\s*(\d+)\s*$')
+
+_RATING_RE = re.compile(r'^\s*(\d{1,2}(?:[.,]\d+)?)\s*(?:/\s*10)?\s*$')
+
+
+def _to_float(value: str) -> float:
+    return float(value.replace(',', '.'))
+
+
+# ===========================================
+# PARSERS (un valor)
+# ===========================================
+
+def parse_precio(text) -> Tuple[Optional[float], Optional[float]]:
+    """(mínimo, máximo) en euros por persona; "Desde X" deja el máximo vacío"""
+    if not text:
+        return None, None
+    lower = str(text).lower()
+
+    match = _PRICE_RANGE_RE.search(lower)
+    if match:
+        low, high = sorted((_to_float(match.group(1)), _to_float(match.group(2))))
+        return (low, high) if low > 0 else (None, None)
+
+    match = _PRICE_FROM_RE.search(lower)
+    if match:
+        low = _to_float(match.group(1))
+        # "Desde 0€" es un hueco de la fuente, no una sala gratis
+        return (low, None) if low > 0 else (None, None)
+
+    match = _PRICE_RE.search(lower)
+    if match:
+        amount = _to_float(match.group(1))
+        return (amount, amount) if amount > 0 else (None, None)
+
+    return None, None
+
+
+def parse_jugadores(text) -> Tuple[Optional[int], Optional[int]]:
+    """(mínimo, máximo) de jugadores, como ParsingUtils.parseJugadores"""
+    if not text:
+        return None, None
+    lower = str(text).lower().strip()
+
+    result: Tuple[Optional[int], Optional[int]] = (None, None)
+    for pattern in _PLAYERS_RANGE_RES:
+        match = pattern.search(lower)
+        if match:
+            result = int(match.group(1)), int(match.group(2))
+            break
+    else:
+        match = _PLAYERS_MAX_RE.search(lower)
+        if match:
+            result = 1, int(match.group(1))
+        else:
+            match = _PLAYERS_MIN_RE.search(lower)
+            if match:
+                result = int(match.group(1)), None
+            else:
+                numbers = _NUMBER_RE.findall(lower)
+                if len(numbers) >= 2:
+                    result = int(numbers[0]), int(numbers[1])
+                elif numbers:
+                    result = int(numbers[0]), int(numbers[0])
+
+    low, high = result
+    if low is not None and not 1 <= low <= MAX_PLAYERS:
+        return None, None
+    if high is not None and not (low or 1) <= high <= MAX_PLAYERS:
+        return None, None
+    return low, high
+
+
+def parse_duracion(text) -> Optional[int]:
+    """Duración en minutos ("1 hora" → 60, "1h 30min" → 90, "Duración del juego: 75 min." → 75)"""
+    if not text:
+        return None
+    lower = str(text).lower()
+
+    match = _DURATION_RE.search(lower)
+    if match:
+        amount = _to_float(match.group(1))
+        if match.group(2).startswith('h'):
+            minutes = amount * 60
+            extra = _MINUTES_AFTER_HOURS_RE.match(lower, match.end())
+            if extra:
+                minutes += int(extra.group(1) or extra.group(2))
+        else:
+            minutes = amount
+    else:
+        match = _BARE_DURATION_RE.match(lower)
+        if not match:
+            return None
+        minutes = int(match.group(1))
+
+    minutes = int(round(minutes))
+    return minutes if MIN_MINUTES <= minutes <= MAX_MINUTES else None
+
+
+def parse_puntuacion(text) -> Optional[float]:
+    """Puntuación sobre 10 ("9.6", "9,6", "8/10")"""
+    if isinstance(text, (int, float)):
+        value = float(text)
+    else:
+        match = _RATING_RE.match(text or '')
+        if not match:
+            return None
+        value = _to_float(match.group(1))
+    return value if 0 <= value <= 10 else None
+
+
+# ===========================================
+# POR COLUMNAS
+# ===========================================
+
+def _parse_column(values: List, parser: Callable) -> List:
+    # Cada valor distinto se parsea una sola vez
+    cache: Dict = {}
+    out = []
+    for value in values:
+        key = value if isinstance(value, (str, int, float)) or value is None else str(value)
+        if key not in cache:
+            cache[key] = parser(value)
+        out.append(cache[key])
+    return out
+
+
+def parse_columns(rooms: List[Dict]) -> Dict[str, List]:
+    """Columnas numéricas para una lista de escape rooms (mismo orden)"""
+    precios = _parse_column([r.get('precio') for r in rooms], parse_precio)
+    jugadores = _parse_column([r.get('jugadores') for r in rooms], parse_jugadores)
+    return {
+        'precioMin': [p[0] for p in precios],
+        'precioMax': [p[1] for p in precios],
+        'numJugadoresMin': [j[0] for j in jugadores],
+        'numJugadoresMax': [j[1] for j in jugadores],
+        'duracionMinutos': _parse_column([r.get('duracion') for r in rooms], parse_duracion),
+        'puntuacionNum': _parse_column([r.get('puntuacion') for r in rooms], parse_puntuacion),
+    }
+
+
+def apply_columns(rooms: List[Dict], overwrite: bool = False) -> Dict[str, int]:
+    """
+    Escribe las columnas numéricas en los registros
+
+    Args:
+        rooms: Escape rooms (se modifican)
+        overwrite: Sustituir valores numéricos que ya tuvieran
+
+    Returns:
+        Valores rellenados por columna
+    """
+    filled = {}
+    for column, values in parse_columns(rooms).items():
+        count = 0
+        for room, value in zip(rooms, values):
+            if room.get(column) is not None and not overwrite:
+                continue
+            room[column] = value
+            count += value is not None
+        filled[column] = count
+    return filled
+
+
+def parse_room(room: Dict) -> Dict:
+    """Columnas numéricas de un único escape room"""
+    return {column: values[0] for column, values in parse_columns([room]).items()}
+
+
+# ===========================================
+# SQLITE
+# ===========================================
+
+def ensure_numeric_columns(conn: sqlite3.Connection, indexes: bool = True):
+    """Añade a `words` las columnas numéricas que falten (y sus índices)"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(words)")}
+    for column, sql_type in NUMERIC_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE words ADD COLUMN {column} {sql_type}")
+    if indexes:
+        for name, columns in NUMERIC_INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON words ({columns})")
+
+
+def update_database(db_path: str, overwrite: bool = False) -> int:
+    """Rellena las columnas numéricas de todas las filas de la BD"""
+    conn = sqlite3.connect(db_path)
+    try:
+        from migrations import migrate  # migrations importa este módulo
+        migrate(conn)
+        rows = conn.execute("SELECT id, precio, jugadores, duracion, puntuacion FROM words").fetchall()
+        rooms = [{'precio': p, 'jugadores': j, 'duracion': d, 'puntuacion': s} for _, p, j, d, s in rows]
+        columns = parse_columns(rooms)
+
+        names = list(NUMERIC_COLUMNS)
+        params = [
+            tuple(columns[name][i] for name in names) + (row[0],)
+            for i, row in enumerate(rows)
+        ]
+        # Los jugadores pueden venir editados desde la app: sólo se rellenan huecos
+        assignments = ", ".join(
+            f"{name} = COALESCE({name}, ?)" if name.startswith('numJugadores') and not overwrite else f"{name} = ?"
+            for name in names
+        )
+        with conn:
+            conn.executemany(f"UPDATE words SET {assignments} WHERE id = ?", params)
+        return len(params)
+    finally:
+        conn.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Columnas numéricas de precio, jugadores, duración y puntuación")
+    parser.add_argument('entrada', nargs='?', help="JSON de escape rooms")
+    parser.add_argument('--salida', help="JSON de salida (por defecto, sobrescribe la entrada)")
+    parser.add_argument('--db', help="BD SQLite a actualizar")
+    parser.add_argument('--sobrescribir', action='store_true', help="Recalcular valores ya presentes")
+    args = parser.parse_args()
+
+    if not args.entrada and not args.db:
+        parser.error("indica un JSON de entrada y/o --db")
+
+    if args.entrada:
+        run_catalog_step(
+            args.entrada, 'parse_fields', lambda rooms: apply_columns(rooms, args.sobrescribir),
+            args.salida, {'sobrescribir': args.sobrescribir},
+            summary=lambda filled: (f"{column}: {count}" for column, count in filled.items()),
+        )
+
+    if args.db:
+        updated = update_database(args.db, args.sobrescribir)
+        logger.info(f"✅ {updated} filas actualizadas en {args.db}")
+
+
+if __name__ == "__main__":
+    main()
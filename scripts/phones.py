@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Normalización de teléfonos a E.164 e índice teléfono → empresa/salas.
+
+El teléfono es el identificador más fiable de un local: cambia el nombre de
+la sala o la forma de escribir la dirección, pero no el número. Todas las
+formas de escribirlo se llevan a E.164:
+
+    "91 123 45 67", "+34 911 234 567", "0034911234567", "(+34) 911-23-45-67"
+        → "+34911234567"
+
+Si el campo trae más de un número o una extensión, se toma el primer
+teléfono válido:
+
+    "91 123 45 67 / 600 123 456", "911 23 45 67 ext 2"  → "+34911234567"
+    "911234567 - 666777888"                              → "+34911234567"
+
+Al guardar (phone_field), un valor del que no sale ningún teléfono se deja
+como estaba: nunca se escribe None encima de un dato.
+
+Un teléfono identifica a la empresa, no a la sala (una empresa tiene varias
+salas con el mismo número), así que el índice guarda las salas de cada
+teléfono y la coincidencia exacta es teléfono + nombre normalizado. Los
+pasos de deduplicación y merge la consultan antes de comparar nombres.
+
+Uso:
+    python3 phones.py "Tel: 91 123 45 67"
+    python3 phones.py --json ../assets/escape_rooms_completo.json
+    python3 phones.py --db ruta/a/words.db
+"""
+
+import argparse
+import logging
+import re
+import sqlite3
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Hashable, List, Optional
+
+from change_journal import run_catalog_step
+from normalization import CACHE_SIZE, INVALID_VALUES, fold
+
+logger = logging.getLogger(__name__)
+
+COUNTRY_CODE = '34'
+
+# Números nacionales: 9 cifras empezando por 6, 7, 8 o 9
+_NATIONAL_RE = re.compile(r'^[6789]\d{8}$')
+# Candidatos dentro de texto libre: cifras con separadores habituales
+_CANDIDATE_RE = re.compile(r'(?:\+|\b00)?\(?\d[\d\s.\-()]{7,17}\d')
+# Separadores entre varios números ("91... / 600...", "91... - 666...")
+_LIST_SEPARATOR_RE = re.compile(r'\s*[/,;]\s*|\s+-\s+')
+_NON_DIGIT_RE = re.compile(r'\D')
+
+
+# ===========================================
+# NORMALIZACIÓN
+# ===========================================
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _to_e164(text: str) -> Optional[str]:
+    international = text.lstrip().startswith(('+', '00', '(+'))
+    digits = _NON_DIGIT_RE.sub('', text)
+    if digits.startswith('00'):
+        digits = digits[2:]
+
+    if _NATIONAL_RE.match(digits):
+        return f"+{COUNTRY_CODE}{digits}"
+    if digits.startswith(COUNTRY_CODE) and _NATIONAL_RE.match(digits[2:]):
+        return f"+{digits}"
+    # Extranjeros: sólo si venían con prefijo internacional explícito
+    if international and 8 <= len(digits) <= 15 and not digits.startswith('0'):
+        return f"+{digits}"
+    return None
+
+
+def normalize_phone(text) -> Optional[str]:
+    """
+    Teléfono en E.164 ("+34911234567"), o None si no hay un número válido
+
+    Con varios números o una extensión, el primero válido (extract_phone).
+    """
+    if text is None or isinstance(text, bool):
+        return None
+    text = str(text).strip()
+    if text.lower() in INVALID_VALUES:
+        return None
+    return _to_e164(text) or extract_phone(text)
+
+
+def extract_phone(text: Optional[str]) -> Optional[str]:
+    """Primer teléfono válido de un texto libre, en E.164"""
+    if not text:
+        return None
+    for part in _LIST_SEPARATOR_RE.split(str(text)):
+        for match in _CANDIDATE_RE.finditer(part):
+            phone = _to_e164(match.group(0))
+            if phone:
+                return phone
+    return None
+
+
+def phone_field(raw) -> Optional[str]:
+    """
+    Valor a guardar en `telefono`: E.164 si sale un teléfono válido y, si
+    no, el valor original (sólo un valor vacío da None)
+    """
+    phone = normalize_phone(raw)
+    if phone:
+        return phone
+    if raw is None or isinstance(raw, bool):
+        return None
+    return str(raw).strip() or None
+
+
+def apply_phone_column(rooms: List[Dict]) -> Dict[str, int]:
+    """
+    Normaliza el campo `telefono` de los registros a E.164
+
+    Los valores de los que no sale un teléfono válido se dejan como estaban.
+
+    Returns:
+        Recuento de normalizados y sin normalizar
+    """
+    stats = {'normalizados': 0, 'sin_normalizar': 0}
+    for room in rooms:
+        raw = room.get('telefono')
+        if not raw:
+            continue
+        phone = normalize_phone(raw)
+        if phone:
+            room['telefono'] = phone
+        stats['normalizados' if phone else 'sin_normalizar'] += 1
+    return stats
+
+
+# ===========================================
+# ÍNDICE TELÉFONO → SALAS
+# ===========================================
+
+class PhoneIndex:
+    """
+    Salas de cada teléfono (E.164) para la coincidencia exacta
+
+    Cada sala se guarda con una clave cualquiera (índice, id de la BD, clave
+    de merge), su nombre normalizado y su empresa.
+    """
+
+    def __init__(self):
+        self._rooms: Dict[str, Dict[str, Hashable]] = defaultdict(dict)
+        self._companies: Dict[str, set] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def add(self, telefono, nombre: Optional[str], key: Hashable, empresa: Optional[str] = None):
+        """Registra una sala; el primer registro de cada nombre es el que se conserva"""
+        phone = normalize_phone(telefono)
+        if not phone:
+            return
+        nombre_norm = fold(nombre)
+        if nombre_norm:
+            self._rooms[phone].setdefault(nombre_norm, key)
+        if empresa:
+            self._companies[phone].add(empresa)
+
+    def find(self, telefono, nombre: Optional[str]) -> Optional[Hashable]:
+        """Clave de la sala con el mismo teléfono y el mismo nombre normalizado"""
+        phone = normalize_phone(telefono)
+        if not phone:
+            return None
+        rooms = self._rooms.get(phone)
+        return rooms.get(fold(nombre)) if rooms else None
+
+    def rooms(self, telefono) -> Dict[str, Hashable]:
+        """Nombre normalizado → clave de todas las salas de un teléfono"""
+        phone = normalize_phone(telefono)
+        return dict(self._rooms.get(phone, {})) if phone else {}
+
+    def companies(self, telefono) -> set:
+        """Empresas registradas con un teléfono"""
+        phone = normalize_phone(telefono)
+        return set(self._companies.get(phone, ())) if phone else set()
+
+
+# ===========================================
+# SQLITE
+# ===========================================
+
+def update_database(db_path: str) -> Dict[str, int]:
+    """Normaliza a E.164 la columna telefono de la BD"""
+    conn = sqlite3.connect(db_path)
+    try:
+        from migrations import migrate
+        migrate(conn)
+        rows = conn.execute(
+            "SELECT id, telefono FROM words WHERE telefono IS NOT NULL AND telefono != ''"
+        ).fetchall()
+        params = [(normalize_phone(raw), row_id) for row_id, raw in rows]
+        # Sin teléfono válido, la fila no se toca
+        changed = [(phone, row_id) for (phone, row_id), (_, raw) in zip(params, rows) if phone and phone != raw]
+        with conn:
+            conn.executemany("UPDATE words SET telefono = ? WHERE id = ?", changed)
+        return {'normalizados': sum(1 for p, _ in params if p), 'sin_normalizar': sum(1 for p, _ in params if not p),
+                'cambiados': len(changed)}
+    finally:
+        conn.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Normaliza teléfonos a E.164")
+    parser.add_argument('telefonos', nargs='*', help="Textos a normalizar (muestra el resultado)")
+    parser.add_argument('--json', help="JSON de escape rooms a normalizar")
+    parser.add_argument('--salida', help="JSON de salida (por defecto, sobrescribe la entrada)")
+    parser.add_argument('--db', help="BD SQLite a actualizar")
+    args = parser.parse_args()
+
+    if not args.telefonos and not args.json and not args.db:
+        parser.error("indica teléfonos, --json y/o --db")
+
+    for text in args.telefonos:
+        print(f"{text!r} → {extract_phone(text)!r}")
+
+    if args.json:
+        run_catalog_step(
+            args.json, 'phones', apply_phone_column, args.salida,
+            summary=lambda stats: (f"Normalizados: {stats['normalizados']}",
+                                   f"Sin normalizar (se dejan como estaban): {stats['sin_normalizar']}"),
+        )
+
+    if args.db:
+        stats = update_database(args.db)
+        logger.info(f"✅ {stats['cambiados']} teléfonos reescritos en {args.db} "
+                    f"({stats['sin_normalizar']} sin teléfono válido, sin tocar)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Índices secundarios según las consultas reales sobre words.db.
+
+WORKLOAD recoge las consultas que hacen la app (WordDatabase) y los scripts
+del pipeline. Para cada una, el script saca el plan (EXPLAIN QUERY PLAN) y la
+latencia antes y después de crear WORKLOAD_INDEXES y de pasar ANALYZE:
+
+- índices parciales para los filtros de "tiene / no tiene" (precio,
+  imagenUrl): sólo contienen las filas que cumplen la condición
+- índices de cobertura donde la consulta sólo necesita esas columnas
+  (empresa, text + empresa), para contar sin leer la fila entera
+
+`descripcion` no se indexa: el recuento necesita el propio texto (SQLite no
+da por cumplida la condición de un índice parcial al decidir si cubre la
+consulta) y un índice sobre descripciones largas duplicaría la tabla.
+
+Las consultas que siguen recorriendo la tabla se marcan en el informe, y
+también los índices que ninguna consulta usa. Los importadores llaman a
+ensure_query_indexes() al terminar.
+
+Uso:
+    python3 query_indexes.py --db ruta/a/words.db                 # crea índices e informa
+    python3 query_indexes.py --db ruta/a/words.db --solo-informe  # sólo planes actuales
+    python3 query_indexes.py --db ruta/a/words.db --bench 50000   # en una copia ampliada
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Query(NamedTuple):
+    name: str
+    origin: str
+    sql: str
+    params: Tuple = ()
+
+
+WORKLOAD = [
+    Query("sin_empresa", "WordDatabase.backfillEmpresaFromExisting",
+          "SELECT id, web, empresa FROM words WHERE empresa IS NULL OR empresa = ''"),
+    Query("cuenta_con_empresa", "WordDatabase.countConEmpresa",
+          "SELECT COUNT(*) as c FROM words WHERE TRIM(IFNULL(empresa, '')) <> ''"),
+    Query("por_provincia", "WordDatabase.getByProvincia",
+          "SELECT * FROM words WHERE provincia = ?", ("Madrid",)),
+    Query("provincias", "WordDatabase.getProvinciasDisponibles",
+          "SELECT DISTINCT provincia FROM words WHERE provincia IS NOT NULL AND provincia != '' ORDER BY provincia"),
+    Query("con_descripcion", "WordDatabase.getWithDescripcion",
+          "SELECT * FROM words WHERE descripcion IS NOT NULL AND descripcion != ''"),
+    Query("por_jugadores", "WordDatabase.getByNumJugadores",
+          "SELECT * FROM words WHERE (numJugadoresMin IS NULL OR numJugadoresMin <= ?) "
+          "AND (numJugadoresMax IS NULL OR numJugadoresMax >= ?)", (4, 4)),
+    Query("sin_provincia", "WordDatabase.backfillProvinciaFromCoordinates",
+          "SELECT id, latitud, longitud, ubicacion, provincia FROM words WHERE provincia IS NULL OR provincia = ''"),
+    Query("cuenta_descripcion", "WordDatabase (estadísticas)",
+          "SELECT COUNT(*) FROM words WHERE descripcion IS NOT NULL AND descripcion != ''"),
+    Query("cuenta_provincia", "WordDatabase (estadísticas)",
+          "SELECT COUNT(*) FROM words WHERE provincia IS NOT NULL AND provincia != ''"),
+    Query("cuenta_precio", "WordDatabase (estadísticas)",
+          "SELECT COUNT(*) FROM words WHERE precio IS NOT NULL AND precio != ''"),
+    Query("cuenta_jugadores", "WordDatabase (estadísticas)",
+          "SELECT COUNT(*) FROM words WHERE numJugadoresMin IS NOT NULL"),
+    Query("cuenta_empresa", "WordDatabase (estadísticas)",
+          "SELECT COUNT(*) FROM words WHERE empresa IS NOT NULL AND empresa != ''"),
+    Query("sin_imagen", "add_images_to_all.py",
+          "SELECT id, text, genero, empresa FROM words WHERE imagenUrl IS NULL OR imagenUrl = ''"),
+    Query("por_nombre_empresa", "add_missing_escapes_to_db.py",
+          "SELECT id FROM words WHERE text = ? AND empresa = ?", ("Madland", "Madland")),
+]
+
+# Los de provincia y jugadores ya los crean address_parser y parse_fields
+WORKLOAD_INDEXES: Dict[str, str] = {
+    "idx_words_empresa": "ON words (empresa)",
+    "idx_words_text_empresa": "ON words (text, empresa)",
+    "idx_words_con_precio": "ON words (precio) WHERE precio IS NOT NULL AND precio != ''",
+    "idx_words_sin_imagen": "ON words (id, text, genero, empresa) WHERE imagenUrl IS NULL OR imagenUrl = ''",
+}
+
+
+def ensure_query_indexes(conn: sqlite3.Connection):
+    """Crea los índices de WORKLOAD_INDEXES que falten"""
+    for name, definition in WORKLOAD_INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} {definition}")
+
+
+def query_plan(conn: sqlite3.Connection, query: Query) -> List[str]:
+    """Pasos del EXPLAIN QUERY PLAN de una consulta"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query.sql}", query.params)]
+
+
+def is_table_scan(plan: List[str]) -> bool:
+    """True si el plan recorre `words` entera (sin índice)"""
+    return any(step.startswith("SCAN words") and "INDEX" not in step for step in plan)
+
+
+def measure(conn: sqlite3.Connection, query: Query, repeat: int) -> float:
+    """Milisegundos por ejecución (con fetchall)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(query.sql, query.params).fetchall()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def snapshot(conn: sqlite3.Connection, repeat: int) -> Dict[str, Tuple[List[str], float]]:
+    """Plan y latencia de cada consulta del workload"""
+    return {query.name: (query_plan(conn, query), measure(conn, query, repeat)) for query in WORKLOAD}
+
+
+def report(before: Dict[str, Tuple[List[str], float]], after: Dict[str, Tuple[List[str], float]]):
+    """Imprime planes y latencias antes/después, y los índices que nadie usa"""
+    for query in WORKLOAD:
+        plan_before, ms_before = before[query.name]
+        plan_after, ms_after = after[query.name]
+        mark = "⚠️" if is_table_scan(plan_after) else "✅"
+        print(f"{mark} {query.name} ({query.origin}): {ms_before:.3f} ms → {ms_after:.3f} ms")
+        print(f"     antes:   {' | '.join(plan_before)}")
+        if plan_after != plan_before:
+            print(f"     después: {' | '.join(plan_after)}")
+
+    used = ' '.join(step for plan, _ in after.values() for step in plan)
+    unused = [name for name in WORKLOAD_INDEXES if name not in used]
+    if unused:
+        print(f"💤 Índices sin uso en el workload: {', '.join(unused)}")
+
+
+def optimize(conn: sqlite3.Connection, repeat: int = 20, create: bool = True):
+    """Mide el workload, crea los índices, pasa ANALYZE y vuelve a medir"""
+    before = snapshot(conn, repeat)
+    if create:
+        with conn:
+            ensure_query_indexes(conn)
+        conn.execute("ANALYZE")
+    after = snapshot(conn, repeat)
+    report(before, after)
+
+
+def _scaled_copy(db_path: str, rows: int, path: str) -> sqlite3.Connection:
+    # Copia de la BD sin los índices del workload, con `words` repetida hasta `rows` filas
+    source = sqlite3.connect(db_path)
+    conn = sqlite3.connect(path)
+    source.backup(conn)
+    source.close()
+    for name in WORKLOAD_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    columns = ', '.join(row[1] for row in conn.execute("PRAGMA table_info(words)") if row[1] != 'id')
+    (count,) = conn.execute("SELECT COUNT(*) FROM words").fetchone()
+    while 0 < count < rows:
+        conn.execute(f"INSERT INTO words ({columns}) SELECT {columns} FROM words LIMIT ?", (rows - count,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM words").fetchone()
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Índices de words.db según las consultas de la app y los scripts")
+    parser.add_argument('--db', required=True, help="BD SQLite")
+    parser.add_argument('--solo-informe', action='store_true', help="No crear índices, sólo mostrar planes")
+    parser.add_argument('--bench', type=int, metavar='FILAS', help="Medir en una copia ampliada a FILAS salas")
+    parser.add_argument('--repeticiones', type=int, default=20, help="Ejecuciones por consulta")
+    args = parser.parse_args()
+
+    if args.bench:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = _scaled_copy(args.db, args.bench, os.path.join(tmp, "bench.db"))
+            logger.info(f"📋 Copia de {args.db} con {args.bench} filas")
+            optimize(conn, args.repeticiones)
+            conn.close()
+        return
+
+    conn = sqlite3.connect(args.db)
+    try:
+        optimize(conn, args.repeticiones, create=not args.solo_informe)
+        if not args.solo_informe:
+            logger.info(f"✅ {len(WORKLOAD_INDEXES)} índices del workload en {args.db}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Índice espacial R*Tree del catálogo en words.db, para el mapa.
+
+`words_rtree (id, min_lat, max_lat, min_lng, max_lng)` guarda un punto (caja
+de tamaño cero) por sala con coordenadas válidas; el id es el de `words`.
+Las salas dentro del área visible del mapa salen del árbol sin recorrer la
+tabla, y las N más cercanas a un punto con cajas crecientes alrededor.
+
+El R*Tree guarda las coordenadas en float32 (redondeando hacia fuera), así
+que las consultas vuelven a filtrar con los REAL exactos de `words`.
+
+Como el índice FTS5, se reconstruye al importar; los triggers son opcionales
+(--triggers) porque el SQLite del sistema puede no traer R*Tree.
+
+Uso:
+    python3 rtree_index.py --db ruta/a/words.db                       # crea/reconstruye
+    python3 rtree_index.py --db ruta/a/words.db --caja 40.38 -3.75 40.45 -3.65
+    python3 rtree_index.py --db ruta/a/words.db --cerca 40.4168 -3.7038 -n 5
+    python3 rtree_index.py --db ruta/a/words.db --bench 50000
+"""
+
+import argparse
+import logging
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import List, Tuple
+
+from geo_index import METERS_PER_DEGREE, haversine_m
+
+logger = logging.getLogger(__name__)
+
+RTREE_TABLE = "words_rtree"
+
+# Coordenadas utilizables: ni vacías ni 0,0 (el valor por defecto del importador)
+_VALID_COORDS = """
+    latitud IS NOT NULL AND longitud IS NOT NULL
+    AND NOT (latitud = 0 AND longitud = 0)
+    AND latitud BETWEEN -90 AND 90 AND longitud BETWEEN -180 AND 180
+"""
+
+_TRIGGERS = {
+    "words_rtree_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS words_rtree_ai AFTER INSERT ON words
+        WHEN {_VALID_COORDS.replace('latitud', 'new.latitud').replace('longitud', 'new.longitud')}
+        BEGIN
+            INSERT INTO {RTREE_TABLE} VALUES (new.id, new.latitud, new.latitud, new.longitud, new.longitud);
+        END
+    """,
+    "words_rtree_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS words_rtree_ad AFTER DELETE ON words BEGIN
+            DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+        END
+    """,
+    "words_rtree_au": f"""
+        CREATE TRIGGER IF NOT EXISTS words_rtree_au AFTER UPDATE OF latitud, longitud ON words BEGIN
+            DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+            INSERT INTO {RTREE_TABLE}
+            SELECT new.id, new.latitud, new.latitud, new.longitud, new.longitud
+            WHERE {_VALID_COORDS.replace('latitud', 'new.latitud').replace('longitud', 'new.longitud')};
+        END
+    """,
+}
+
+Room = Tuple[int, str, float, float]
+
+
+def rtree_available(conn: sqlite3.Connection) -> bool:
+    """True si el SQLite de esta conexión tiene R*Tree"""
+    return bool(conn.execute(
+        "SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_RTREE'"
+    ).fetchone())
+
+
+def ensure_rtree(conn: sqlite3.Connection, triggers: bool = False):
+    """Crea words_rtree (y, si se pide, los triggers que lo mantienen al día)"""
+    conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(id, min_lat, max_lat, min_lng, max_lng)")
+    for sql in _TRIGGERS.values() if triggers else ():
+        conn.execute(sql)
+
+
+def drop_rtree_triggers(conn: sqlite3.Connection):
+    """Quita los triggers de sincronización (antes de copiar la BD a la app)"""
+    for name in _TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild_rtree(conn: sqlite3.Connection, triggers: bool = False) -> bool:
+    """
+    Crea o reconstruye words_rtree desde `words`
+
+    Returns:
+        False si el SQLite no tiene R*Tree (el índice se omite)
+    """
+    if not rtree_available(conn):
+        logger.warning("⚠️ SQLite sin R*Tree: se omite el índice espacial")
+        return False
+    ensure_rtree(conn, triggers)
+    conn.execute(f"DELETE FROM {RTREE_TABLE}")
+    conn.execute(f"""
+        INSERT INTO {RTREE_TABLE}
+        SELECT id, latitud, latitud, longitud, longitud FROM words
+        WHERE {_VALID_COORDS}
+    """)
+    return True
+
+
+def rtree_update_rows(conn: sqlite3.Connection, ids: List[int]):
+    """Vuelve a indexar sólo las filas `ids` (las que siguen existiendo y tienen coordenadas)"""
+    conn.executemany(f"DELETE FROM {RTREE_TABLE} WHERE id = ?", [(row_id,) for row_id in ids])
+    conn.executemany(f"""
+        INSERT INTO {RTREE_TABLE}
+        SELECT id, latitud, latitud, longitud, longitud FROM words
+        WHERE id = ? AND {_VALID_COORDS}
+    """, [(row_id,) for row_id in ids])
+
+
+def in_bbox(conn: sqlite3.Connection, south: float, west: float, north: float, east: float) -> List[Room]:
+    """Salas dentro de la caja visible del mapa: (id, text, latitud, longitud)"""
+    return conn.execute(f"""
+        SELECT w.id, w.text, w.latitud, w.longitud
+        FROM {RTREE_TABLE} r JOIN words w ON w.id = r.id
+        WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lng >= ? AND r.min_lng <= ?
+          AND w.latitud BETWEEN ? AND ? AND w.longitud BETWEEN ? AND ?
+    """, (south, north, west, east, south, north, west, east)).fetchall()
+
+
+def _box(lat: float, lng: float, radius_m: float) -> Tuple[float, float, float, float]:
+    dlat = radius_m / METERS_PER_DEGREE
+    dlng = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+
+
+def nearest(conn: sqlite3.Connection, lat: float, lng: float, n: int = 10,
+            radius_m: float = 1000, max_radius_m: float = 1_000_000) -> List[Tuple[Room, float]]:
+    """
+    Las `n` salas más cercanas a un punto, como ((id, text, latitud, longitud), metros)
+
+    Busca en una caja de `radius_m` y la duplica hasta tener `n` salas dentro
+    del círculo inscrito (las de fuera de ese círculo podrían no ser las más
+    cercanas).
+    """
+    while True:
+        found = [(room, haversine_m(lat, lng, room[2], room[3])) for room in in_bbox(conn, *_box(lat, lng, radius_m))]
+        found.sort(key=lambda item: item[1])
+        inside = [item for item in found if item[1] <= radius_m]
+        if len(inside) >= n or radius_m >= max_radius_m:
+            return (inside if len(inside) >= n else found)[:n]
+        radius_m *= 2
+
+
+# ===========================================
+# BENCHMARK
+# ===========================================
+
+def _scan_bbox(conn, south, west, north, east):
+    return conn.execute(
+        "SELECT id, text, latitud, longitud FROM words WHERE latitud BETWEEN ? AND ? AND longitud BETWEEN ? AND ?",
+        (south, north, west, east),
+    ).fetchall()
+
+
+def _scan_nearest(conn, lat, lng, n):
+    rows = conn.execute(f"SELECT id, text, latitud, longitud FROM words WHERE {_VALID_COORDS}").fetchall()
+    return sorted(((room, haversine_m(lat, lng, room[2], room[3])) for room in rows), key=lambda item: item[1])[:n]
+
+
+def benchmark(db_path: str, rows: int, repeat: int = 50):
+    """Compara R*Tree y recorrido de la tabla en un catálogo de `rows` salas"""
+    source = sqlite3.connect(db_path)
+    points = source.execute(f"SELECT text, latitud, longitud FROM words WHERE {_VALID_COORDS}").fetchall()
+    source.close()
+    if not points:
+        logger.error(f"❌ {db_path} no tiene salas con coordenadas")
+        return
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        conn.execute("CREATE TABLE words (id INTEGER PRIMARY KEY, text TEXT, latitud REAL, longitud REAL)")
+        # Las salas reales repetidas con un desplazamiento de hasta ~5 km
+        conn.executemany(
+            "INSERT INTO words (text, latitud, longitud) VALUES (?, ?, ?)",
+            ((text, lat + rng.uniform(-0.05, 0.05), lng + rng.uniform(-0.05, 0.05))
+             for text, lat, lng in (points[i % len(points)] for i in range(rows))),
+        )
+        start = time.perf_counter()
+        rebuild_rtree(conn)
+        conn.commit()
+        logger.info(f"🔨 Índice de {rows} filas en {time.perf_counter() - start:.2f}s")
+
+        madrid = (40.4168, -3.7038)
+        cases = [
+            ("caja barrio", lambda: in_bbox(conn, *_box(*madrid, 1000)), lambda: _scan_bbox(conn, *_box(*madrid, 1000))),
+            ("caja ciudad", lambda: in_bbox(conn, *_box(*madrid, 8000)), lambda: _scan_bbox(conn, *_box(*madrid, 8000))),
+            ("10 más cercanas", lambda: nearest(conn, *madrid, 10), lambda: _scan_nearest(conn, *madrid, 10)),
+        ]
+        print(f"{'consulta':<18} {'salas':>7} {'tabla (ms)':>11} {'R*Tree (ms)':>12}")
+        for name, indexed, scan in cases:
+            timings = []
+            for fn in (scan, indexed):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    result = fn()
+                timings.append((time.perf_counter() - start) * 1000 / repeat)
+            print(f"{name:<18} {len(result):>7} {timings[0]:>11.3f} {timings[1]:>12.3f}")
+        conn.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Índice R*Tree de coordenadas del catálogo")
+    parser.add_argument('--db', required=True, help="BD SQLite")
+    parser.add_argument('--caja', nargs=4, type=float, metavar=('SUR', 'OESTE', 'NORTE', 'ESTE'),
+                        help="Salas dentro de la caja")
+    parser.add_argument('--cerca', nargs=2, type=float, metavar=('LAT', 'LNG'), help="Salas más cercanas al punto")
+    parser.add_argument('-n', type=int, default=10, help="Número de salas para --cerca")
+    parser.add_argument('--triggers', action='store_true', help="Mantener el índice con triggers")
+    parser.add_argument('--sin-triggers', action='store_true', help="Quitar los triggers de sincronización")
+    parser.add_argument('--bench', type=int, metavar='FILAS', help="Comparar con un recorrido de la tabla")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.db, args.bench)
+        return
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.caja:
+            for row_id, nombre, lat, lng in in_bbox(conn, *args.caja):
+                print(f"[{row_id}] {nombre} ({lat:.5f}, {lng:.5f})")
+            return
+        if args.cerca:
+            for (row_id, nombre, lat, lng), distance in nearest(conn, *args.cerca, args.n):
+                print(f"{distance:8.0f} m  [{row_id}] {nombre} ({lat:.5f}, {lng:.5f})")
+            return
+
+        start = time.perf_counter()
+        with conn:
+            if args.sin_triggers:
+                drop_rtree_triggers(conn)
+            built = rebuild_rtree(conn, args.triggers)
+        if built:
+            (count,) = conn.execute(f"SELECT COUNT(*) FROM {RTREE_TABLE}").fetchone()
+            logger.info(f"✅ {RTREE_TABLE}: {count} salas con coordenadas en {time.perf_counter() - start:.2f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,16 +13,21 @@ Características:
 
 import json
 import os
-import sqlite3
 import time
 import re
-import hashlib
 from typing import List, Dict, Optional, Set, Tuple
-from urllib.parse import urljoin, urlparse
-from difflib import SequenceMatcher
+from urllib.parse import urljoin
 from playwright.sync_api import sync_playwright, Page, TimeoutError as PlaywrightTimeoutError
 import logging
 
+from address_parser import apply_address_columns
+from dedup_snapshot import load_or_build_snapshot, room_key
+from gazetteer import city_of
+from geo_index import DEFAULT_RADIUS_M, GeoGridIndex
+from normalization import clean_text
+from similarity import is_similar
+from url_utils import is_bad_link
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -38,15 +43,18 @@ logger = logging.getLogger(__name__)
 class EscapeRoomUnifiedScraper:
     """Scraper unificado y mejorado para múltiples fuentes"""
 
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, geo_radius_m: float = DEFAULT_RADIUS_M):
         """
         Inicializa el scraper
 
         Args:
             db_path: Ruta a la base de datos SQLite para verificar duplicados
+            geo_radius_m: Radio en metros para buscar duplicados por proximidad
         """
         self.db_path = db_path or "assets/database/words.db"
         self.existing_rooms: Set[str] = set()
+        # Nombres (en minúsculas) indexados por coordenadas, de la BD y de esta sesión
+        self.geo_index = GeoGridIndex(geo_radius_m)
         self.scraped_rooms: List[Dict] = []
         self.stats = {
             'total_scraped': 0,
@@ -55,32 +63,22 @@ class EscapeRoomUnifiedScraper:
             'errors': 0
         }
 
-        # Filtros de URLs no deseadas
-        self.bad_domains = {
-            'facebook.com', 'instagram.com', 'twitter.com', 'x.com',
-            'tiktok.com', 'youtube.com', 'wa.me', 'whatsapp.com',
-            'google.com/maps', 'maps.google', 'tripadvisor', 'booking.com'
-        }
-
         # Cargar escapes existentes de la BD
         self._load_existing_rooms()
 
     def _load_existing_rooms(self):
         """Carga los escape rooms existentes de SQLite para evitar duplicados"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            if not os.path.exists(self.db_path):
+                raise FileNotFoundError(self.db_path)
 
-            # Obtener nombres y ubicaciones existentes
-            cursor.execute("SELECT text, ubicacion FROM word")
+            # Claves precalculadas (se regeneran sólo si la BD ha cambiado)
+            for row in load_or_build_snapshot(self.db_path):
+                self.existing_rooms.add(row.key)
+                self.geo_index.add(row.nombre.lower(), row.latitud, row.longitud)
 
-            for nombre, ubicacion in cursor.fetchall():
-                # Crear clave normalizada para comparación
-                key = self._normalize_key(nombre, ubicacion)
-                self.existing_rooms.add(key)
-
-            conn.close()
-            logger.info(f"✅ Cargados {len(self.existing_rooms)} escape rooms existentes de la BD")
+            logger.info(f"✅ Cargados {len(self.existing_rooms)} escape rooms existentes de la BD "
+                        f"({len(self.geo_index)} con coordenadas)")
 
         except Exception as e:
             logger.warning(f"⚠️ No se pudo cargar la BD existente: {e}")
@@ -97,47 +95,21 @@ class EscapeRoomUnifiedScraper:
         Returns:
             Clave normalizada única
         """
-        # Limpieza agresiva
-        nombre = re.sub(r'[^\w\s]', '', nombre.lower().strip())
-        nombre = re.sub(r'\s+', ' ', nombre)
-
-        # Extraer ciudad de la ubicación
-        ciudad = self._extract_city(ubicacion)
-
-        # Crear hash para comparación rápida
-        key = f"{nombre}_{ciudad}".lower()
-        return hashlib.md5(key.encode()).hexdigest()
+        return room_key(nombre, ubicacion)
 
     def _extract_city(self, ubicacion: str) -> str:
         """Extrae la ciudad principal de una dirección completa"""
-        if not ubicacion:
-            return ""
-
-        # Ciudades españolas comunes
-        ciudades = [
-            'madrid', 'barcelona', 'valencia', 'sevilla', 'zaragoza',
-            'málaga', 'murcia', 'bilbao', 'alicante', 'córdoba',
-            'valladolid', 'vigo', 'gijón', 'hospitalet', 'coruña',
-            'granada', 'vitoria', 'elche', 'oviedo', 'santander',
-            'salamanca', 'pamplona', 'toledo', 'león', 'cádiz'
-        ]
-
-        ubicacion_lower = ubicacion.lower()
-        for ciudad in ciudades:
-            if ciudad in ubicacion_lower:
-                return ciudad.capitalize()
-
-        # Si no encuentra ciudad conocida, tomar primera palabra significativa
-        words = re.findall(r'\b[A-ZÁÉÍÓÚa-záéíóú]{3,}\b', ubicacion)
-        return words[0] if words else ""
-
-    def _is_duplicate(self, nombre: str, ubicacion: str) -> bool:
+        return city_of(ubicacion)
+
+    def _is_duplicate(self, nombre: str, ubicacion: str, lat: float = 0.0, lng: float = 0.0) -> bool:
         """
         Verifica si un escape room es duplicado
 
         Args:
             nombre: Nombre del escape room
             ubicacion: Ubicación
+            lat: Latitud (0.0 si no se conoce)
+            lng: Longitud (0.0 si no se conoce)
 
         Returns:
             True si es duplicado, False si es nuevo
@@ -148,6 +120,12 @@ class EscapeRoomUnifiedScraper:
         if key in self.existing_rooms:
             return True
 
+        # Salas cercanas con nombre parecido, aunque la ubicación esté escrita distinto
+        nombre_lower = nombre.lower()
+        for nearby_name, _ in self.geo_index.near(lat, lng):
+            if is_similar(nombre_lower, nearby_name, 0.85):
+                return True
+
         # Verificar contra lo ya scrapeado en esta sesión
         for room in self.scraped_rooms:
             existing_key = self._normalize_key(room['nombre'], room['ubicacion'])
@@ -155,39 +133,19 @@ class EscapeRoomUnifiedScraper:
                 return True
 
             # Similitud de nombre (85% o más = duplicado)
-            similarity = SequenceMatcher(None, nombre.lower(), room['nombre'].lower()).ratio()
-            if similarity >= 0.85 and self._extract_city(ubicacion) == self._extract_city(room['ubicacion']):
+            if is_similar(nombre_lower, room['nombre'].lower(), 0.85) and \
+                    self._extract_city(ubicacion) == self._extract_city(room['ubicacion']):
                 return True
 
         return False
 
     def _clean_text(self, text: Optional[str]) -> str:
         """Limpia y normaliza texto"""
-        if not text:
-            return ""
-        text = text.strip()
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'[\r\n\t]+', ' ', text)
-        return text if text not in ['No disponible', '/', '#', 'null', 'N/A'] else ""
+        return clean_text(text)
 
     def _is_valid_url(self, url: str) -> bool:
         """Verifica si una URL es válida para web oficial"""
-        if not url:
-            return False
-
-        try:
-            parsed = urlparse(url)
-            if not parsed.hostname:
-                return False
-
-            # Filtrar dominios no deseados
-            for bad in self.bad_domains:
-                if bad in parsed.hostname.lower():
-                    return False
-
-            return True
-        except:
-            return False
+        return not is_bad_link(url)
 
     def _extract_coordinates(self, page: Page) -> Tuple[float, float]:
         """Extrae coordenadas GPS de enlaces de Google Maps"""
@@ -314,8 +272,11 @@ class EscapeRoomUnifiedScraper:
                     if not ubicacion:
                         ubicacion = "España"
 
+                    # Coordenadas
+                    lat, lng = self._extract_coordinates(page)
+
                     # Verificar duplicado
-                    if self._is_duplicate(nombre, ubicacion):
+                    if self._is_duplicate(nombre, ubicacion, lat, lng):
                         logger.info(f"⏭️ Duplicado: {nombre}")
                         self.stats['duplicates'] += 1
                         continue
@@ -323,9 +284,6 @@ class EscapeRoomUnifiedScraper:
                     # Web - usar la URL de escaperoomlover
                     web = url
 
-                    # Coordenadas
-                    lat, lng = self._extract_coordinates(page)
-
                     # Crear registro
                     room = {
                         'nombre': nombre,
@@ -345,6 +303,7 @@ class EscapeRoomUnifiedScraper:
                     }
 
                     results.append(room)
+                    self.geo_index.add(nombre.lower(), lat, lng)
                     self.stats['new_rooms'] += 1
                     logger.info(f"✅ Nuevo: {nombre}")
 
@@ -516,15 +475,15 @@ class EscapeRoomUnifiedScraper:
                     except:
                         pass
 
+                    # Coordenadas
+                    lat, lng = self._extract_coordinates(page)
+
                     # Verificar duplicado
-                    if self._is_duplicate(nombre, ubicacion):
+                    if self._is_duplicate(nombre, ubicacion, lat, lng):
                         logger.info(f"⏭️ Duplicado: {nombre}")
                         self.stats['duplicates'] += 1
                         continue
 
-                    # Coordenadas
-                    lat, lng = self._extract_coordinates(page)
-
                     room = {
                         'nombre': nombre,
                         'ubicacion': ubicacion,
@@ -543,6 +502,7 @@ class EscapeRoomUnifiedScraper:
                     }
 
                     results.append(room)
+                    self.geo_index.add(nombre.lower(), lat, lng)
                     self.stats['new_rooms'] += 1
                     logger.info(f"✅ Nuevo: {nombre}")
 
@@ -605,15 +565,15 @@ class EscapeRoomUnifiedScraper:
                     except:
                         pass
 
+                    # Coordenadas
+                    lat, lng = self._extract_coordinates(page)
+
                     # Verificar duplicado
-                    if self._is_duplicate(nombre, ubicacion):
+                    if self._is_duplicate(nombre, ubicacion, lat, lng):
                         logger.info(f"⏭️ Duplicado: {nombre}")
                         self.stats['duplicates'] += 1
                         continue
 
-                    # Coordenadas
-                    lat, lng = self._extract_coordinates(page)
-
                     room = {
                         'nombre': nombre,
                         'ubicacion': ubicacion,
@@ -632,6 +592,7 @@ class EscapeRoomUnifiedScraper:
                     }
 
                     results.append(room)
+                    self.geo_index.add(nombre.lower(), lat, lng)
                     self.stats['new_rooms'] += 1
                     logger.info(f"✅ Nuevo: {nombre}")
 
@@ -677,6 +638,7 @@ class EscapeRoomUnifiedScraper:
                     try:
                         logger.info(f"\n🌐 Iniciando {source_name}...")
                         results = scraper_func(page)
+                        apply_address_columns(results, overwrite=True)
                         self.scraped_rooms.extend(results)
                         self.stats['total_scraped'] += len(results)
                         logger.info(f"✅ {source_name}: {len(results)} nuevos escape rooms")
@@ -13,6 +13,9 @@ from typing import List, Dict, Optional
 from urllib.parse import urljoin, urlparse
 import logging
 
+from normalization import clean_text
+from phones import PhoneIndex, extract_phone, normalize_phone
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -28,29 +31,11 @@ class EscapeRoomScraper:
 
     def clean_text(self, text: Optional[str]) -> Optional[str]:
         """Limpia y normaliza texto"""
-        if not text:
-            return None
-        text = text.strip()
-        text = re.sub(r'\s+', ' ', text)
-        if text.lower() in ['no disponible', '/', '#', 'null']:
-            return None
-        return text if text else None
+        return clean_text(text) or None
 
     def extract_phone(self, text: str) -> Optional[str]:
-        """Extrae números de teléfono españoles"""
-        if not text:
-            return None
-        # Patrones de teléfono español
-        patterns = [
-            r'\+34\s*\d{3}\s*\d{3}\s*\d{3}',
-            r'\d{3}\s*\d{3}\s*\d{3}',
-            r'\d{9}'
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                return match.group(0).replace(' ', '')
-        return None
+        """Extrae números de teléfono españoles (en E.164)"""
+        return extract_phone(text)
 
     def scrape_roomescapes(self) -> List[Dict]:
         """Scraping de roomescapes.es"""
@@ -507,6 +492,7 @@ class EscapeRoomScraper:
         logger.info("🔄 Eliminando duplicados...")
 
         unique_rooms = {}
+        by_phone = PhoneIndex()
 
         for room in all_data:
             # Crear una clave única basada en nombre normalizado
@@ -516,8 +502,11 @@ class EscapeRoomScraper:
             if not nombre:
                 continue
 
-            # Clave única
+            # Clave única (mismo teléfono y nombre: misma sala)
+            room['telefono'] = normalize_phone(room.get('telefono'))
             key = f"{nombre}::{ubicacion[:20]}"
+            key = by_phone.find(room['telefono'], nombre) or key
+            by_phone.add(room['telefono'], nombre, key)
 
             # Si ya existe, mergear datos
             if key in unique_rooms:
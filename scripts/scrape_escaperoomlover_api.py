@@ -7,6 +7,8 @@ import requests
 import json
 import time
 
+from phones import phone_field
+
 def get_all_companies():
     """Obtiene todas las empresas/locales de escape rooms"""
     url = "https://www.escaperoomlover.com/api/es/public/company/all"
@@ -66,7 +68,7 @@ def main():
                 'duracion': f"{game.get('duration', '')} min" if game.get('duration') else "",
                 'descripcion': game.get('description', ''),
                 'empresa': company.get('name', ''),
-                'telefono': company.get('phone', ''),
+                'telefono': phone_field(company.get('phone')) or '',
                 'latitud': float(company.get('latitude', 0) or 0),
                 'longitud': float(company.get('longitude', 0) or 0),
                 'source': 'escaperoomlover.com'
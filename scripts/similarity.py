@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Comparación rápida de nombres con umbral.
+
+Sustituye a `SequenceMatcher(None, a, b).ratio() >= umbral` con las mismas
+decisiones: antes de calcular el ratio exacto se descartan los pares cuya
+cota superior ya no llega al umbral.
+
+- Cota por longitudes: ratio <= 2 * min(la, lb) / (la + lb)
+- Cota por caracteres: ratio <= 2 * |multiconjunto común| / (la + lb)
+  (la misma que `SequenceMatcher.quick_ratio`)
+
+Sólo los pares que superan las dos cotas pasan por SequenceMatcher, así que
+el resultado es idéntico y la mayoría de pares se resuelve sin él. Para una
+consulta contra muchos candidatos, `CandidateSet` ordena por longitud (sólo
+mira el rango de longitudes que puede alcanzar el umbral) y reutiliza el
+índice interno de SequenceMatcher de cada candidato.
+
+Uso:
+    python3 similarity.py --bench   # decisiones y velocidad sobre los JSON del proyecto
+"""
+
+import bisect
+import json
+import os
+import time
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Iterable, List, Optional, Tuple
+
+
+def _passes(matches: int, total: int, threshold: float, strict: bool) -> bool:
+    # Misma aritmética que SequenceMatcher._calculate_ratio
+    ratio = 2.0 * matches / total if total else 1.0
+    return ratio > threshold if strict else ratio >= threshold
+
+
+def _common_chars(counts_a: Counter, counts_b: Counter) -> int:
+    if len(counts_a) > len(counts_b):
+        counts_a, counts_b = counts_b, counts_a
+    get = counts_b.get
+    return sum(min(n, get(c, 0)) for c, n in counts_a.items())
+
+
+def ratio_if_at_least(a: str, b: str, threshold: float, strict: bool = False) -> Optional[float]:
+    """
+    Ratio de SequenceMatcher si alcanza el umbral; None si no
+
+    Args:
+        a, b: Textos a comparar (en el mismo orden que en SequenceMatcher)
+        threshold: Umbral entre 0.0 y 1.0
+        strict: True para exigir ratio > umbral en vez de >=
+    """
+    total = len(a) + len(b)
+    if not _passes(min(len(a), len(b)), total, threshold, strict):
+        return None
+    if not _passes(_common_chars(Counter(a), Counter(b)), total, threshold, strict):
+        return None
+    ratio = SequenceMatcher(None, a, b).ratio()
+    if ratio > threshold if strict else ratio >= threshold:
+        return ratio
+    return None
+
+
+def is_similar(a: str, b: str, threshold: float, strict: bool = False) -> bool:
+    """Equivalente a SequenceMatcher(None, a, b).ratio() >= umbral (o > si strict)"""
+    return ratio_if_at_least(a, b, threshold, strict) is not None
+
+
+class CandidateSet:
+    """
+    Conjunto de candidatos preparado para muchas consultas
+
+    Guarda los candidatos ordenados por longitud con su recuento de
+    caracteres y un SequenceMatcher con el candidato ya indexado.
+    """
+
+    def __init__(self, candidates: Iterable[str]):
+        items = sorted(enumerate(candidates), key=lambda item: len(item[1]))
+        self.indexes = [idx for idx, _ in items]
+        self.strings = [text for _, text in items]
+        self.lengths = [len(text) for text in self.strings]
+        self._counts: List[Optional[Counter]] = [None] * len(items)
+        self._matchers: List[Optional[SequenceMatcher]] = [None] * len(items)
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def _length_range(self, length: int, threshold: float) -> Tuple[int, int]:
+        # Longitudes lb con 2 * min(la, lb) / (la + lb) >= umbral
+        if threshold <= 0:
+            return 0, len(self.lengths)
+        low = threshold * length / (2 - threshold)
+        high = length * (2 - threshold) / threshold
+        start = bisect.bisect_left(self.lengths, int(low))
+        end = bisect.bisect_right(self.lengths, int(high) + 1)
+        return start, end
+
+    def matches(self, query: str, threshold: float, strict: bool = False) -> List[Tuple[int, float]]:
+        """
+        Candidatos que alcanzan el umbral contra `query`
+
+        Returns:
+            Lista de (índice original del candidato, ratio), en el orden original
+        """
+        query_len = len(query)
+        query_counts = None
+        found = []
+
+        start, end = self._length_range(query_len, threshold)
+        for pos in range(start, end):
+            total = query_len + self.lengths[pos]
+            if not _passes(min(query_len, self.lengths[pos]), total, threshold, strict):
+                continue
+
+            counts = self._counts[pos]
+            if counts is None:
+                counts = self._counts[pos] = Counter(self.strings[pos])
+            if query_counts is None:
+                query_counts = Counter(query)
+            if not _passes(_common_chars(query_counts, counts), total, threshold, strict):
+                continue
+
+            matcher = self._matchers[pos]
+            if matcher is None:
+                matcher = self._matchers[pos] = SequenceMatcher(None)
+                matcher.set_seq2(self.strings[pos])
+            matcher.set_seq1(query)
+            ratio = matcher.ratio()
+            if ratio > threshold if strict else ratio >= threshold:
+                found.append((self.indexes[pos], ratio))
+
+        found.sort()
+        return found
+
+    def best(self, query: str, threshold: float, strict: bool = False) -> Optional[Tuple[int, float]]:
+        """Candidato con mayor ratio que alcanza el umbral, o None"""
+        found = self.matches(query, threshold, strict)
+        return max(found, key=lambda item: (item[1], -item[0])) if found else None
+
+
+# ===========================================
+# BENCHMARK
+# ===========================================
+
+def _corpus_names() -> List[str]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    names = set()
+    for path in ("escape_rooms_scraped.json", "assets/escape_rooms_completo.json",
+                 "assets/escape_rooms_seed.json", "scripts/nuevos_escape_rooms.json"):
+        try:
+            with open(os.path.join(root, path), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+        for room in data if isinstance(data, list) else []:
+            name = (room.get('nombre') or room.get('text') or '').lower().strip()
+            if name:
+                names.add(name)
+    return sorted(names)
+
+
+def benchmark(threshold: float = 0.85, limit: int = 400):
+    """Compara decisiones y tiempos frente a SequenceMatcher en todos los pares"""
+    names = _corpus_names()[:limit]
+    pairs = len(names) * (len(names) - 1)
+    print(f"📋 {len(names)} nombres, {pairs} pares, umbral {threshold}")
+
+    start = time.perf_counter()
+    expected = {(i, j) for i, a in enumerate(names) for j, b in enumerate(names)
+                if i != j and SequenceMatcher(None, a, b).ratio() >= threshold}
+    t_naive = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pairwise = {(i, j) for i, a in enumerate(names) for j, b in enumerate(names)
+                if i != j and is_similar(a, b, threshold)}
+    t_pairwise = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidates = CandidateSet(names)
+    batch = {(i, j) for i, a in enumerate(names) for j, _ in candidates.matches(a, threshold) if i != j}
+    t_batch = time.perf_counter() - start
+
+    print(f"SequenceMatcher : {t_naive:.3f}s ({pairs / t_naive:,.0f} pares/s)")
+    print(f"is_similar      : {t_pairwise:.3f}s (x{t_naive / t_pairwise:.1f})")
+    print(f"CandidateSet    : {t_batch:.3f}s (x{t_naive / t_batch:.1f})")
+    identical = expected == pairwise == batch
+    print(f"{'✅' if identical else '❌'} Decisiones idénticas: {len(expected)} pares similares")
+    return identical
+
+
+if __name__ == "__main__":
+    import sys
+    if '--bench' in sys.argv:
+        sys.exit(0 if benchmark() else 1)
+    print(__doc__)
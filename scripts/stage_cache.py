@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Reutilización de etapas del pipeline por hash de contenido.
+
+Volver a ejecutar un generador (words.db, catálogo binario, provincias,
+parches) reescribía sus salidas aunque las entradas no hubieran cambiado:
+cambia la fecha de los assets y todo lo que depende de ellos se rehace.
+Cada etapa calcula ahora una clave con:
+
+- el contenido canónico de sus entradas: para JSON/NDJSON, cada registro
+  con el diario de change_journal.py aplicado y las claves ordenadas (un
+  JSON reindentado o recién compactado da la misma clave); para el resto,
+  los bytes
+- sus parámetros (los de la línea de órdenes que afectan a la salida)
+- el código del script de la etapa y de los de esta carpeta que importa,
+  directa o indirectamente (también los imports dentro de funciones)
+- las tablas de `data/` (géneros, provincias, municipios, el nomenclátor
+  del INE si está, sufijos públicos): cambian la salida igual que el código
+
+La clave se guarda junto a la salida principal en `<salida>.etapa.json`,
+con el SHA-256 de cada salida. Si al volver a ejecutar la clave coincide y
+las salidas siguen intactas, la etapa no hace nada.
+
+Uso:
+    stage = Stage('catalog_shards', entradas, [salida], {'formato': 'bin'})
+    if not stage.fresh():
+        ...
+        stage.done()
+
+    python3 stage_cache.py                 # todas las etapas de assets, con resumen
+    python3 stage_cache.py --forzar        # regenerarlas todas
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set
+
+from change_journal import iter_view, journal_path
+
+logger = logging.getLogger(__name__)
+
+STAMP_SUFFIX = ".etapa.json"
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPTS_DIR, "data")
+RECORD_EXTENSIONS = ('.json', '.ndjson', '.jsonl')
+
+# Hash de las entradas ya leídas en este proceso, por ruta y fecha/tamaño
+_hashes: Dict[tuple, str] = {}
+
+
+def content_hash(path: str) -> str:
+    """SHA-256 del contenido de un fichero o carpeta (registros canónicos si es JSON)"""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(STAMP_SUFFIX):
+                    continue
+                full = os.path.join(root, name)
+                digest.update(os.path.relpath(full, path).encode('utf-8') + b'\0')
+                digest.update(_file_hash(full).encode('ascii'))
+    elif path.endswith(RECORD_EXTENSIONS):
+        key = (os.path.abspath(path), _stat(path), _stat(journal_path(path)))
+        if key not in _hashes:
+            for record in iter_view(path):
+                digest.update(json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+                digest.update(b'\n')
+            _hashes[key] = digest.hexdigest()
+        return _hashes[key]
+    else:
+        return _file_hash(path)
+    return digest.hexdigest()
+
+
+def _stat(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def local_imports(module: str) -> Set[str]:
+    """`module` y los scripts de esta carpeta que importa, de forma transitiva"""
+    seen: Set[str] = set()
+    pending = [module]
+    while pending:
+        name = pending.pop()
+        path = os.path.join(SCRIPTS_DIR, name + ".py")
+        if name in seen or not os.path.exists(path):
+            continue
+        seen.add(name)
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module)
+    return seen
+
+
+def code_hash(module: str) -> str:
+    """SHA-256 del script `module`, de los scripts locales que importa y de data/"""
+    digest = hashlib.sha256()
+    for name in sorted(local_imports(module)):
+        digest.update(name.encode('utf-8') + b'\0')
+        digest.update(_file_hash(os.path.join(SCRIPTS_DIR, name + ".py")).encode('ascii'))
+    if os.path.isdir(DATA_DIR):
+        digest.update(b'data\0' + content_hash(DATA_DIR).encode('ascii'))
+    return digest.hexdigest()
+
+
+class Stage:
+    """
+    Etapa que se salta si sus entradas, parámetros y código no han cambiado
+
+    Args:
+        name: Nombre de la etapa: el script que la implementa
+        inputs: Ficheros de entrada
+        outputs: Ficheros o carpetas de salida; la clave va junto al primero
+        params: Parámetros que afectan a la salida (serializables en JSON)
+    """
+
+    def __init__(self, name: str, inputs: List[str], outputs: List[str], params: Optional[Dict] = None):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params or {}
+        self.stamp_path = outputs[0].rstrip(os.sep) + STAMP_SUFFIX
+        self._key: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        if self._key is None:
+            digest = hashlib.sha256()
+            digest.update(json.dumps({
+                'etapa': self.name,
+                'entradas': [content_hash(path) for path in self.inputs],
+                'parametros': self.params,
+                'codigo': code_hash(self.name),
+            }, sort_keys=True).encode('utf-8'))
+            self._key = digest.hexdigest()
+        return self._key
+
+    def fresh(self) -> bool:
+        """True si la clave guardada coincide y las salidas no se han tocado"""
+        try:
+            with open(self.stamp_path, 'r', encoding='utf-8') as f:
+                stamp = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        if stamp.get('clave') != self.key:
+            return False
+        if len(stamp.get('salidas', [])) != len(self.outputs):
+            return False
+        return all(os.path.exists(path) and digest == content_hash(path)
+                   for path, digest in zip(self.outputs, stamp['salidas']))
+
+    def done(self):
+        """Guarda la clave y el hash de las salidas recién escritas"""
+        stamp = {
+            'etapa': self.name,
+            'clave': self.key,
+            'salidas': [content_hash(path) for path in self.outputs],
+        }
+        with open(self.stamp_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(stamp, f, ensure_ascii=False, indent=2)
+        os.replace(self.stamp_path + ".tmp", self.stamp_path)
+
+
+# ===========================================
+# PIPELINE DE ASSETS
+# ===========================================
+
+def run_pipeline(inputs: List[str], force: bool = False) -> Dict[str, int]:
+    """
+    words.db, catálogo binario y catálogo por provincias a partir de `inputs`
+
+    Las salas se preparan una sola vez y sólo si alguna etapa hay que rehacerla.
+    """
+    from build_words_db import DEFAULT_OUTPUT as WORDS_DB, build_database, prepare_rooms
+    from catalog_binary import DEFAULT_OUTPUT as CATALOG_BIN, write_catalog
+    from catalog_shards import DEFAULT_OUTPUT as SHARDS_DIR, export_shards
+
+    stages = [
+        (Stage('build_words_db', inputs, [WORDS_DB], {'virtuales': True, 'normalizado': False}),
+         lambda rooms: build_database(rooms, WORDS_DB, True, False)),
+        (Stage('catalog_binary', inputs, [CATALOG_BIN]),
+         lambda rooms: write_catalog(rooms, CATALOG_BIN)),
+        (Stage('catalog_shards', inputs, [SHARDS_DIR], {'formato': 'bin'}),
+         lambda rooms: export_shards(rooms, SHARDS_DIR, 'bin')),
+    ]
+
+    prepared = None
+    counts = {'etapas': len(stages), 'reutilizadas': 0}
+    for stage, run in stages:
+        start = time.perf_counter()
+        if not force and stage.fresh():
+            counts['reutilizadas'] += 1
+            logger.info(f"♻️ {stage.name}: sin cambios, se reutiliza ({time.perf_counter() - start:.2f}s)")
+            continue
+        if prepared is None:
+            rooms = []
+            for path in inputs:
+                rooms.extend(iter_view(path))
+            prepared = prepare_rooms(rooms)
+        run(prepared)
+        stage.done()
+        logger.info(f"🔨 {stage.name}: regenerada ({time.perf_counter() - start:.2f}s)")
+    return counts
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from build_words_db import DEFAULT_INPUT
+
+    parser = argparse.ArgumentParser(description="Regenera los assets del catálogo saltando lo que no ha cambiado")
+    parser.add_argument('entradas', nargs='*', default=[DEFAULT_INPUT], help="JSON de escape rooms")
+    parser.add_argument('--forzar', action='store_true', help="Regenerar aunque las entradas no hayan cambiado")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = run_pipeline(args.entradas, args.forzar)
+    logger.info(f"✅ {counts['reutilizadas']} de {counts['etapas']} etapas reutilizadas "
+                f"en {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,6 @@
 #!/usr/bin/env python3
 """Script para añadir URLs de imágenes a los escape rooms"""
-import json
-
-# Cargar datos existentes
-with open('../assets/escape_rooms_nuevos.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+from change_journal import ChangeJournal
 
 # URLs de imágenes temáticas de Unsplash
 image_urls = [
@@ -25,14 +21,13 @@ image_urls = [
     "https://images.unsplash.com/photo-1559827260-dc66d52bef19?w=400&h=300&fit=crop",  # Submarine
 ]
 
-# Añadir imagenUrl a cada escape room
-for i, room in enumerate(data):
-    if i < len(image_urls):
-        room['imagenUrl'] = image_urls[i]
-    print(f"✓ {room.get('nombre', 'Unknown')}")
-
-# Guardar
-with open('../assets/escape_rooms_nuevos.json', 'w', encoding='utf-8') as f:
-    json.dump(data, f, ensure_ascii=False, indent=2)
+# Añadir imagenUrl a cada escape room (al diario del JSON, sin reescribirlo)
+total = 0
+with ChangeJournal('../assets/escape_rooms_nuevos.json', 'update_images') as journal:
+    for i, (key, room) in enumerate(journal.rooms()):
+        if i < len(image_urls):
+            journal.set(key, room, 'imagenUrl', image_urls[i])
+        print(f"✓ {room.get('nombre', 'Unknown')}")
+        total += 1
 
-print(f"\n✅ {len(data)} escape rooms actualizados con imágenes")
+print(f"\n✅ {total} escape rooms actualizados con imágenes")
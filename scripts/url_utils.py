@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Canonicalización de URLs de webs oficiales, compartida por scrapers y merges.
+
+- normalize_url(): URL absoluta y limpia, o "" si no sirve como web
+- is_bad_link(): redes sociales, mapas, acortadores, directorios...
+- registrable_domain(): dominio registrable según la Public Suffix List
+  ("blog.foo.com.es" → "foo.com.es"), clave para cruzar empresas y logos
+- brand_from_url(): nombre de marca a partir del dominio
+
+La lista de sufijos públicos (data/public_suffixes.dat, subconjunto offline
+de la PSL) se carga una sola vez; el resultado de cada host se memoriza, y
+los hosts no deseados se comprueban con un único patrón compilado.
+
+Uso:
+    python3 url_utils.py https://www.facebook.com/sala "blog.miescape.com.es/reservas"
+"""
+
+import os
+import re
+import sys
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from normalization import CACHE_SIZE
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+PUBLIC_SUFFIX_FILE = os.path.join(DATA_DIR, "public_suffixes.dat")
+
+# Enlaces que no son la web oficial de una sala. "*" = cualquier TLD
+# ("facebook.*" → facebook.com, facebook.es...); con ruta, sólo esa sección
+BAD_LINK_RULES = (
+    "facebook.*", "instagram.*", "twitter.*", "x.com", "tiktok.*",
+    "youtube.*", "youtu.be", "linkedin.*", "tripadvisor.*", "booking.com",
+    "whatsapp.com", "wa.me", "goo.gl", "bit.ly", "linktr.ee", "forms.gle",
+    "google.*/maps", "google.*/search", "maps.google.*",
+    "escaperoos.es",
+)
+
+# Directorios: muchas salas distintas bajo el mismo dominio, no sirven de clave
+DIRECTORY_DOMAINS = frozenset({
+    "escaperoos.es", "escaperoomlover.com", "todoescaperooms.com",
+    "roomescapes.es", "escapeup.es",
+})
+
+_LABEL_RE = re.compile(r'^(?!-)[a-z0-9-]{1,63}(?<!-)$')
+_TLD_RE = re.compile(r'^(?:[a-z]{2,63}|xn--[a-z0-9-]{2,59})$')
+_IP_RE = re.compile(r'^\d{1,3}(?:\.\d{1,3}){3}$')
+_IGNORED_SCHEMES = ('mailto:', 'tel:', 'javascript:', 'data:', 'whatsapp:')
+
+
+def _compile_bad_links(rules: Iterable[str]):
+    any_tld = r'[a-z]{2,}(?:\.[a-z]{2,})?'
+    alternatives = []
+    for rule in rules:
+        host, _, path = rule.partition('/')
+        pattern = r'\.'.join(any_tld if label == '*' else re.escape(label) for label in host.split('.'))
+        end = re.escape('/' + path) + r'(?=[/?#]|$)' if path else r'(?=/|$)'
+        alternatives.append(pattern + end)
+    # Subdominios opcionales delante: "m.facebook.com", "www.google.es/maps"
+    return re.compile(r'^(?:[a-z0-9-]+\.)*(?:' + '|'.join(alternatives) + ')')
+
+
+_BAD_LINK_RE = _compile_bad_links(BAD_LINK_RULES)
+
+
+# ===========================================
+# PUBLIC SUFFIX LIST
+# ===========================================
+
+@lru_cache(maxsize=1)
+def public_suffixes(path: str = PUBLIC_SUFFIX_FILE) -> Tuple[frozenset, frozenset, frozenset]:
+    """(reglas, comodines, excepciones) de la lista de sufijos públicos"""
+    rules, wildcards, exceptions = set(), set(), set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            rule = line.split()[0] if line.split() else ''
+            if not rule or rule.startswith('//'):
+                continue
+            rule = rule.lower()
+            if rule.startswith('!'):
+                exceptions.add(rule[1:])
+            elif rule.startswith('*.'):
+                wildcards.add(rule[2:])
+            else:
+                rules.add(rule)
+    return frozenset(rules), frozenset(wildcards), frozenset(exceptions)
+
+
+def _suffix_size(labels: List[str]) -> int:
+    # Número de etiquetas del sufijo público más largo (algoritmo de la PSL)
+    rules, wildcards, exceptions = public_suffixes()
+    for i in range(len(labels)):
+        candidate = '.'.join(labels[i:])
+        if candidate in exceptions:
+            return len(labels) - i - 1
+        if candidate in rules:
+            return len(labels) - i
+        if i + 1 < len(labels) and '.'.join(labels[i + 1:]) in wildcards:
+            return len(labels) - i
+    return 1
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _host_domain(host: str) -> Optional[str]:
+    # Veredicto por host (se repiten mucho): dominio registrable o None
+    if _IP_RE.match(host):
+        return None
+    labels = host.split('.')
+    if len(labels) < 2 or not _TLD_RE.match(labels[-1]):
+        return None
+    if not all(_LABEL_RE.match(label) for label in labels):
+        return None
+    size = _suffix_size(labels)
+    if len(labels) <= size:
+        return None
+    return '.'.join(labels[-size - 1:])
+
+
+def _clean_host(host: Optional[str]) -> str:
+    return (host or '').strip().rstrip('.').lower()
+
+
+def is_valid_host(host: Optional[str]) -> bool:
+    """True si el host tiene un dominio registrable ("localhost", "escape-room-espana" no)"""
+    return _host_domain(_clean_host(host)) is not None
+
+
+# ===========================================
+# URLS
+# ===========================================
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalize(url: str) -> str:
+    if url.lower().startswith(_IGNORED_SCHEMES) or url.startswith('#') or url in ('/', '#'):
+        return ""
+    if url.startswith('//'):
+        url = 'https:' + url
+    elif not url.lower().startswith(('http://', 'https://')):
+        url = 'https://' + url.lstrip('/')
+
+    try:
+        parts = urlsplit(url)
+        host = _clean_host(parts.hostname)
+        port = parts.port
+    except ValueError:
+        return ""
+    if not host or _host_domain(host) is None:
+        return ""
+
+    netloc = host
+    if port and port not in (80, 443):
+        netloc += f":{port}"
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or '/', parts.query, ''))
+
+
+def normalize_url(url: Optional[str], base: Optional[str] = None) -> str:
+    """
+    URL absoluta y canónica (esquema y host en minúsculas, sin fragmento)
+
+    Args:
+        url: Enlace tal como aparece en la página
+        base: URL de la página, para resolver enlaces relativos
+
+    Returns:
+        La URL, o "" si no es una web (vacía, "#", javascript:, mailto:, host inválido)
+    """
+    if not url:
+        return ""
+    url = url.strip()
+    if base and not url.startswith(('#', '//')) and '://' not in url:
+        url = urljoin(base, url)
+    return _normalize(url) if url else ""
+
+
+def host_of(url: Optional[str]) -> str:
+    """Host (en minúsculas, sin "www.") de una URL, o "" """
+    canonical = normalize_url(url)
+    if not canonical:
+        return ""
+    host = urlsplit(canonical).hostname or ""
+    return host[4:] if host.startswith('www.') else host
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _is_bad(canonical: str) -> bool:
+    parts = urlsplit(canonical)
+    return bool(_BAD_LINK_RE.match(_clean_host(parts.hostname) + parts.path))
+
+
+def is_bad_link(url: Optional[str]) -> bool:
+    """True si el enlace no sirve como web oficial (redes, mapas, acortadores...)"""
+    canonical = normalize_url(url)
+    return not canonical or _is_bad(canonical)
+
+
+def external_links(candidates: Iterable[Optional[str]], base: Optional[str] = None) -> Iterator[str]:
+    """Enlaces candidatos a web oficial, canónicos y sin repetir, en orden"""
+    seen = set()
+    for candidate in candidates:
+        url = normalize_url(candidate, base)
+        if url and url not in seen and not _is_bad(url):
+            seen.add(url)
+            yield url
+
+
+def registrable_domain(url_or_host: Optional[str]) -> Optional[str]:
+    """Dominio registrable ("https://blog.foo.com.es/x" → "foo.com.es"), o None"""
+    if not url_or_host:
+        return None
+    text = url_or_host.strip()
+    host = urlsplit(normalize_url(text)).hostname if ('/' in text or ':' in text) else text
+    return _host_domain(_clean_host(host))
+
+
+def domain_key(url: Optional[str]) -> Optional[str]:
+    """Dominio registrable para cruzar empresas; None para directorios y enlaces no válidos"""
+    if is_bad_link(url):
+        return None
+    domain = registrable_domain(url)
+    return None if domain in DIRECTORY_DOMAINS else domain
+
+
+def brand_from_url(url: Optional[str]) -> str:
+    """Marca a partir del dominio ("https://www.mi-escape.es" → "Mi Escape")"""
+    domain = registrable_domain(url)
+    if not domain:
+        return ""
+    base = domain.split('.')[0].replace('-', ' ').replace('_', ' ')
+    return " ".join(w.capitalize() for w in base.split())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    for arg in sys.argv[1:]:
+        print(f"{arg!r} → url={normalize_url(arg)!r} dominio={registrable_domain(arg)!r} "
+              f"no_valida={is_bad_link(arg)} marca={brand_from_url(arg)!r}")